@@ -0,0 +1,26 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Micro-benchmarks for the SDB infrastructure. They run offline against
+the mock programs of the test-suite, e.g.:
+
+    $ python3 -m benchmarks.bench_pipeline
+
+Running the package itself measures the startup and first-command
+latency of sdb against a stored baseline (see benchmarks/__main__.py):
+
+    $ python3 -m benchmarks
+"""
@@ -0,0 +1,161 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Run the startup and first-command latency suite of benchmarks/latency.py
+and compare its results against a stored baseline:
+
+    $ python3 -m benchmarks --save     # record a baseline
+    $ python3 -m benchmarks            # compare against it
+
+Every measurement is taken in a fresh interpreter, a few times, and its
+median is reported. Metrics that got slower than their baseline by more
+than the given threshold are flagged, and make the harness exit with a
+non-zero status, so startup optimizations can be verified by running it
+before and after them.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from typing import Dict, List
+
+from benchmarks.latency import PIPELINES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def default_baseline() -> str:
+    # pylint: disable=missing-docstring
+    cache = os.environ.get("XDG_CACHE_HOME",
+                           os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(cache, "sdb", "benchmarks.json")
+
+
+def run_once(argv: List[str]) -> Dict[str, float]:
+    """
+    Run a measurement of benchmarks/latency.py in a fresh interpreter
+    and return its results.
+    """
+    output = subprocess.run([sys.executable, "-m", "benchmarks.latency"] +
+                            argv,
+                            cwd=ROOT,
+                            stdout=subprocess.PIPE,
+                            check=True).stdout
+    return json.loads(output.decode().splitlines()[-1])
+
+
+def run_suite(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Return the median of every metric of the suite over the given number
+    of runs.
+    """
+    runs = [["import"], ["vocabulary"], ["setup_target"]]
+    for line in args.line or PIPELINES:
+        runs.append(["pipeline", "-l", line, "-n", str(args.nth)])
+
+    metrics: Dict[str, List[float]] = {}
+    for argv in runs:
+        for _ in range(args.repeat):
+            for (name, elapsed) in run_once(argv).items():
+                metrics.setdefault(name, []).append(elapsed)
+    return {
+        name: sorted(times)[len(times) // 2]
+        for (name, times) in metrics.items()
+    }
+
+
+def main() -> None:
+    # pylint: disable=missing-docstring
+    parser = argparse.ArgumentParser(prog="benchmarks")
+    parser.add_argument("-b",
+                        "--baseline",
+                        default=default_baseline(),
+                        help="the file that the baseline is stored in")
+    parser.add_argument("--save",
+                        action="store_true",
+                        help="store the results as the new baseline")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-n",
+                        "--nth",
+                        type=int,
+                        default=100,
+                        help="the number of invocations of each pipeline" +
+                        " after the first one")
+    parser.add_argument("-l",
+                        "--line",
+                        action="append",
+                        help="pipelines to measure instead of the default")
+    parser.add_argument("-t",
+                        "--threshold",
+                        type=float,
+                        default=20.0,
+                        help="the slowdown (in percent) that is flagged")
+    parser.add_argument("--min-delta",
+                        type=float,
+                        default=0.5,
+                        help="the slowdown (in ms) below which nothing" +
+                        " is flagged, to ignore noise in quick metrics")
+    args = parser.parse_args()
+
+    try:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["metrics"]
+    except (OSError, ValueError, KeyError):
+        baseline = {}
+
+    results = run_suite(args)
+
+    regressions = 0
+    print("{:<60} {:>12} {:>12} {:>8}".format("METRIC", "TIME(ms)", "BASE(ms)",
+                                              "CHANGE"))
+    for (name, elapsed) in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print("{:<60} {:>12.3f} {:>12} {:>8}".format(
+                name, elapsed * 1e3, "-", "-"))
+            continue
+        change = (elapsed - base) / base * 100 if base else 0.0
+        flag = ""
+        if change > args.threshold and (elapsed - base) * 1e3 > args.min_delta:
+            flag = "  REGRESSION"
+            regressions += 1
+        print("{:<60} {:>12.3f} {:>12.3f} {:>+7.1f}%{}".format(
+            name, elapsed * 1e3, base * 1e3, change, flag))
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)),
+                    exist_ok=True)
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "metrics": results,
+                },
+                baseline_file,
+                indent=4)
+        print("baseline saved to {}".format(args.baseline))
+
+    if regressions:
+        print("{} metric(s) regressed by more than {}%".format(
+            regressions, args.threshold))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Measure the per-node cost of walking a synthetic AVL tree, comparing
+the iterative walk of the "avl" walker (in both directions) against the
+recursive walk that it replaced.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable, Iterable, Tuple
+
+import drgn
+import sdb
+from sdb.commands.zfs.avl import Avl
+from tests import AVL_TREE_ADDR, setup_avl_mock_program
+
+
+def recursive_walk(prog: drgn.Program,
+                   tree: drgn.Object) -> Iterable[drgn.Object]:
+    """
+    The recursive walk that the "avl" walker used to do, kept here as
+    the reference point of the benchmark.
+    """
+    offset = int(tree.avl_offset)
+
+    def helper(node: drgn.Object) -> Iterable[drgn.Object]:
+        if node == drgn.NULL(prog, node.type_):
+            return
+        yield from helper(node.avl_child[0])
+        yield drgn.Object(prog, type="void *", value=int(node) - offset)
+        yield from helper(node.avl_child[1])
+
+    yield from helper(tree.avl_root)
+
+
+def iterative_walk(prog: drgn.Program,
+                   tree: drgn.Object) -> Iterable[drgn.Object]:
+    # pylint: disable=missing-docstring
+    return Avl(prog).walk(tree)
+
+
+def reverse_walk(prog: drgn.Program,
+                 tree: drgn.Object) -> Iterable[drgn.Object]:
+    # pylint: disable=missing-docstring
+    return Avl(prog, "-r").walk(tree)
+
+
+def per_node_ns(walk: Callable, prog: drgn.Program, nentries: int,
+                repeat: int) -> Tuple[float, float]:
+    """
+    Return the best per-node time, in nanoseconds, that it took to walk
+    the tree of the given program, along with the number of reads per
+    node that a walk did.
+    """
+    memory = sdb.get_target_memory(prog)
+    assert memory is not None and memory.accounting is not None
+    tree = drgn.Object(prog, "avl_tree_t *", value=AVL_TREE_ADDR)
+    best = float("inf")
+    reads = 0
+    for _ in range(repeat):
+        memory.accounting.reset()
+        start = time.perf_counter()
+        for _ in walk(prog, tree):
+            pass
+        best = min(best, time.perf_counter() - start)
+        reads = memory.accounting.reads
+    return (best * 1e9 / nentries, reads / nentries)
+
+
+def main() -> None:
+    # pylint: disable=missing-docstring
+    parser = argparse.ArgumentParser(prog="bench_avl")
+    parser.add_argument("-n", "--nodes", type=int, default=1000000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        prog = setup_avl_mock_program(os.path.join(tmpdir, "vmcore"),
+                                      args.nodes,
+                                      accounting=True)
+        walks = [
+            ("recursive", recursive_walk),
+            ("iterative", iterative_walk),
+            ("reverse", reverse_walk),
+        ]
+        print("{:<12} {:>12} {:>12}".format("WALK", "NODE(ns)", "READS/NODE"))
+        for (name, walk) in walks:
+            (node_ns, reads) = per_node_ns(walk, prog, args.nodes, args.repeat)
+            print("{:<12} {:>12.0f} {:>12.2f}".format(name, node_ns, reads))
+        sdb.get_target_memory(prog).close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Measure the cost of the small, scattered reads that walkers do on an
+ELF core dump, comparing drgn's own core dump reader (what
+prog.set_core_dump() sets up) against the readers of sdb.TargetMemory.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Callable, List
+
+import drgn
+import sdb
+from tests import create_elf_core
+
+SEGMENT_ADDR = 0xffff880000000000
+
+
+def new_program() -> drgn.Program:
+    # pylint: disable=missing-docstring
+    return drgn.Program(
+        drgn.Platform(
+            drgn.Architecture.X86_64, drgn.PlatformFlags.IS_LITTLE_ENDIAN
+            | drgn.PlatformFlags.IS_64_BIT))
+
+
+def drgn_program(path: str) -> drgn.Program:
+    # pylint: disable=missing-docstring
+    prog = drgn.Program()
+    prog.set_core_dump(path)
+    return prog
+
+
+def sdb_program(path: str, **kwargs) -> drgn.Program:
+    # pylint: disable=missing-docstring
+    prog = new_program()
+    sdb.TargetMemory(prog, path, **kwargs)
+    return prog
+
+
+def per_read_ns(setup: Callable[[], drgn.Program], addrs: List[int], size: int,
+                repeat: int) -> float:
+    """
+    Return the best per-read time, in nanoseconds, that it took to read
+    size bytes from each of the given addresses.
+    """
+    prog = setup()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for addr in addrs:
+            prog.read(addr, size)
+        best = min(best, time.perf_counter() - start)
+    memory = sdb.get_target_memory(prog)
+    if memory is not None:
+        memory.close()
+    return best * 1e9 / len(addrs)
+
+
+def main() -> None:
+    # pylint: disable=missing-docstring
+    parser = argparse.ArgumentParser(prog="bench_memory")
+    parser.add_argument("-m",
+                        "--megabytes",
+                        type=int,
+                        default=256,
+                        help="size of the synthetic core dump")
+    parser.add_argument("-n", "--reads", type=int, default=100000)
+    parser.add_argument("-s", "--size", type=int, default=8)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    memsz = args.megabytes << 20
+    rand = random.Random(0)
+    addrs = [
+        SEGMENT_ADDR + rand.randrange(0, memsz - args.size, 8)
+        for _ in range(args.reads)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "vmcore")
+        create_elf_core(path, [(SEGMENT_ADDR, os.urandom(memsz))])
+
+        setups = [
+            ("set_core_dump", lambda: drgn_program(path)),
+            ("pread", lambda: sdb_program(path)),
+            ("mmap", lambda: sdb_program(path, use_mmap=True)),
+            ("pread+cache",
+             lambda: sdb_program(path, cache_size=memsz, keep_cache=True)),
+        ]
+        print("{:<16} {:>12}".format("READER", "READ(ns)"))
+        for (name, setup) in setups:
+            print("{:<16} {:>12.0f}".format(
+                name, per_read_ns(setup, addrs, args.size, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
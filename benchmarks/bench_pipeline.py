@@ -0,0 +1,116 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Measure the per-object cost of executing a pipeline, comparing the
+plan-based sdb.Pipeline executor (both object by object and in
+batches) against the recursive executor that it replaced.
+"""
+
+import argparse
+import time
+from typing import Callable, Iterable, List
+
+import drgn
+import sdb
+from sdb.commands.cast import Cast
+from sdb.commands.echo import Echo
+from tests import MOCK_PROGRAM
+
+
+def recursive_execute(prog: drgn.Program, first_input: Iterable[drgn.Object],
+                      pipeline: List[sdb.Command]) -> Iterable[drgn.Object]:
+    """
+    The recursive executor that sdb.execute_pipeline used to be, kept
+    here as the reference point of the benchmark.
+    """
+    if pipeline[-1].input_type is not None:
+        pipeline.insert(-1, sdb.Coerce(prog, pipeline[-1].input_type))
+
+    if len(pipeline) == 1:
+        this_input = first_input
+    else:
+        this_input = recursive_execute(prog, first_input, pipeline[:-1])
+
+    yield from pipeline[-1].call(this_input)
+
+
+def planned_execute(prog: drgn.Program, first_input: Iterable[drgn.Object],
+                    pipeline: List[sdb.Command]) -> Iterable[drgn.Object]:
+    # pylint: disable=missing-docstring
+    return sdb.Pipeline(prog, pipeline).execute(first_input)
+
+
+def batched_execute(prog: drgn.Program, first_input: Iterable[drgn.Object],
+                    pipeline: List[sdb.Command]) -> Iterable[drgn.Object]:
+    # pylint: disable=missing-docstring
+    for batch in sdb.Pipeline(prog, pipeline).execute_batches(first_input):
+        yield from batch
+
+
+def make_pipeline(depth: int) -> List[sdb.Command]:
+    # pylint: disable=missing-docstring
+    pipeline: List[sdb.Command] = []
+    for i in range(depth):
+        if i % 2:
+            pipeline.append(Cast(MOCK_PROGRAM, "void *"))
+        else:
+            pipeline.append(Echo(MOCK_PROGRAM))
+    return pipeline
+
+
+def per_object_ns(executor: Callable, objs: List[drgn.Object], depth: int,
+                  repeat: int) -> float:
+    """
+    Return the best per-object time, in nanoseconds, that it took to
+    drain a pipeline of the given depth over objs.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        pipeline = make_pipeline(depth)
+        start = time.perf_counter()
+        for _ in executor(MOCK_PROGRAM, objs, pipeline):
+            pass
+        best = min(best, time.perf_counter() - start)
+    return best * 1e9 / len(objs)
+
+
+def main() -> None:
+    # pylint: disable=missing-docstring
+    parser = argparse.ArgumentParser(prog="bench_pipeline")
+    parser.add_argument("-n", "--objects", type=int, default=100000)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("-d",
+                        "--depth",
+                        type=int,
+                        action="append",
+                        help="pipeline depths to measure")
+    args = parser.parse_args()
+
+    objs = [
+        drgn.Object(MOCK_PROGRAM, "void *", value=i)
+        for i in range(args.objects)
+    ]
+    print("{:>6} {:>14} {:>14} {:>14}".format("DEPTH", "RECURSIVE(ns)",
+                                              "PLANNED(ns)", "BATCHED(ns)"))
+    for depth in args.depth or [1, 2, 4, 8, 16]:
+        print("{:>6} {:>14.0f} {:>14.0f} {:>14.0f}".format(
+            depth, per_object_ns(recursive_execute, objs, depth, args.repeat),
+            per_object_ns(planned_execute, objs, depth, args.repeat),
+            per_object_ns(batched_execute, objs, depth, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
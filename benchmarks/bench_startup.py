@@ -0,0 +1,125 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Measure the startup cost of pointing sdb at a directory of kernel
+modules (e.g. /lib/modules/<version>): the time it takes to find the
+modules with different numbers of scanning threads, and, optionally,
+the time it takes to load the debug info of all of them compared to
+only the ones that pass a --module filter.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable, List
+
+import drgn
+from sdb.internal.cli import ModuleFilter, debug_info_files
+
+
+def make_tree(root: str, dirs: int, modules: int) -> None:
+    """
+    Create a synthetic tree of (empty) kernel modules, spread over the
+    given number of directories.
+    """
+    for num in range(modules):
+        path = os.path.join(root, "kernel", "d{}".format(num % dirs // 10),
+                            "d{}".format(num % dirs))
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "m{}.ko".format(num)), "w"):
+            pass
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    # pylint: disable=missing-docstring
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def load_time(files: List[str]) -> float:
+    """
+    Return the time it takes to load the debug info of the given files
+    for the running kernel.
+    """
+    prog = drgn.Program()
+    prog.set_kernel()
+    start = time.perf_counter()
+    try:
+        prog.load_debug_info(files)
+    except drgn.MissingDebugInfoError:
+        pass
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    # pylint: disable=missing-docstring
+    parser = argparse.ArgumentParser(prog="bench_startup")
+    parser.add_argument("-p",
+                        "--path",
+                        help="directory of kernel modules to measure;" +
+                        " a synthetic one is created if not given")
+    parser.add_argument("-d", "--dirs", type=int, default=2000)
+    parser.add_argument("-n", "--modules", type=int, default=6000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-t",
+                        "--threads",
+                        type=int,
+                        action="append",
+                        help="numbers of scanning threads to measure")
+    parser.add_argument("-M",
+                        "--module",
+                        action="append",
+                        help="module patterns to filter with")
+    parser.add_argument("--load",
+                        action="store_true",
+                        help="also measure the loading of debug info for" +
+                        " the running kernel (requires root)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = args.path
+        if path is None:
+            path = tmpdir
+            make_tree(path, args.dirs, args.modules)
+
+        print("{:>8} {:>12}".format("THREADS", "SCAN(ms)"))
+        for threads in args.threads or [1, 2, 4, 8, 16]:
+            elapsed = best_time(
+                lambda count=threads: debug_info_files([path], None, count),
+                args.repeat)
+            print("{:>8} {:>12.1f}".format(threads, elapsed * 1e3))
+
+        modules = debug_info_files([path])
+        module_filter = ModuleFilter(args.module or ["zfs", "spl", "icp"])
+        selected = [module for module in modules if module_filter(module)]
+        print()
+        print("{:>8} modules found, {} selected by {}".format(
+            len(modules), len(selected), " ".join(module_filter.allow)))
+
+        if args.load:
+            print("{:<16} {:>12}".format("LOAD", "TIME(ms)"))
+            print("{:<16} {:>12.1f}".format("all", load_time(modules) * 1e3))
+            print("{:<16} {:>12.1f}".format("selected",
+                                            load_time(selected) * 1e3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+The measurements of the startup and first-command latency suite. What
+they measure depends on the state of the interpreter (e.g. whether sdb
+or a command module was already imported), so the harness in
+benchmarks/__main__.py runs each of them in a fresh interpreter:
+
+    $ python3 -m benchmarks.latency pipeline -l 'echo 0 | filter obj == 0'
+
+Every measurement prints the times that it took, in seconds, as a JSON
+object keyed by metric name.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+#
+# The pipelines whose first and Nth invocation are measured by default,
+# picked to go through the commands that most sessions start with.
+#
+PIPELINES = [
+    "echo 0x0 | cast void *",
+    "addr global_struct | member ts_int",
+    "echo 0 1 2 3 | filter obj > 1",
+    "addr global_struct | member ts_int | filter obj == 1",
+]
+
+Measurement = Callable[[argparse.Namespace], Dict[str, float]]
+MEASUREMENTS: Dict[str, Measurement] = {}
+
+
+def measurement(name: str) -> Callable[[Measurement], Measurement]:
+    # pylint: disable=missing-docstring
+    def register(func: Measurement) -> Measurement:
+        MEASUREMENTS[name] = func
+        return func
+
+    return register
+
+
+@measurement("import")
+def measure_import(_args: argparse.Namespace) -> Dict[str, float]:
+    """
+    The time it takes to import sdb, which includes declaring all the
+    commands of the manifest.
+    """
+    # pylint: disable=import-outside-toplevel,unused-import
+    start = time.perf_counter()
+    import sdb
+    return {"import sdb": time.perf_counter() - start}
+
+
+@measurement("vocabulary")
+def measure_vocabulary(_args: argparse.Namespace) -> Dict[str, float]:
+    """
+    The time it takes to build the vocabulary of the REPL and to
+    complete a command name from it, once sdb is imported.
+    """
+    # pylint: disable=import-outside-toplevel
+    import sdb
+    start = time.perf_counter()
+    vocabulary = list(sdb.all_commands)
+    completions = [name for name in vocabulary if name.startswith("f")]
+    assert completions
+    return {"vocabulary": time.perf_counter() - start}
+
+
+def make_target(tmpdir: str) -> List[str]:
+    """
+    Create a synthetic core dump, along with an object file that has no
+    debug info, and return the sdb arguments that target them. The core
+    has no notes to find default debug info with, so only the object
+    file is loaded.
+    """
+    # pylint: disable=import-outside-toplevel
+    from tests import create_elf_core
+
+    core = os.path.join(tmpdir, "vmcore")
+    create_elf_core(core,
+                    [(0xffff888000000000 + num * (1 << 20), bytes(64 << 10))
+                     for num in range(64)])
+    obj = os.path.join(tmpdir, "vmlinux")
+    create_elf_core(obj, [])
+    return ["--quiet", "--no-index-cache", "-A", obj, core]
+
+
+@measurement("setup_target")
+def measure_setup_target(_args: argparse.Namespace) -> Dict[str, float]:
+    """
+    The time it takes to set up the target of a synthetic core dump,
+    once sdb is imported.
+    """
+    # pylint: disable=import-outside-toplevel
+    from sdb.internal.cli import parse_arguments, setup_target
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sys.argv = ["sdb"] + make_target(tmpdir)
+        sdb_args = parse_arguments()
+        start = time.perf_counter()
+        setup_target(sdb_args)
+        return {"setup_target": time.perf_counter() - start}
+
+
+@measurement("pipeline")
+def measure_pipeline(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    The time it takes to invoke the given pipeline on the basic mock
+    program for the first time, and, after that, the median time of its
+    next invocations.
+    """
+    # pylint: disable=import-outside-toplevel
+    from tests import MOCK_PROGRAM, invoke
+
+    start = time.perf_counter()
+    invoke(MOCK_PROGRAM, [], args.line)
+    first = time.perf_counter() - start
+
+    times = []
+    for _ in range(args.nth):
+        start = time.perf_counter()
+        invoke(MOCK_PROGRAM, [], args.line)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        "first: " + args.line: first,
+        "nth: " + args.line: times[len(times) // 2],
+    }
+
+
+def main() -> None:
+    # pylint: disable=missing-docstring
+    parser = argparse.ArgumentParser(prog="latency")
+    parser.add_argument("measurement", choices=sorted(MEASUREMENTS))
+    parser.add_argument("-l", "--line", default=PIPELINES[0])
+    parser.add_argument("-n", "--nth", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(MEASUREMENTS[args.measurement](args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -15,14 +15,17 @@
 #
 """This module enables integration with the SDB REPL."""
 
-from typing import Dict, Type
+import functools
+from typing import Optional, Tuple, Type
+
+from sdb.registry import *
 
 #
 # The _register_command is used by the sdb.Command class when its
 # subclasses are initialized (the classes, not the objects), so we must
 # define it here, before we import those classes below.
 #
-all_commands: Dict[str, Type["sdb.Command"]] = {}
+all_commands: Registry = Registry()
 
 
 def register_command(name: str, class_: Type["sdb.Command"]) -> None:
@@ -37,40 +40,39 @@ def register_command(name: str, class_: Type["sdb.Command"]) -> None:
 from sdb.command import *
 from sdb.coerce import *
 from sdb.error import *
+from sdb.type_cache import *
+from sdb.dispatcher import *
 from sdb.locator import *
 from sdb.pretty_printer import *
 from sdb.walker import *
+from sdb.pipeline import *
+from sdb.profiler import *
+from sdb.memory import *
+from sdb.fields import *
+from sdb.intset import *
 
 #
 # The SDB commands build on top of all the SDB "infrastructure" imported
-# above, so we must be sure to import all of the commands last.
+# above, so we must be sure to declare all of the commands last. Their
+# modules are only imported once they are used (see sdb.Registry).
 #
-import sdb.commands  # pylint: disable=wrong-import-position
+declare_manifest(
+    {
+        "command": all_commands,
+        "walker": Walker.allWalkers,
+        "printer": PrettyPrinter.all_printers,
+    }, build_manifest(manifest_packages()))
 
 
 def execute_pipeline(prog: drgn.Program, first_input: Iterable[drgn.Object],
                      pipeline: List["sdb.Command"]) -> Iterable[drgn.Object]:
     """
     This function executes the specified pipeline (i.e. the list of
-    sdb.Command objects) and yields the output. It recurses through,
-    providing each sdb.Command of the pipeline the earlier sdb.Command's
-    output as input.
+    sdb.Command objects) and yields the output. The list is compiled
+    into an sdb.Pipeline, which provides each sdb.Command of the
+    pipeline the earlier sdb.Command's output as input.
     """
-
-    #
-    # If the last stage wants its input to be of a certain type, we
-    # automatically insert a "coerce" stage before it, so that the input
-    # can be safely coerced into the type that it wants.
-    #
-    if pipeline[-1].input_type is not None:
-        pipeline.insert(-1, sdb.Coerce(prog, pipeline[-1].input_type))
-
-    if len(pipeline) == 1:
-        this_input = first_input
-    else:
-        this_input = execute_pipeline(prog, first_input, pipeline[:-1])
-
-    yield from pipeline[-1].call(this_input)
+    yield from Pipeline(prog, pipeline).execute(first_input)
 
 
 def execute_pipeline_term(prog: drgn.Program,
@@ -82,39 +84,27 @@ def execute_pipeline_term(prog: drgn.Program,
     used (rather than execute_pipeline) when the last sdb.Command in the
     pipeline doesn't yield any results.
     """
+    Pipeline(prog, pipeline).execute(first_input)
 
-    #
-    # If the last stage wants its input to be of a certain type, we
-    # automatically insert a "coerce" stage before it, so that the input
-    # can be safely coerced into the type that it wants.
-    #
-    if pipeline[-1].input_type is not None:
-        pipeline.insert(-1, sdb.Coerce(prog, pipeline[-1].input_type))
-
-    if len(pipeline) == 1:
-        this_input = first_input
-    else:
-        this_input = execute_pipeline(prog, first_input, pipeline[:-1])
 
-    pipeline[-1].call(this_input)
+#
+# The maximum number of distinct lines whose parsed form is remembered
+# by invoke(). Scripted sessions tend to run the same few lines over and
+# over, and for short pipelines the lexing would otherwise dominate.
+#
+PARSE_CACHE_SIZE = 512
 
 
-def invoke(prog: drgn.Program, first_input: Iterable[drgn.Object],
-           line: str) -> Optional[Iterable[drgn.Object]]:
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _split_line(
+        line: str
+) -> Optional[Tuple[Tuple[Tuple[str, str], ...], Optional[str]]]:
     """
-    This function intends to integrate directly with the SDB REPL, such
-    that the REPL will pass in the user-specified line, and this
-    function is responsible for converting that string into the
-    appropriate pipeline of sdb.Command objects, and executing it.
+    Split the given line into the (name, arguments) pairs of its
+    pipeline stages, plus the shell command that the output should be
+    piped into, if any. None is returned for lines that can't be split.
     """
-
-    # pylint: disable=too-many-locals
-    # pylint: disable=too-many-branches
-    # pylint: disable=too-many-statements
-
     import shlex
-    import subprocess
-    import sys
 
     shell_cmd = None
     # Parse the argument string. Each pipeline stage is delimited by
@@ -132,8 +122,7 @@ def invoke(prog: drgn.Program, first_input: Iterable[drgn.Object],
         elif token == "!":
             pipe_stages.append(" ".join(tokens))
             if any(t == "!" for t in all_tokens[num + 1:]):
-                print("Multiple ! not supported")
-                return
+                return None
             shell_cmd = " ".join(all_tokens[num + 1:])
             break
         else:
@@ -143,11 +132,53 @@ def invoke(prog: drgn.Program, first_input: Iterable[drgn.Object],
         # the last pipe
         pipe_stages.append(" ".join(tokens))
 
-    # Build the pipeline by constructing each of the commands we want to
-    # use and building a list of them.
-    pipeline = []
+    stages = []
     for stage in pipe_stages:
         (name, _, args) = stage.strip().partition(" ")
+        stages.append((name, args))
+    return (tuple(stages), shell_cmd)
+
+
+def invoke(prog: drgn.Program, first_input: Iterable[drgn.Object],
+           line: str) -> Optional[Iterable[drgn.Object]]:
+    """
+    This function intends to integrate directly with the SDB REPL, such
+    that the REPL will pass in the user-specified line, and this
+    function is responsible for converting that string into the
+    appropriate pipeline of sdb.Command objects, and executing it.
+
+    If the line is prefixed with "profile", the pipeline is executed
+    under an sdb.Profiler and its per-stage report is printed out once
+    the pipeline is done, along with a note if memory reads were not
+    counted.
+    """
+
+    # pylint: disable=too-many-locals
+    # pylint: disable=too-many-branches
+    # pylint: disable=too-many-statements
+
+    import subprocess
+    import sys
+
+    split = _split_line(line)
+    if split is None:
+        print("Multiple ! not supported")
+        return
+    (stages, shell_cmd) = split
+
+    profile = stages[0][0] == "profile"
+    if profile:
+        (name, _, args) = stages[0][1].strip().partition(" ")
+        if not name:
+            raise CommandInvalidInputError("profile", "no pipeline to profile")
+        stages = ((name, args),) + stages[1:]
+
+    # Build the pipeline by constructing each of the commands we want to
+    # use and building a list of them. The arguments of each command are
+    # parsed in its constructor, which reuses the results of earlier
+    # invocations with the same arguments (see sdb.Command).
+    pipeline = []
+    for (name, args) in stages:
         if name not in all_commands:
             raise CommandNotFoundError(name)
         try:
@@ -162,6 +193,16 @@ def invoke(prog: drgn.Program, first_input: Iterable[drgn.Object],
             raise CommandArgumentsError(name)
 
     pipeline[-1].islast = True
+    plan = Pipeline(prog, pipeline)
+
+    #
+    # Unless we were asked to keep it for the whole session, don't let
+    # this pipeline see what earlier ones cached from the memory of the
+    # target, which may have changed since if the target is live.
+    #
+    memory = get_target_memory(prog)
+    if memory is not None and not memory.keep_cache:
+        memory.invalidate()
 
     # If we have a !, redirect stdout to a shell process. This avoids
     # having to have a custom printing function that we pass around and
@@ -175,11 +216,17 @@ def invoke(prog: drgn.Program, first_input: Iterable[drgn.Object],
         old_stdout = sys.stdout
         sys.stdout = shell_proc.stdin  # type: ignore
 
+    profiler = None
+    if profile:
+        profiler = Profiler()
+        add_stage_monitor(profiler)
+
     try:
-        if pipeline[-1].ispipeable:
-            yield from execute_pipeline(prog, first_input, pipeline)
+        if plan.ispipeable:
+            for batch in plan.execute_batches(first_input):
+                yield from batch
         else:
-            execute_pipeline_term(prog, first_input, pipeline)
+            plan.execute_batches(first_input)
 
         if shell_cmd is not None:
             shell_proc.stdin.flush()
@@ -188,6 +235,20 @@ def invoke(prog: drgn.Program, first_input: Iterable[drgn.Object],
     except BrokenPipeError:
         pass
     finally:
+        if profiler is not None:
+            remove_stage_monitor(profiler)
+            profiler.stop()
         if shell_cmd is not None:
             sys.stdout = old_stdout
             shell_proc.wait()
+
+    if profiler is not None:
+        profiler.report()
+        #
+        # Reads done through drgn's own readers can't be counted, so
+        # make it clear that the report has no read columns because of
+        # that, rather than because there were no reads.
+        #
+        if memory is None or memory.accounting is None:
+            print("memory reads are not counted;" +
+                  " start sdb with --read-stats to count them")
@@ -16,7 +16,7 @@
 """This module contains the "sdb.Coerce" class."""
 
 import argparse
-from typing import Iterable
+from typing import Iterable, List
 
 import drgn
 import sdb
@@ -30,13 +30,15 @@ class Coerce(sdb.Command):
     to the appropriate pointer type.
     """
 
+    one_to_one = True
+
     def __init__(self, prog: drgn.Program, args: str = "",
                  name: str = "_") -> None:
         super().__init__(prog, args, name)
         if not self.args.type:
             self.parser.error("the following arguments are required: type")
 
-        self.type = self.prog.type(" ".join(self.args.type))
+        self.type = sdb.get_type(self.prog, " ".join(self.args.type))
 
         if self.type.kind is not drgn.TypeKind.POINTER:
             raise TypeError("can only coerce to pointer types, not {}".format(
@@ -51,7 +53,6 @@ class Coerce(sdb.Command):
         # the parsed arguments, and explicitly throw an error if needed.
         #
         parser.add_argument("type", nargs=argparse.REMAINDER)
-        self.parser = parser
 
     def coerce(self, obj: drgn.Object) -> drgn.Object:
         """
@@ -82,3 +83,9 @@ class Coerce(sdb.Command):
     def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
         for obj in objs:
             yield self.coerce(obj)
+
+    def call_batch(
+            self, batches: Iterable[List[drgn.Object]]
+    ) -> Iterable[List[drgn.Object]]:
+        for batch in batches:
+            yield [self.coerce(obj) for obj in batch]
@@ -16,12 +16,81 @@
 """This module contains the "sdb.Command" class."""
 
 import argparse
+import copy
 import inspect
-from typing import Iterable, List, Optional
+import itertools
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple, Type
 
 import drgn
 import sdb
 
+#
+# The number of objects that pipeline stages exchange at a time when a
+# pipeline is executed in batches (see Command.call_batch()).
+#
+BATCH_SIZE = 1024
+
+
+def batched(objs: Iterable[drgn.Object],
+            size: int = BATCH_SIZE,
+            start: Optional[int] = None) -> Iterable[List[drgn.Object]]:
+    """
+    This function splits the objects of the given iterable into lists
+    (batches) of up to the specified size. If start is given, the first
+    batch holds up to start objects instead, and each batch after it up
+    to twice as many as the one before it, until the size is reached.
+    """
+    it = iter(objs)
+    step = size if start is None else min(start, size)
+    while True:
+        batch = list(itertools.islice(it, step))
+        if not batch:
+            return
+        yield batch
+        step = min(2 * step, size)
+
+
+def _limited(objs: Iterable[drgn.Object], limit: int) -> Iterable[drgn.Object]:
+    #
+    # The source of the objects is closed as soon as the last object
+    # that is allowed through has been produced, before that object is
+    # passed on, rather than when we are asked for the object after it.
+    #
+    it = iter(objs)
+    last = None
+    try:
+        if limit > 0:
+            yield from itertools.islice(it, limit - 1)
+            last = next(it, None)
+    finally:
+        close = getattr(it, "close", None)
+        if close is not None:
+            close()
+    if last is not None:
+        yield last
+
+
+#
+# Every command class parses its arguments with the same argparse
+# parser, regardless of the invocation, so the parsers are built only
+# once per command class (and name, which argparse uses in its usage
+# messages).
+#
+_PARSERS: Dict[Tuple[Type["Command"], str], argparse.ArgumentParser] = {}
+
+#
+# The arguments that a command is invoked with tend to repeat (e.g. in
+# scripts running the same lines over and over), so we also keep the
+# results of the most recent parses around, up to PARSED_ARGS_CACHE_SIZE
+# of them. Each command gets its own copy of the parsed arguments, such
+# that any state that a command keeps in them (e.g. the countdown of
+# "head") starts anew on every invocation.
+#
+PARSED_ARGS_CACHE_SIZE = 1024
+_PARSED_ARGS: "OrderedDict[Tuple[Type[Command], str, str], argparse.Namespace]" = (
+    OrderedDict())
+
 
 class Command:
     """
@@ -52,20 +121,50 @@ class Command:
 
     input_type: Optional[str] = None
 
+    #
+    # ispipeable:
+    #    Whether the command yields any results. This is decided
+    #    once per class, based on the return annotation of call().
+    #
+    ispipeable: bool = False
+
+    #
+    # limit:
+    #    Set when the pipeline is planned, if no more than this many
+    #    objects of the output of the command will be consumed (e.g.
+    #    when it is followed by "head N"). Commands that produce their
+    #    output from a data structure should stop walking it once they
+    #    have produced that many objects (see limited()).
+    #
+    limit: Optional[int] = None
+
+    #
+    # bounded:
+    #    Set when the pipeline is planned, if a command like "head N"
+    #    comes after this one, past a command that isn't one_to_one
+    #    (e.g. "filter"). We then can't tell how much of the output of
+    #    the command will be consumed, but it may be very little, so the
+    #    command starts with small batches that grow geometrically,
+    #    rather than producing a whole BATCH_SIZE batch up front (see
+    #    limited_batches()).
+    #
+    bounded: bool = False
+
+    #
+    # one_to_one:
+    #    Whether the command passes on exactly one object for every
+    #    object of its input (e.g. "cast"), in which case a limit on its
+    #    output is also a limit on its input.
+    #
+    one_to_one: bool = False
+
     def __init__(self, prog: drgn.Program, args: str = "",
                  name: str = "_") -> None:
         self.prog = prog
         self.name = name
         self.islast = False
-        self.ispipeable = False
-
-        if inspect.signature(
-                self.call).return_annotation == Iterable[drgn.Object]:
-            self.ispipeable = True
-
-        parser = argparse.ArgumentParser(prog=name)
-        self._init_argparse(parser)
-        self.args = parser.parse_args(args.split())
+        self.parser = self._get_parser(name)
+        self.args = self._parse_args(name, args)
 
     def __init_subclass__(cls, **kwargs):
         """
@@ -74,9 +173,32 @@ class Command:
         SDB REPL.
         """
         super().__init_subclass__(**kwargs)
+        cls.ispipeable = inspect.signature(
+            cls.call).return_annotation == Iterable[drgn.Object]
         for name in cls.names:
             sdb.register_command(name, cls)
 
+    def _get_parser(self, name: str) -> argparse.ArgumentParser:
+        key = (type(self), name)
+        parser = _PARSERS.get(key)
+        if parser is None:
+            parser = argparse.ArgumentParser(prog=name)
+            self._init_argparse(parser)
+            _PARSERS[key] = parser
+        return parser
+
+    def _parse_args(self, name: str, args: str) -> argparse.Namespace:
+        key = (type(self), name, args)
+        parsed = _PARSED_ARGS.get(key)
+        if parsed is None:
+            parsed = self.parser.parse_args(args.split())
+            _PARSED_ARGS[key] = parsed
+            if len(_PARSED_ARGS) > PARSED_ARGS_CACHE_SIZE:
+                _PARSED_ARGS.popitem(last=False)
+        else:
+            _PARSED_ARGS.move_to_end(key)
+        return copy.copy(parsed)
+
     def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
         pass
 
@@ -84,3 +206,81 @@ class Command:
              objs: Iterable[drgn.Object]) -> Optional[Iterable[drgn.Object]]:
         # pylint: disable=missing-docstring
         raise NotImplementedError
+
+    def call_batch(
+        self, batches: Iterable[List[drgn.Object]]
+    ) -> Optional[Iterable[List[drgn.Object]]]:
+        """
+        This is the batched counterpart of call(). Rather than consuming
+        and yielding one object at a time, it consumes and yields lists
+        of objects, amortizing the per-object overhead of passing each
+        object through the generators of the pipeline.
+
+        Commands that can process a whole batch at once should override
+        this method. The default implementation is a shim for commands
+        that only implement call(); it flattens its input batches and
+        splits the output of call() into batches again.
+        """
+        objs = self.call(itertools.chain.from_iterable(batches))
+        if objs is None:
+            return None
+        return self.limited_batches(objs)
+
+    def fuse(self, cmd: "Command") -> bool:
+        """
+        Called when a pipeline is planned, with the command that comes
+        right after this one. A command that can do the work of the
+        given command as part of its own (e.g. two consecutive filters
+        checking both conditions in a single pass) should update itself
+        to do so and return True, in which case the given command is
+        left out of the plan. By default, commands are never fused.
+        """
+        # pylint: disable=unused-argument,no-self-use
+        return False
+
+    def tail_limit(self) -> Optional[int]:
+        """
+        Return N if this command only passes on the last N objects of
+        its input (e.g. "tail N"), or None otherwise. The command before
+        it can then fuse with it (see fuse()) and only produce those N
+        objects, if it is able to find them from the end of its output.
+        """
+        # pylint: disable=no-self-use
+        return None
+
+    def head_limit(self) -> Optional[int]:
+        """
+        Return N if this command only passes on the first N objects of
+        its input (e.g. "head N"), or None otherwise. When the pipeline
+        is planned, N becomes the limit of the commands before it (see
+        the "limit" attribute), up to the first one that isn't
+        one_to_one.
+        """
+        # pylint: disable=no-self-use
+        return None
+
+    def limited(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
+        """
+        Return the given output of the command, cut off after self.limit
+        objects if a limit was set. The generator that produced the
+        output is then closed right away, so that any generators that it
+        delegates to (e.g. the recursive walk of a tree) are closed too,
+        rather than left suspended until they are garbage collected.
+        """
+        if self.limit is None:
+            return objs
+        return _limited(objs, self.limit)
+
+    def limited_batches(
+            self, objs: Iterable[drgn.Object]) -> Iterable[List[drgn.Object]]:
+        """
+        Split the given output of the command into batches, like
+        batched(), while honoring self.limit (see limited()) and
+        self.bounded. Batches are no larger than the limit, so that a
+        batch never waits for objects that will not be consumed.
+        """
+        start = 1 if self.bounded else None
+        if self.limit is None:
+            return batched(objs, BATCH_SIZE, start)
+        return batched(_limited(objs, self.limit),
+                       max(1, min(BATCH_SIZE, self.limit)), start)
@@ -16,15 +16,9 @@
 
 # pylint: disable=missing-docstring
 
-import glob
-import importlib
-import os
-
-for path in glob.glob("{}/*.py".format(os.path.dirname(__file__))):
-    if path != __file__:
-        module = os.path.splitext(os.path.basename(path))[0]
-        importlib.import_module("sdb.commands.{}".format(module))
-
-for path in glob.glob("{}/*/__init__.py".format(os.path.dirname(__file__))):
-    module = os.path.basename(os.path.dirname(path))
-    importlib.import_module("sdb.commands.{}".format(module))
+#
+# The modules of this package are not imported here. They are listed in
+# the manifest that sdb builds when it is imported, and each one is only
+# imported once one of the commands that it defines is used (see
+# sdb.Registry).
+#
@@ -0,0 +1,244 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import argparse
+import collections
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import drgn
+import sdb
+from sdb.commands.project import parse_member
+
+
+def member_values(name: str, reader: sdb.FieldReader,
+                  batch: List[drgn.Object]) -> List[Any]:
+    """
+    Return the values of the member of the given reader for a batch of
+    objects, on behalf of the command of the given name.
+    """
+    try:
+        return reader.values(batch)
+    except (LookupError, TypeError) as err:
+        raise sdb.CommandError(name, str(err))
+
+
+def format_value(value: Any, layout: Optional[sdb.FieldLayout]) -> str:
+    """
+    Return the given value of a member with the given layout as it
+    should be printed: strings are decoded and pointers are printed in
+    hex.
+    """
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    if layout is not None and not layout.is_number and isinstance(value, int):
+        return hex(value)
+    return str(value)
+
+
+class Summary:
+    """
+    The count, sum, minimum and maximum of a stream of values, updated
+    one batch of values at a time, so it takes constant memory however
+    long the stream is.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total: Any = 0
+        self.minimum: Any = None
+        self.maximum: Any = None
+
+    def update(self, values: List[Any]) -> None:
+        """
+        Account for the given values. Each aggregate of the batch is
+        computed by a single builtin call, rather than value by value.
+        """
+        if not values:
+            return
+        self.count += len(values)
+        self.total += sum(values)
+        low = min(values)
+        high = max(values)
+        if self.minimum is None or low < self.minimum:
+            self.minimum = low
+        if self.maximum is None or high > self.maximum:
+            self.maximum = high
+
+    def mean(self) -> Optional[float]:
+        # pylint: disable=missing-docstring
+        if not self.count:
+            return None
+        return self.total / self.count
+
+
+class Count(sdb.Command):
+    # pylint: disable=too-few-public-methods
+
+    names = ["count"]
+
+    def call(self, objs: Iterable[drgn.Object]) -> None:
+        print(sum(1 for _ in objs))
+
+    def call_batch(self, batches: Iterable[List[drgn.Object]]) -> None:
+        print(sum(len(batch) for batch in batches))
+
+
+class Sum(sdb.Command):
+    # pylint: disable=too-few-public-methods
+
+    names = ["sum"]
+
+    def __init__(self, prog: drgn.Program, args: str = "",
+                 name: str = "_") -> None:
+        super().__init__(prog, args, name)
+        self.reader = sdb.FieldReader(
+            prog, parse_member(self.parser, self.args.member))
+
+    def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("member", metavar="<member>")
+
+    def call(self, objs: Iterable[drgn.Object]) -> None:
+        self.call_batch(sdb.batched(objs))
+
+    def call_batch(self, batches: Iterable[List[drgn.Object]]) -> None:
+        total: Any = 0
+        try:
+            for batch in batches:
+                total += sum(member_values(self.name, self.reader, batch))
+        except TypeError as err:
+            raise sdb.CommandError(
+                self.name, "cannot sum {}: {}".format(self.args.member, err))
+        print(total)
+
+
+class Summarize(sdb.Command):
+    # pylint: disable=too-few-public-methods
+
+    names = ["summarize"]
+
+    def __init__(self, prog: drgn.Program, args: str = "",
+                 name: str = "_") -> None:
+        super().__init__(prog, args, name)
+        self.reader = sdb.FieldReader(
+            prog, parse_member(self.parser, self.args.member))
+
+    def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "member",
+            metavar="<member>",
+            help="print the count, sum, minimum, maximum and mean of this" +
+            " member of the input objects")
+
+    def call(self, objs: Iterable[drgn.Object]) -> None:
+        self.call_batch(sdb.batched(objs))
+
+    def call_batch(self, batches: Iterable[List[drgn.Object]]) -> None:
+        summary = Summary()
+        layout = None
+        for batch in batches:
+            if layout is None:
+                layout = self.reader.layout(batch[0].type_)
+            try:
+                summary.update(member_values(self.name, self.reader, batch))
+            except TypeError as err:
+                raise sdb.CommandError(
+                    self.name,
+                    "cannot summarize {}: {}".format(self.args.member, err))
+
+        mean = summary.mean()
+        print("{:<24} {:>20}".format("", self.args.member.upper()))
+        print("{:<24} {:>20}".format("count", summary.count))
+        print("{:<24} {:>20}".format("sum", summary.total))
+        for (label, value) in [("min", summary.minimum),
+                               ("max", summary.maximum)]:
+            print("{:<24} {:>20}".format(
+                label, "-" if value is None else format_value(value, layout)))
+        print("{:<24} {:>20}".format(
+            "mean", "-" if mean is None else "{:.2f}".format(mean)))
+
+
+class GroupBy(sdb.Command):
+    # pylint: disable=too-few-public-methods
+
+    names = ["groupby"]
+
+    def __init__(self, prog: drgn.Program, args: str = "",
+                 name: str = "_") -> None:
+        super().__init__(prog, args, name)
+        self.key_reader = sdb.FieldReader(
+            prog, parse_member(self.parser, self.args.member))
+
+        #
+        # Each group is either counted (the default) or sums up the
+        # given member of its objects.
+        #
+        self.sum_reader: Optional[sdb.FieldReader] = None
+        aggregate = self.args.aggregate
+        if aggregate and aggregate[0] == "sum" and len(aggregate) == 2:
+            self.sum_reader = sdb.FieldReader(
+                prog, parse_member(self.parser, aggregate[1]))
+        elif aggregate not in ([], ["count"]):
+            self.parser.error(
+                "expected 'count' or 'sum <member>' after the member")
+
+    def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("member", metavar="<member>")
+        parser.add_argument("aggregate",
+                            nargs="*",
+                            metavar="count | sum <member>")
+
+    def _aggregate(
+        self, batches: Iterable[List[drgn.Object]]
+    ) -> Tuple[Dict[Any, Any], Optional[sdb.FieldLayout]]:
+        groups: Dict[Any, Any] = collections.Counter()
+        layout = None
+        for batch in batches:
+            if layout is None:
+                layout = self.key_reader.layout(batch[0].type_)
+            keys = member_values(self.name, self.key_reader, batch)
+            if self.sum_reader is None:
+                try:
+                    groups.update(keys)
+                except TypeError as err:
+                    raise sdb.CommandError(
+                        self.name,
+                        "cannot group by {}: {}".format(self.args.member, err))
+                continue
+            values = member_values(self.name, self.sum_reader, batch)
+            try:
+                for (key, value) in zip(keys, values):
+                    groups[key] += value
+            except TypeError as err:
+                raise sdb.CommandError(
+                    self.name,
+                    "cannot sum {}: {}".format(self.args.aggregate[1], err))
+        return (groups, layout)
+
+    def call(self, objs: Iterable[drgn.Object]) -> None:
+        self.call_batch(sdb.batched(objs))
+
+    def call_batch(self, batches: Iterable[List[drgn.Object]]) -> None:
+        (groups, layout) = self._aggregate(batches)
+        if self.sum_reader is None:
+            header = "COUNT"
+        else:
+            header = "SUM({})".format(self.args.aggregate[1])
+        print("{:<24} {:>20}".format(self.args.member.upper(), header))
+        for key in sorted(groups):
+            print("{:<24} {:>20}".format(format_value(key, layout),
+                                         groups[key]))
@@ -17,7 +17,7 @@
 # pylint: disable=missing-docstring
 
 import argparse
-from typing import Iterable
+from typing import Iterable, List
 
 import drgn
 import sdb
@@ -27,6 +27,7 @@ class Cast(sdb.Command):
     # pylint: disable=too-few-public-methods
 
     names = ["cast"]
+    one_to_one = True
 
     def __init__(self, prog: drgn.Program, args: str = "",
                  name: str = "_") -> None:
@@ -34,7 +35,7 @@ class Cast(sdb.Command):
         if not self.args.type:
             self.parser.error("the following arguments are required: type")
 
-        self.type = self.prog.type(" ".join(self.args.type))
+        self.type = sdb.get_type(self.prog, " ".join(self.args.type))
 
     def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
         #
@@ -45,8 +46,13 @@ class Cast(sdb.Command):
         # the parsed arguments, and explicitly throw an error if needed.
         #
         parser.add_argument("type", nargs=argparse.REMAINDER)
-        self.parser = parser
 
     def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
         for obj in objs:
             yield drgn.cast(self.type, obj)
+
+    def call_batch(
+            self, batches: Iterable[List[drgn.Object]]
+    ) -> Iterable[List[drgn.Object]]:
+        for batch in batches:
+            yield [drgn.cast(self.type, obj) for obj in batch]
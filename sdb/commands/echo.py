@@ -17,7 +17,7 @@
 # pylint: disable=missing-docstring
 
 import argparse
-from typing import Iterable
+from typing import Iterable, List
 
 import drgn
 import sdb
@@ -31,13 +31,25 @@ class Echo(sdb.Command):
     def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
         parser.add_argument("addrs", nargs="*", metavar="<address>")
 
-    def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
-        for obj in objs:
-            yield obj
-
+    def _arg_objects(self) -> List[drgn.Object]:
+        objs = []
         for addr in self.args.addrs:
             try:
                 value_ = int(addr, 0)
             except ValueError:
                 raise sdb.CommandInvalidInputError(self.name, addr)
-            yield drgn.Object(self.prog, "void *", value=value_)
+            objs.append(drgn.Object(self.prog, "void *", value=value_))
+        return objs
+
+    def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
+        for obj in objs:
+            yield obj
+
+        yield from self._arg_objects()
+
+    def call_batch(
+            self, batches: Iterable[List[drgn.Object]]
+    ) -> Iterable[List[drgn.Object]]:
+        yield from batches
+
+        yield from sdb.batched(self._arg_objects())
@@ -17,11 +17,86 @@
 # pylint: disable=missing-docstring
 
 import argparse
-from typing import Iterable
+import operator
+from typing import Any, Callable, Iterable, List, Optional, Tuple
 
 import drgn
 import sdb
 
+Matcher = Callable[[drgn.Object], bool]
+
+#
+# The comparison operators that are supported, in the order that they
+# are looked for in the expression.
+#
+OPERATORS: List[Tuple[str, Callable[[Any, Any], bool]]] = [
+    ("==", operator.eq),
+    ("!=", operator.ne),
+    (">", operator.gt),
+    ("<", operator.lt),
+    (">=", operator.ge),
+    ("<=", operator.le),
+]
+
+_GLOBALS = {'__builtins__': None}
+
+
+def _split(expr: List[str], word: str) -> List[List[str]]:
+    parts: List[List[str]] = [[]]
+    for token in expr:
+        if token == word:
+            parts.append([])
+        else:
+            parts[-1].append(token)
+    return parts
+
+
+def _all_of(matchers: List[Matcher]) -> Matcher:
+    if len(matchers) == 1:
+        return matchers[0]
+
+    def match(obj: drgn.Object) -> bool:
+        for matcher in matchers:
+            if not matcher(obj):
+                return False
+        return True
+
+    return match
+
+
+def _any_of(matchers: List[Matcher]) -> Matcher:
+    if len(matchers) == 1:
+        return matchers[0]
+
+    def match(obj: drgn.Object) -> bool:
+        for matcher in matchers:
+            if matcher(obj):
+                return True
+        return False
+
+    return match
+
+
+def _evaluator(code: Any) -> Callable[[drgn.Object], Any]:
+    """
+    Return a function that evaluates the given code for an object. Code
+    that doesn't refer to the object is constant, so it is only
+    evaluated once, the first time that it is needed.
+    """
+    # pylint: disable=eval-used
+    if "obj" in code.co_names:
+        return lambda obj: eval(code, _GLOBALS, {'obj': obj})
+
+    folded: List[Any] = []
+
+    def constant(obj: drgn.Object) -> Any:
+        # pylint: disable=unused-argument
+        if not folded:
+            folded.append(eval(code, _GLOBALS, {}))
+        return folded[0]
+
+    return constant
+
 
 class Filter(sdb.Command):
     # pylint: disable=too-few-public-methods
@@ -35,11 +110,39 @@ class Filter(sdb.Command):
         if not self.args.expr:
             self.parser.error("the following arguments are required: expr")
 
+        #
+        # The expression is compiled once into a function that tells
+        # whether an object matches. Comparisons can be combined with
+        # "and" and "or", which have their usual precedence. Members of
+        # obj that are compared against are read through FieldReaders,
+        # which call_batch() prefetches for each batch.
+        #
+        self.readers: List[sdb.FieldReader] = []
+        self.match = _any_of([
+            _all_of([
+                self._compile_comparison(comparison)
+                for comparison in _split(alternative, "and")
+            ]) for alternative in _split(self.args.expr, "or")
+        ])
+
+        #
+        # The expression and readers of this filter alone, and the
+        # filters that it was fused with (see fuse()), including itself.
+        #
+        self.own_match = self.match
+        self.own_readers = list(self.readers)
+        self.fused: List["Filter"] = [self]
+
+    def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("expr", nargs=argparse.REMAINDER)
+
+    def _compile_comparison(self, expr: List[str]) -> Matcher:
+        # pylint: disable=too-many-locals
         index = None
-        operators = ["==", "!=", ">", "<", ">=", "<="]
-        for operator in operators:
+        compare = operator.eq
+        for (token, compare) in OPERATORS:
             try:
-                index = self.args.expr.index(operator)
+                index = expr.index(token)
                 # Use the first comparison operator we find.
                 break
             except ValueError:
@@ -58,7 +161,7 @@ class Filter(sdb.Command):
             raise sdb.CommandInvalidInputError(
                 self.name, "left hand side of expression is missing")
 
-        if index == len(self.args.expr) - 1:
+        if index == len(expr) - 1:
             # If the index is found to be at the very end of the list,
             # this means there's no right hand side of the comparison to
             # compare the left hand side to. This is an error.
@@ -66,50 +169,110 @@ class Filter(sdb.Command):
                 self.name, "right hand side of expression is missing")
 
         try:
-            self.lhs_code = compile(" ".join(self.args.expr[:index]),
-                                    "<string>", "eval")
-            self.rhs_code = compile(" ".join(self.args.expr[index + 1:]),
-                                    "<string>", "eval")
+            lhs_code = compile(" ".join(expr[:index]), "<string>", "eval")
+            rhs_code = compile(" ".join(expr[index + 1:]), "<string>", "eval")
         except SyntaxError as err:
             raise sdb.CommandEvalSyntaxError(self.name, err)
 
-        self.compare = self.args.expr[index]
+        if " ".join(expr[:index]) == "obj":
+            lhs_eval: Callable[[drgn.Object], Any] = lambda obj: obj
+        else:
+            lhs_eval = _evaluator(lhs_code)
+        reader = None
+        path = sdb.member_path(" ".join(expr[:index]))
+        if path is not None:
+            reader = sdb.FieldReader(self.prog, path)
+            self.readers.append(reader)
+        rhs_eval = _evaluator(rhs_code)
+        rhs_constant = "obj" not in rhs_code.co_names
 
-    def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
-        parser.add_argument("expr", nargs=argparse.REMAINDER)
-        self.parser = parser
+        #
+        # Integers on the right hand side are converted to the type of
+        # the left hand side before they are compared. For a constant
+        # integer, the result of the conversion is kept for as long as
+        # the left hand side keeps the same type.
+        #
+        last_type: Optional[drgn.Type] = None
+        last_value: Any = None
+
+        def convert(type_: drgn.Type, value: int) -> Any:
+            nonlocal last_type, last_value
+            if rhs_constant and last_type is not None and (
+                    type_ is last_type or type_ == last_type):
+                return last_value
+            converted = drgn.Object(self.prog, type=type_,
+                                    value=value).value_()
+            last_type, last_value = type_, converted
+            return converted
+
+        def match(obj: drgn.Object) -> bool:
+            rhs = rhs_eval(obj)
+            if reader is not None and isinstance(rhs, (int, str)):
+                field = reader.read(obj)
+                if field is not None:
+                    (layout, value) = field
+                    if isinstance(rhs, str) and layout.is_string:
+                        return compare(value.decode("utf-8"), rhs)
+                    if isinstance(rhs, int) and not layout.is_string:
+                        return compare(value, convert(layout.type_, rhs))
+
+            lhs = lhs_eval(obj)
+
+            if not isinstance(lhs, drgn.Object):
+                raise sdb.CommandInvalidInputError(
+                    self.name,
+                    "left hand side has unsupported type ({})".format(
+                        type(lhs).__name__))
+
+            if isinstance(rhs, str):
+                return compare(lhs.string_().decode("utf-8"), rhs)
+            if isinstance(rhs, int):
+                return compare(lhs.value_(), convert(lhs.type_, rhs))
+            if isinstance(rhs, drgn.Object):
+                return compare(lhs, rhs)
+            raise sdb.CommandInvalidInputError(
+                self.name, "right hand side has unsupported type ({})".format(
+                    type(rhs).__name__))
+
+        return match
+
+    def fuse(self, cmd: sdb.Command) -> bool:
+        #
+        # "filter A | filter B" is the same as "filter A and B", so do
+        # both in a single pass. The same command list may be planned
+        # more than once, so fusing is idempotent: the matcher is built
+        # from the expressions of the fused filters each time, rather
+        # than wrapped around the previous one.
+        #
+        if type(cmd) is not Filter:  # pylint: disable=unidiomatic-typecheck
+            return False
+        if not any(fused is cmd for fused in self.fused):
+            self.fused.append(cmd)
+            self.match = _all_of([fused.own_match for fused in self.fused])
+            self.readers = [
+                reader for fused in self.fused for reader in fused.own_readers
+            ]
+        return True
 
     def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
+        match = self.match
         try:
             for obj in objs:
-                lhs = eval(self.lhs_code, {'__builtins__': None}, {'obj': obj})
-                rhs = eval(self.rhs_code, {'__builtins__': None}, {'obj': obj})
-
-                if not isinstance(lhs, drgn.Object):
-                    raise sdb.CommandInvalidInputError(
-                        self.name,
-                        "left hand side has unsupported type ({})".format(
-                            type(lhs).__name__))
-
-                if isinstance(rhs, str):
-                    lhs = lhs.string_().decode("utf-8")
-                elif isinstance(rhs, int):
-                    rhs = drgn.Object(self.prog, type=lhs.type_, value=rhs)
-                elif isinstance(rhs, bool):
-                    pass
-                elif isinstance(rhs, drgn.Object):
-                    pass
-                else:
-                    raise sdb.CommandInvalidInputError(
-                        self.name,
-                        "right hand side has unsupported type ({})".format(
-                            type(rhs).__name__))
-
-                if eval("lhs {} rhs".format(self.compare),
-                        {'__builtins__': None}, {
-                            'lhs': lhs,
-                            'rhs': rhs
-                        }):
+                if match(obj):
                     yield obj
         except (AttributeError, TypeError, ValueError) as err:
             raise sdb.CommandError(self.name, str(err))
+
+    def call_batch(
+            self, batches: Iterable[List[drgn.Object]]
+    ) -> Iterable[List[drgn.Object]]:
+        match = self.match
+        try:
+            for batch in batches:
+                for reader in self.readers:
+                    reader.prefetch(batch)
+                matches = [obj for obj in batch if match(obj)]
+                if matches:
+                    yield matches
+        except (AttributeError, TypeError, ValueError) as err:
+            raise sdb.CommandError(self.name, str(err))
@@ -17,7 +17,7 @@
 # pylint: disable=missing-docstring
 
 import argparse
-from typing import Iterable
+from typing import Iterable, List, Optional
 
 import drgn
 import sdb
@@ -31,10 +31,38 @@ class Head(sdb.Command):
     def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
         parser.add_argument("count", nargs="?", default=10, type=int)
 
+    def head_limit(self) -> Optional[int]:
+        return self.args.count
+
+    #
+    # We stop as soon as the count reaches zero, rather than when we are
+    # asked for more output, so that the stage before us is not asked
+    # for objects that we would drop.
+    #
     def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
+        if self.args.count == 0:
+            return
         for obj in objs:
+            self.args.count -= 1
+            yield obj
             if self.args.count == 0:
                 break
 
-            self.args.count -= 1
-            yield obj
+    def call_batch(
+            self, batches: Iterable[List[drgn.Object]]
+    ) -> Iterable[List[drgn.Object]]:
+        if self.args.count == 0:
+            return
+        if self.args.count < 0:
+            #
+            # Like call(), we pass everything through when the count is
+            # negative.
+            #
+            yield from batches
+            return
+        for batch in batches:
+            batch = batch[:self.args.count]
+            self.args.count -= len(batch)
+            yield batch
+            if self.args.count == 0:
+                break
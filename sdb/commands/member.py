@@ -17,7 +17,7 @@
 # pylint: disable=missing-docstring
 
 import argparse
-from typing import Iterable
+from typing import Iterable, List
 
 import drgn
 import sdb
@@ -27,20 +27,30 @@ class Member(sdb.Command):
     # pylint: disable=too-few-public-methods
 
     names = ["member"]
+    one_to_one = True
 
     def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
         parser.add_argument("members", nargs="+", metavar="<member>")
 
+    def _member(self, obj: drgn.Object) -> drgn.Object:
+        for member in self.args.members:
+            try:
+                obj = obj.member_(member)
+            except (LookupError, TypeError) as err:
+                #
+                # The expected error messages that we get from
+                # member_() are good enough to be propagated
+                # as-is.
+                #
+                raise sdb.CommandError(self.name, str(err))
+        return obj
+
     def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
         for obj in objs:
-            for member in self.args.members:
-                try:
-                    obj = obj.member_(member)
-                except (LookupError, TypeError) as err:
-                    #
-                    # The expected error messages that we get from
-                    # member_() are good enough to be propagated
-                    # as-is.
-                    #
-                    raise sdb.CommandError(self.name, str(err))
-            yield obj
+            yield self._member(obj)
+
+    def call_batch(
+            self, batches: Iterable[List[drgn.Object]]
+    ) -> Iterable[List[drgn.Object]]:
+        for batch in batches:
+            yield [self._member(obj) for obj in batch]
@@ -16,7 +16,8 @@
 
 # pylint: disable=missing-docstring
 
-from typing import Iterable
+import itertools
+from typing import Dict, Iterable, Iterator, List
 
 import drgn
 import sdb
@@ -27,31 +28,59 @@ class PrettyPrint(sdb.Command):
 
     names = ["pretty_print", "pp"]
 
+    @staticmethod
+    def _run(dispatcher: sdb.TypeDispatcher[str], name: str,
+             pending: List[drgn.Object],
+             objs: Iterator[drgn.Object]) -> Iterable[drgn.Object]:
+        """
+        Yield the pending object, followed by the objects after it that
+        are handled by the same printer. The first object that isn't is
+        left pending.
+        """
+        yield pending.pop()
+        for obj in objs:
+            if dispatcher.lookup(obj.type_) != name:
+                pending.append(obj)
+                return
+            yield obj
+
     def call(self, objs: Iterable[drgn.Object]) -> None:  # type: ignore
-        baked = [(self.prog.type(type_), class_)
-                 for type_, class_ in sdb.PrettyPrinter.all_printers.items()]
-        has_input = False
-        for i in objs:
-            has_input = True
-
-            try:
-                for type_, class_ in baked:
-                    if i.type_ == type_ and hasattr(class_, "pretty_print"):
-                        class_(self.prog).pretty_print([i])
-                        raise StopIteration
-            except StopIteration:
-                continue
-
-            # error
-            raise TypeError(
-                'command "{}" does not handle input of type {}'.format(
-                    self.names, i.type_))
+        #
+        # The pretty printers are looked up by their input type, so that
+        # only the module of the printer that we dispatch to is imported,
+        # and only one instance of each printer is created per invocation.
+        # Each run of consecutive objects of the same type is handed to
+        # its printer as a whole, so printers that print a header (e.g.
+        # "spa") print it once per run. The run is passed on as objects
+        # come in, rather than gathered first.
+        #
+        printers = sdb.PrettyPrinter.all_printers
+        dispatcher = sdb.get_dispatcher(self.prog, printers)
+        instances: Dict[str, sdb.PrettyPrinter] = {}
+        it = iter(objs)
+        pending = list(itertools.islice(it, 1))
+        has_input = bool(pending)
+        while pending:
+            obj = pending[0]
+            name = dispatcher.lookup(obj.type_)
+            if name is None or not hasattr(printers[name], "pretty_print"):
+                # error
+                raise TypeError(
+                    'command "{}" does not handle input of type {}'.format(
+                        self.names, obj.type_))
+
+            printer = instances.get(name)
+            if printer is None:
+                printer = printers[name](self.prog)
+                instances[name] = printer
+            printer.pretty_print(self._run(dispatcher, name, pending, it))
         # If we got no input and we're the last thing in the pipeline, we're
         # probably the first thing in the pipeline. Print out the available
         # pretty-printers.
         if not has_input and self.islast:
             print("The following types have pretty-printers:")
             print("\t%-20s %-20s" % ("PRINTER", "TYPE"))
-            for type_, class_ in baked:
+            for type_, name in dispatcher.types():
+                class_ = printers[name]
                 if hasattr(class_, "pretty_print"):
-                    print("\t%-20s %-20s" % (class_(self.prog).names, type_))
+                    print("\t%-20s %-20s" % (class_.names, type_))
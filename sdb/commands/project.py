@@ -0,0 +1,134 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import argparse
+from typing import Any, Iterable, List, Optional
+
+import drgn
+import sdb
+
+#
+# NumPy is an optional dependency of sdb (the "columns" extra), which
+# is only needed by the project command.
+#
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _array(values: List[Any], layout: Optional[sdb.FieldLayout]) -> Any:
+    if layout is None or layout.is_string:
+        #
+        # Leave strings (and anything that we don't know the type of)
+        # as Python objects, rather than fixed-width NumPy strings.
+        #
+        array = numpy.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+    if layout.is_float:
+        return numpy.array(values, dtype=numpy.float64)
+    if layout.signed:
+        return numpy.array(values, dtype=numpy.int64)
+    return numpy.array(values, dtype=numpy.uint64)
+
+
+def require_numpy(name: str) -> None:
+    """
+    Raise an sdb.CommandError on behalf of the command of the given name
+    if NumPy isn't installed.
+    """
+    if numpy is None:
+        raise sdb.CommandError(
+            name, "this command requires NumPy, which is not installed")
+
+
+def parse_member(parser: argparse.ArgumentParser, member: str) -> List[str]:
+    """
+    Return the names of the members of the given member path (e.g.
+    "a.b"), or exit through the given parser if it isn't one.
+    """
+    path = sdb.member_path("obj." + member)
+    if path is None:
+        parser.error("invalid member: {}".format(member))
+    return path
+
+
+def _format(value: Any) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    if isinstance(value, numpy.floating):
+        return "{:g}".format(value)
+    return str(value)
+
+
+class Project(sdb.Command):
+    # pylint: disable=too-few-public-methods
+
+    names = ["project"]
+
+    def __init__(self, prog: drgn.Program, args: str = "",
+                 name: str = "_") -> None:
+        super().__init__(prog, args, name)
+        self.paths = [
+            parse_member(self.parser, member) for member in self.args.members
+        ]
+
+    def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("members", nargs="+", metavar="<member>")
+
+    def read_columns(self, batches: Iterable[List[drgn.Object]]) -> List[Any]:
+        """
+        Read the members of every batch of objects into one NumPy array
+        (column) per member. Members that can be read on their own are
+        read in bulk through sdb.FieldReaders; the rest are evaluated
+        through drgn.
+        """
+        require_numpy(self.name)
+        readers = [sdb.FieldReader(self.prog, path) for path in self.paths]
+        parts: List[List[Any]] = [[] for _ in readers]
+        for batch in batches:
+            for (reader, part) in zip(readers, parts):
+                try:
+                    values = reader.values(batch)
+                except (LookupError, TypeError) as err:
+                    raise sdb.CommandError(self.name, str(err))
+                part.append(_array(values, reader.layout(batch[0].type_)))
+        return [
+            numpy.concatenate(part) if part else numpy.empty(0)
+            for part in parts
+        ]
+
+    def print_table(self, columns: List[Any]) -> None:
+        cells = [[_format(value) for value in array]
+                 for array in columns]
+        widths = [
+            max([len(member)] + [len(cell) for cell in column])
+            for (member, column) in zip(self.args.members, cells)
+        ]
+        print(" ".join(member.upper().rjust(width)
+                       for (member, width) in zip(self.args.members, widths)))
+        for row in zip(*cells):
+            print(" ".join(
+                cell.rjust(width) for (cell, width) in zip(row, widths)))
+
+    def call(self, objs: Iterable[drgn.Object]) -> None:
+        self.call_batch(sdb.batched(objs))
+
+    def call_batch(self, batches: Iterable[List[drgn.Object]]) -> None:
+        self.print_table(self.read_columns(batches))
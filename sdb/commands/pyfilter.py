@@ -17,12 +17,106 @@
 # pylint: disable=missing-docstring
 
 import argparse
-from typing import Iterable
+import ast
+import functools
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
 import drgn
 import sdb
 
 
+def _int_constant(node: ast.AST) -> Optional[int]:
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = _int_constant(node.operand)
+        return None if value is None else -value
+    if isinstance(node, ast.Constant):
+        value = node.value
+    elif hasattr(ast, "Num") and isinstance(node, ast.Num):
+        value = node.n  # type: ignore
+    else:
+        return None
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return None
+
+
+def _obj_member_path(node: ast.AST) -> Optional[List[str]]:
+    path: List[str] = []
+    while isinstance(node, ast.Attribute):
+        path.insert(0, node.attr)
+        node = node.value
+    if path and isinstance(node, ast.Name) and node.id == "obj":
+        return path
+    return None
+
+
+class _MemberPushdown(ast.NodeTransformer):
+    """
+    Replace the member accesses of obj that are compared against integer
+    constants (e.g. the "obj.a.b" of "obj.a.b > 0") with calls to field
+    functions, which read the members straight from memory.
+    """
+
+    def __init__(self, prog: drgn.Program) -> None:
+        self.prog = prog
+        self.readers: List[sdb.FieldReader] = []
+        self.fields: Dict[str, Callable[[drgn.Object], Any]] = {}
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        # pylint: disable=invalid-name
+        self.generic_visit(node)
+        if len(node.ops) != 1:
+            return node
+        constant = _int_constant(node.comparators[0])
+        if constant is not None:
+            node.left = self._pushdown(node.left, constant)
+        else:
+            constant = _int_constant(node.left)
+            if constant is not None:
+                node.comparators[0] = self._pushdown(node.comparators[0],
+                                                     constant)
+        return node
+
+    def _pushdown(self, operand: ast.AST, constant: int) -> ast.AST:
+        path = _obj_member_path(operand)
+        if path is None:
+            return operand
+        name = "_field{}".format(len(self.fields))
+        self.fields[name] = self._field(path, constant)
+        return ast.copy_location(
+            ast.Call(func=ast.Name(id=name, ctx=ast.Load()),
+                     args=[ast.Name(id="obj", ctx=ast.Load())],
+                     keywords=[]), operand)
+
+    def _field(self, path: List[str],
+               constant: int) -> Callable[[drgn.Object], Any]:
+        reader = sdb.FieldReader(self.prog, path)
+        self.readers.append(reader)
+        representable: Dict[int, bool] = {}
+
+        def field(obj: drgn.Object) -> Any:
+            #
+            # drgn compares numbers after the usual arithmetic
+            # conversions, which leave both sides unchanged if the
+            # constant fits in the type of the member. In that case, the
+            # raw value of the member compares the same way.
+            #
+            found = reader.read(obj)
+            if found is not None:
+                (layout, value) = found
+                fits = representable.get(id(layout))
+                if fits is None:
+                    fits = layout.is_number and drgn.Object(
+                        self.prog, type=layout.type_,
+                        value=constant).value_() == constant
+                    representable[id(layout)] = fits
+                if fits:
+                    return value
+            return functools.reduce(getattr, path, obj)
+
+        return field
+
+
 class PyFilter(sdb.Command):
     # pylint: disable=too-few-public-methods
 
@@ -35,18 +129,38 @@ class PyFilter(sdb.Command):
             self.parser.error("the following arguments are required: expr")
 
         try:
-            self.code = compile(" ".join(self.args.expr), "<string>", "eval")
+            tree = ast.parse(" ".join(self.args.expr), "<string>", "eval")
+            pushdown = _MemberPushdown(prog)
+            tree = ast.fix_missing_locations(pushdown.visit(tree))
+            self.code = compile(tree, "<string>", "eval")
         except SyntaxError as err:
             raise sdb.CommandEvalSyntaxError(self.name, err)
+        self.readers = pushdown.readers
+        self.globals: Dict[str, Any] = {'__builtins__': None}
+        self.globals.update(pushdown.fields)
 
     def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
         parser.add_argument("expr", nargs=argparse.REMAINDER)
-        self.parser = parser
 
     def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
         # pylint: disable=eval-used
-        func = lambda obj: eval(self.code, {'__builtins__': None}, {'obj': obj})
+        func = lambda obj: eval(self.code, self.globals, {'obj': obj})
         try:
             yield from filter(func, objs)
         except (TypeError, AttributeError) as err:
             raise sdb.CommandError(self.name, str(err))
+
+    def call_batch(
+            self, batches: Iterable[List[drgn.Object]]
+    ) -> Iterable[List[drgn.Object]]:
+        # pylint: disable=eval-used
+        func = lambda obj: eval(self.code, self.globals, {'obj': obj})
+        try:
+            for batch in batches:
+                for reader in self.readers:
+                    reader.prefetch(batch)
+                matches = list(filter(func, batch))
+                if matches:
+                    yield matches
+        except (TypeError, AttributeError) as err:
+            raise sdb.CommandError(self.name, str(err))
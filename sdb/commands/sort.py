@@ -0,0 +1,157 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import argparse
+import heapq
+import operator
+import pickle
+import sys
+import tempfile
+from typing import Any, Dict, IO, Iterable, List, Tuple
+
+import drgn
+import sdb
+from sdb.commands.aggregate import member_values
+from sdb.commands.project import parse_member
+
+#
+# A record of an object to sort: its sort key, the index of its type in
+# the list of types that were seen, and either its address or (for
+# objects that have none, like the ones created by "echo") its value.
+#
+Record = Tuple[Any, int, bool, Any]
+
+#
+# The number of bytes of records (keys included) that sort keeps in
+# memory. Beyond that, sorted runs of records are spilled to temporary
+# files, RECORDS_PER_CHUNK records at a time, and merged once the input
+# is over.
+#
+SORT_MEMORY = 256 << 20
+RECORDS_PER_CHUNK = 4096
+
+#
+# The bytes that a record takes in memory, besides its key: the tuple,
+# its address and its slot in the list of records.
+#
+RECORD_SIZE = sys.getsizeof((0, 0, True, 0)) + sys.getsizeof(1 << 63) + 8
+
+
+def _write_run(records: List[Record]) -> IO[bytes]:
+    run = tempfile.TemporaryFile()
+    for start in range(0, len(records), RECORDS_PER_CHUNK):
+        pickle.dump(records[start:start + RECORDS_PER_CHUNK], run,
+                    pickle.HIGHEST_PROTOCOL)
+    run.seek(0)
+    return run
+
+
+def _read_run(run: IO[bytes]) -> Iterable[Record]:
+    try:
+        while True:
+            try:
+                chunk = pickle.load(run)
+            except EOFError:
+                return
+            yield from chunk
+    finally:
+        run.close()
+
+
+class Sort(sdb.Command):
+    # pylint: disable=too-few-public-methods
+
+    names = ["sort"]
+
+    def __init__(self, prog: drgn.Program, args: str = "",
+                 name: str = "_") -> None:
+        super().__init__(prog, args, name)
+        self.reader = sdb.FieldReader(
+            prog, parse_member(self.parser, self.args.member))
+        self.types: List[drgn.Type] = []
+        self.type_indexes: Dict[str, int] = {}
+
+    def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("member", metavar="<member>")
+        parser.add_argument("-r",
+                            "--reverse",
+                            action="store_true",
+                            help="sort in descending order")
+
+    def _record(self, key: Any, obj: drgn.Object) -> Record:
+        type_ = obj.type_
+        name = type_.type_name()
+        index = self.type_indexes.get(name)
+        if index is None or not self.types[index] == type_:
+            index = len(self.types)
+            self.types.append(type_)
+            self.type_indexes[name] = index
+        address = obj.address_
+        if address is None:
+            return (key, index, False, obj.value_())
+        return (key, index, True, address)
+
+    def _object(self, record: Record) -> drgn.Object:
+        (_, index, by_address, location) = record
+        if by_address:
+            return drgn.Object(self.prog, self.types[index], address=location)
+        return drgn.Object(self.prog, self.types[index], value=location)
+
+    def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
+        for batch in self.call_batch(sdb.batched(objs)):
+            yield from batch
+
+    def call_batch(
+            self, batches: Iterable[List[drgn.Object]]
+    ) -> Iterable[List[drgn.Object]]:
+        by_key = operator.itemgetter(0)
+        run: List[Record] = []
+        run_bytes = 0
+        spilled: List[IO[bytes]] = []
+        try:
+            for batch in batches:
+                keys = member_values(self.name, self.reader, batch)
+                run.extend(
+                    self._record(key, obj) for (key, obj) in zip(keys, batch))
+                run_bytes += len(batch) * RECORD_SIZE + sum(
+                    map(sys.getsizeof, keys))
+                if run_bytes >= SORT_MEMORY:
+                    run.sort(key=by_key, reverse=self.args.reverse)
+                    spilled.append(_write_run(run))
+                    run = []
+                    run_bytes = 0
+            run.sort(key=by_key, reverse=self.args.reverse)
+        except TypeError as err:
+            for spill in spilled:
+                spill.close()
+            raise sdb.CommandError(
+                self.name,
+                "cannot sort by {}: {}".format(self.args.member, err))
+
+        if not spilled:
+            yield from sdb.batched(self._object(record) for record in run)
+            return
+
+        #
+        # Runs are merged in the order that they were read in, which
+        # keeps objects with equal keys in their input order.
+        #
+        runs: List[Iterable[Record]] = [_read_run(spill) for spill in spilled]
+        runs.append(run)
+        merged = heapq.merge(*runs, key=by_key, reverse=self.args.reverse)
+        yield from sdb.batched(self._object(record) for record in merged)
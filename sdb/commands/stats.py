@@ -0,0 +1,108 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import argparse
+from typing import Iterable
+
+import drgn
+import sdb
+
+
+class Stats(sdb.Command):
+    # pylint: disable=too-few-public-methods
+
+    names = ["stats"]
+
+    def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("-r",
+                            "--reset",
+                            action="store_true",
+                            help="zero out the statistics after printing them")
+        parser.add_argument(
+            "-t",
+            "--types",
+            action="store_true",
+            help="only print the statistics of the type cache," +
+            " which are kept even without --read-stats")
+
+    def print_read_stats(self, accounting: sdb.ReadAccounting) -> None:
+        print("{:<24} {:>12} {:>14}".format("", "READS", "BYTES"))
+        print("{:<24} {:>12} {:>14}".format("total", accounting.reads,
+                                            accounting.bytes))
+        print()
+
+        print("{:<24} {:>12}".format("READ SIZE", "READS"))
+        for bucket in sorted(accounting.sizes):
+            if bucket <= 1:
+                size = str(bucket)
+            else:
+                size = "{}-{}".format(bucket, 2 * bucket - 1)
+            print("{:<24} {:>12}".format(size, accounting.sizes[bucket]))
+        print()
+
+        print("{:<24} {:>12} {:>14}".format("COMMAND", "READS", "BYTES"))
+        for (command, (reads, nbytes)) in sorted(accounting.commands.items(),
+                                                 key=lambda item: -item[1][0]):
+            print("{:<24} {:>12} {:>14}".format(command, reads, nbytes))
+
+    @staticmethod
+    def print_cache_stats(cache: sdb.PageCache) -> None:
+        print("{:<24} {:>12} {:>14}".format("READ CACHE", "HITS", "MISSES"))
+        print("{:<24} {:>12} {:>14}".format(
+            "{} of {} pages".format(len(cache.pages), cache.capacity),
+            cache.hits, cache.misses))
+
+    @staticmethod
+    def print_type_stats(types: sdb.TypeCache) -> None:
+        print("{:<24} {:>12} {:>14}".format("TYPE CACHE", "HITS", "MISSES"))
+        print("{:<24} {:>12} {:>14}".format(
+            "{} types".format(len(types.types)), types.hits, types.misses))
+
+    def call(self, objs: Iterable[drgn.Object]) -> None:
+        types = sdb.get_type_cache(self.prog)
+        if self.args.types:
+            self.print_type_stats(types)
+            if self.args.reset:
+                types.reset()
+            return
+
+        #
+        # Each of the accounting and the cache of memory reads may be
+        # enabled without the other, and we print the sections of the
+        # ones that are.
+        #
+        memory = sdb.get_target_memory(self.prog)
+        if memory is None or (memory.accounting is None and
+                              memory.cache is None):
+            raise sdb.CommandError(
+                self.name, "memory reads are neither accounted for nor" +
+                " cached; start sdb with --read-stats or --read-cache")
+        if memory.accounting is not None:
+            self.print_read_stats(memory.accounting)
+            print()
+        if memory.cache is not None:
+            self.print_cache_stats(memory.cache)
+            print()
+        self.print_type_stats(types)
+        if self.args.reset:
+            types.reset()
+            if memory.accounting is not None:
+                memory.accounting.reset()
+            if memory.cache is not None:
+                memory.cache.hits = 0
+                memory.cache.misses = 0
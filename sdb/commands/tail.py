@@ -18,7 +18,7 @@
 
 import argparse
 from collections import deque
-from typing import Deque, Iterable
+from typing import Deque, Iterable, List, Optional
 
 import drgn
 import sdb
@@ -32,9 +32,20 @@ class Tail(sdb.Command):
     def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
         parser.add_argument("count", nargs="?", default=10, type=int)
 
+    def tail_limit(self) -> Optional[int]:
+        return self.args.count
+
     def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
         queue: Deque[drgn.Object] = deque(maxlen=self.args.count)
         for obj in objs:
             queue.append(obj)
         for obj in queue:
             yield obj
+
+    def call_batch(
+            self, batches: Iterable[List[drgn.Object]]
+    ) -> Iterable[List[drgn.Object]]:
+        queue: Deque[drgn.Object] = deque(maxlen=self.args.count)
+        for batch in batches:
+            queue.extend(batch)
+        yield from sdb.batched(queue)
@@ -0,0 +1,81 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import argparse
+import heapq
+from typing import Any, Iterable, List, Tuple
+
+import drgn
+import sdb
+from sdb.commands.aggregate import member_values
+from sdb.commands.project import parse_member
+
+
+class Top(sdb.Command):
+    # pylint: disable=too-few-public-methods
+
+    names = ["top"]
+
+    def __init__(self, prog: drgn.Program, args: str = "",
+                 name: str = "_") -> None:
+        super().__init__(prog, args, name)
+        if self.args.count < 0:
+            self.parser.error("the count can't be negative")
+        self.reader = sdb.FieldReader(
+            prog, parse_member(self.parser, self.args.member))
+
+    def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("count", type=int, metavar="<N>")
+        parser.add_argument("member", metavar="<member>")
+
+    def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
+        for batch in self.call_batch(sdb.batched(objs)):
+            yield from batch
+
+    def call_batch(
+            self, batches: Iterable[List[drgn.Object]]
+    ) -> Iterable[List[drgn.Object]]:
+        #
+        # The N objects with the largest keys seen so far are kept in a
+        # min-heap, so each object is either dropped right away or
+        # replaces the smallest of them. Entries are ordered by key and
+        # then by the negated position of their object in the input, so
+        # that among objects with equal keys the earlier ones are kept,
+        # and objects are never compared themselves.
+        #
+        heap: List[Tuple[Any, int, drgn.Object]] = []
+        count = self.args.count
+        seq = 0
+        try:
+            for batch in batches:
+                if count == 0:
+                    continue
+                keys = member_values(self.name, self.reader, batch)
+                for (key, obj) in zip(keys, batch):
+                    seq -= 1
+                    if len(heap) < count:
+                        heapq.heappush(heap, (key, seq, obj))
+                    elif (key, seq) > heap[0][:2]:
+                        heapq.heapreplace(heap, (key, seq, obj))
+        except TypeError as err:
+            raise sdb.CommandError(
+                self.name,
+                "cannot compare {}: {}".format(self.args.member, err))
+
+        heap.sort(key=lambda entry: entry[:2], reverse=True)
+        yield from sdb.batched(obj for (_, _, obj) in heap)
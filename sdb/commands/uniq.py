@@ -0,0 +1,133 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import argparse
+import collections
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import drgn
+import sdb
+from sdb.commands.aggregate import format_value, member_values
+from sdb.commands.project import parse_member
+
+
+def object_address(obj: drgn.Object) -> Any:
+    """
+    Return the address that the given object stands for: the value of
+    pointers, and the address of anything else, or its value if it has
+    no address.
+    """
+    type_ = obj.type_
+    while type_.kind is drgn.TypeKind.TYPEDEF:
+        type_ = type_.type
+    address = obj.address_
+    if address is None or type_.kind is drgn.TypeKind.POINTER:
+        return obj.value_()
+    return address
+
+
+class Uniq(sdb.Command):
+    # pylint: disable=too-few-public-methods
+
+    names = ["uniq"]
+
+    def __init__(self, prog: drgn.Program, args: str = "",
+                 name: str = "_") -> None:
+        super().__init__(prog, args, name)
+        self.reader: Optional[sdb.FieldReader] = None
+        if self.args.member is not None:
+            self.reader = sdb.FieldReader(
+                prog, parse_member(self.parser, self.args.member))
+
+    def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "-c",
+            "--count",
+            action="store_true",
+            help="print the number of times that each object (or member" +
+            " value) was seen, instead of passing the objects on")
+        parser.add_argument(
+            "member",
+            nargs="?",
+            metavar="<member>",
+            help="tell objects apart by this member, rather than their" +
+            " address")
+
+    def _keys(self, batch: List[drgn.Object]) -> List[Any]:
+        if self.reader is None:
+            return [object_address(obj) for obj in batch]
+        return member_values(self.name, self.reader, batch)
+
+    def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
+        for batch in self.call_batch(sdb.batched(objs)):
+            yield from batch
+
+    def call_batch(
+            self, batches: Iterable[List[drgn.Object]]
+    ) -> Iterable[List[drgn.Object]]:
+        if self.args.count:
+            self.print_counts(batches)
+            return
+
+        #
+        # Integer keys (i.e. addresses, or integer members) are kept in
+        # an sdb.IntSet, which takes a few bytes per key at most, so
+        # that we can deduplicate tens of millions of objects. Anything
+        # else (e.g. strings) is kept in a Python set.
+        #
+        seen = sdb.IntSet()
+        others: Set[Any] = set()
+        for batch in batches:
+            unique = []
+            for (key, obj) in zip(self._keys(batch), batch):
+                if isinstance(key, int):
+                    if not seen.add(key):
+                        continue
+                else:
+                    try:
+                        if key in others:
+                            continue
+                        others.add(key)
+                    except TypeError:
+                        raise sdb.CommandError(
+                            self.name,
+                            "cannot tell apart objects of type '{}'".format(
+                                obj.type_.type_name()))
+                unique.append(obj)
+            if unique:
+                yield unique
+
+    def print_counts(self, batches: Iterable[List[drgn.Object]]) -> None:
+        counts: Dict[Any, int] = collections.Counter()
+        layout = None
+        for batch in batches:
+            if self.reader is not None and layout is None:
+                layout = self.reader.layout(batch[0].type_)
+            try:
+                counts.update(self._keys(batch))
+            except TypeError:
+                raise sdb.CommandError(
+                    self.name, "cannot tell apart objects of type '{}'".format(
+                        batch[0].type_.type_name()))
+
+        for (key, count) in counts.items():
+            if self.reader is None:
+                label = hex(key) if isinstance(key, int) else str(key)
+            else:
+                label = format_value(key, layout)
+            print("{:>12} {}".format(count, label))
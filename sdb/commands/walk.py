@@ -16,7 +16,7 @@
 
 # pylint: disable=missing-docstring
 
-from typing import Iterable
+from typing import Dict, Iterable
 
 import drgn
 import sdb
@@ -29,32 +29,42 @@ class Walk(sdb.Command):
 
     names = ["walk"]
 
+    def print_walkers(self, dispatcher: sdb.TypeDispatcher[str]) -> None:
+        walkers = sdb.Walker.allWalkers
+        print("The following types have walkers:")
+        print("\t%-20s %-20s" % ("WALKER", "TYPE"))
+        for type_, name in dispatcher.types():
+            print("\t%-20s %-20s" % (walkers[name].names, type_))
+
     def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
-        baked = [(self.prog.type(type_), class_)
-                 for type_, class_ in sdb.Walker.allWalkers.items()]
+        return self.limited(self._walk(objs))
+
+    def _walk(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
+        #
+        # The walkers are looked up by their input type, so that only
+        # the module of the walker that we dispatch to is imported, and
+        # only one instance of each walker is created per invocation.
+        #
+        walkers = sdb.Walker.allWalkers
+        dispatcher = sdb.get_dispatcher(self.prog, walkers)
+        instances: Dict[str, sdb.Walker] = {}
         has_input = False
         for i in objs:
             has_input = True
 
-            try:
-                for type_, class_ in baked:
-                    if i.type_ == type_:
-                        yield from class_(self.prog).walk(i)
-                        raise StopIteration
-            except StopIteration:
-                continue
-
-            print("The following types have walkers:")
-            print("\t%-20s %-20s" % ("WALKER", "TYPE"))
-            for type_, class_ in baked:
-                print("\t%-20s %-20s" % (class_(self.prog).names, type_))
-            raise TypeError("no walker found for input of type {}".format(
-                i.type_))
+            name = dispatcher.lookup(i.type_)
+            if name is None:
+                self.print_walkers(dispatcher)
+                raise TypeError("no walker found for input of type {}".format(
+                    i.type_))
+
+            walker = instances.get(name)
+            if walker is None:
+                walker = walkers[name](self.prog)
+                instances[name] = walker
+            yield from walker.walk(i)
         # If we got no input and we're the last thing in the pipeline, we're
         # probably the first thing in the pipeline. Print out the available
         # walkers.
         if not has_input and self.islast:
-            print("The following types have walkers:")
-            print("\t%-20s %-20s" % ("WALKER", "TYPE"))
-            for type_, class_ in baked:
-                print("\t%-20s %-20s" % (class_(self.prog).names, type_))
+            self.print_walkers(dispatcher)
@@ -28,12 +28,12 @@ class ARCStats(sdb.Locator, sdb.PrettyPrinter):
     output_type = "arc_stats_t *"
 
     def print_stats(self, obj: drgn.Object) -> None:
-        names = [
-            tuple_[1] for tuple_ in self.prog.type('struct arc_stats').members
-        ]
+        names = sdb.get_type_cache(self.prog).member_names('struct arc_stats')
 
+        stats = sdb.coalesce(obj)
         for name in names:
-            print("{:32} = {}".format(name, int(obj.member_(name).value.ui64)))
+            print("{:32} = {}".format(name,
+                                      int(stats.member_(name).value.ui64)))
 
     def pretty_print(self, objs: Iterable[drgn.Object]) -> None:
         for obj in objs:
@@ -16,7 +16,9 @@
 
 # pylint: disable=missing-docstring
 
-from typing import Iterable
+import argparse
+import struct
+from typing import Iterable, List, Tuple
 
 import drgn
 import sdb
@@ -28,20 +30,56 @@ class Avl(sdb.Walker):
     names = ["avl"]
     input_type = "avl_tree_t *"
 
-    def _helper(self, node: drgn.Object, offset: int) -> Iterable[drgn.Object]:
-        if node == drgn.NULL(self.prog, node.type_):
-            return
+    def _init_argparse(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument("-r",
+                            "--reverse",
+                            action="store_true",
+                            help="walk the tree in descending order")
 
-        lchild = node.avl_child[0]
-        yield from self._helper(lchild, offset)
+    def _children(self, root: drgn.Object) -> Tuple[int, struct.Struct]:
+        """
+        Return the offset of avl_child[] in the nodes of the tree with
+        the given root, and a struct that unpacks its two pointers.
+        """
+        offset = drgn.Object(self.prog, root.type_.type,
+                             address=0).avl_child.address_
+        little_endian = bool(self.prog.platform.flags
+                             & drgn.PlatformFlags.IS_LITTLE_ENDIAN)
+        code = "Q" if root.type_.size == 8 else "I"
+        return (offset,
+                struct.Struct(("<" if little_endian else ">") + code * 2))
 
-        obj = drgn.Object(self.prog, type="void *", value=int(node) - offset)
-        yield obj
+    def _walk(self, obj: drgn.Object, reverse: bool) -> Iterable[drgn.Object]:
+        offset = int(obj.avl_offset)
+        root = obj.avl_root
+        (child_offset, children) = self._children(root)
+        void_type = self.prog.type("void *")
 
-        rchild = node.avl_child[1]
-        yield from self._helper(rchild, offset)
+        #
+        # The tree is walked in order with an explicit stack of the
+        # nodes whose left subtree (or right subtree, when walking in
+        # reverse) is being walked, along with the child that we go on
+        # to once they are yielded. The two children of each node are
+        # read as raw pointers, in a single read, when the node is
+        # pushed, so each node of the tree is only read once.
+        #
+        (first, second) = (1, 0) if reverse else (0, 1)
+        stack: List[Tuple[int, int]] = []
+        node = root.value_()
+        while True:
+            while node:
+                child = children.unpack(
+                    self.prog.read(node + child_offset, children.size))
+                stack.append((node, child[second]))
+                node = child[first]
+            if not stack:
+                return
+            (node, next_node) = stack.pop()
+            yield drgn.Object(self.prog, void_type, value=node - offset)
+            node = next_node
 
     def walk(self, obj: drgn.Object) -> Iterable[drgn.Object]:
-        offset = int(obj.avl_offset)
-        root = obj.avl_root
-        yield from self._helper(root, offset)
+        return self._walk(obj, self.args.reverse)
+
+    def walk_reverse(self, obj: drgn.Object) -> Iterable[drgn.Object]:
+        return self._walk(obj, not self.args.reverse)
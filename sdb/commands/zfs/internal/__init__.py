@@ -17,18 +17,16 @@
 # pylint: disable=missing-docstring
 # pylint: disable=unnecessary-lambda
 
-import os
 from typing import Callable
 
 import drgn
+import sdb
 
 
 def enum_lookup(prog, enum_type_name, value):
     """return a string which is the short name of the enum value
     (truncating off the common prefix) """
-    fields = prog.type(enum_type_name).type.enumerators
-    prefix = os.path.commonprefix([f[0] for f in fields])
-    return fields[value][0][prefix.rfind("_") + 1:]
+    return sdb.get_type_cache(prog).enum_names(enum_type_name)[value]
 
 
 def print_histogram(histogram, size, offset):
@@ -63,7 +63,8 @@ class Metaslab(sdb.Locator, sdb.PrettyPrinter):
                 "WEIGHT".rjust(12),
             )
             print("".ljust(indent), "-" * 65)
-        weight = int(msp.ms_weight)
+        metaslab = sdb.coalesce(msp)
+        weight = int(metaslab.ms_weight)
         if weight & METASLAB_WEIGHT_PRIMARY:
             weight_char = "P"
         elif weight & METASLAB_WEIGHT_SECONDARY:
@@ -80,21 +81,22 @@ class Metaslab(sdb.Locator, sdb.PrettyPrinter):
 
         print(
             "".ljust(indent),
-            str(int(msp.ms_id)).rjust(3),
+            str(int(metaslab.ms_id)).rjust(3),
             weight_char.rjust(4),
-            "L" if msp.ms_loaded else " ",
+            "L" if metaslab.ms_loaded else " ",
             algorithm.rjust(8),
             end="",
         )
-        if msp.ms_fragmentation == -1:
+        if metaslab.ms_fragmentation == -1:
             print("-".rjust(6), end="")
         else:
-            print((str(msp.ms_fragmentation) + "%").rjust(5), end="")
+            print((str(metaslab.ms_fragmentation) + "%").rjust(5), end="")
         print(
-            str(str(int(msp.ms_allocated_space) >> 20) + "M").rjust(7),
+            str(str(int(metaslab.ms_allocated_space) >> 20) + "M").rjust(7),
             ("({0:.1f}%)".format(
-                int(msp.ms_allocated_space) * 100 / int(msp.ms_size)).rjust(7)),
-            nicenum(msp.ms_max_size).rjust(10),
+                int(metaslab.ms_allocated_space) * 100 /
+                int(metaslab.ms_size)).rjust(7)),
+            nicenum(metaslab.ms_max_size).rjust(10),
             end="",
         )
 
@@ -112,7 +114,8 @@ class Metaslab(sdb.Locator, sdb.PrettyPrinter):
 
     @staticmethod
     def print_metaslab(prog: drgn.Program, msp, print_header, indent):
-        spacemap = msp.ms_sm
+        metaslab = sdb.coalesce(msp)
+        spacemap = metaslab.ms_sm
 
         if print_header:
             print(
@@ -126,32 +129,32 @@ class Metaslab(sdb.Locator, sdb.PrettyPrinter):
             )
             print("".ljust(indent), "-" * 65)
 
-        free = msp.ms_size
+        free = metaslab.ms_size
         if spacemap != drgn.NULL(prog, spacemap.type_):
             free -= spacemap.sm_phys.smp_alloc
 
-        ufrees = msp.ms_unflushed_frees.rt_space
-        uallocs = msp.ms_unflushed_allocs.rt_space
+        ufrees = metaslab.ms_unflushed_frees.rt_space
+        uallocs = metaslab.ms_unflushed_allocs.rt_space
         free = free + ufrees - uallocs
 
-        uchanges_free_mem = msp.ms_unflushed_frees.rt_root.avl_numnodes
-        uchanges_free_mem *= prog.type("range_seg_t").type.size
-        uchanges_alloc_mem = msp.ms_unflushed_allocs.rt_root.avl_numnodes
-        uchanges_alloc_mem *= prog.type("range_seg_t").type.size
+        uchanges_free_mem = metaslab.ms_unflushed_frees.rt_root.avl_numnodes
+        uchanges_free_mem *= sdb.get_type(prog, "range_seg_t").type.size
+        uchanges_alloc_mem = metaslab.ms_unflushed_allocs.rt_root.avl_numnodes
+        uchanges_alloc_mem *= sdb.get_type(prog, "range_seg_t").type.size
         uchanges_mem = uchanges_free_mem + uchanges_alloc_mem
 
         print(
             "".ljust(indent),
             hex(msp).ljust(16),
-            str(int(msp.ms_id)).rjust(4),
-            hex(msp.ms_start).rjust(16),
+            str(int(metaslab.ms_id)).rjust(4),
+            hex(metaslab.ms_start).rjust(16),
             nicenum(free).rjust(8),
             end="",
         )
-        if msp.ms_fragmentation == -1:
+        if metaslab.ms_fragmentation == -1:
             print("-".rjust(6), end="")
         else:
-            print((str(msp.ms_fragmentation) + "%").rjust(6), end="")
+            print((str(metaslab.ms_fragmentation) + "%").rjust(6), end="")
         print(nicenum(uchanges_mem).rjust(9))
 
     def pretty_print(self, metaslabs, indent=0):
@@ -179,6 +182,6 @@ class Metaslab(sdb.Locator, sdb.PrettyPrinter):
                         .format(i, vdev.vdev_ms_count, vdev.vdev_id))
                 yield vdev.vdev_ms[i]
         else:
+            vdev_ms = vdev.vdev_ms
             for i in range(0, int(vdev.vdev_ms_count)):
-                msp = vdev.vdev_ms[i]
-                yield msp
+                yield vdev_ms[i]
@@ -72,10 +72,19 @@ class Spa(sdb.Locator, sdb.PrettyPrinter):
                 Vdev(self.prog, self.arg_string).pretty_print(vdevs, 5)
 
     def no_input(self):
+        #
+        # Each node of the tree is a pool, so unless we are looking for
+        # pools by name (or for the last few pools, which no_input() is
+        # walked in full for), the tree doesn't have to be walked any
+        # further than our own limit.
+        #
+        avl = Avl(self.prog)
+        if not self.args.poolnames and self.tail is None:
+            avl.limit = self.limit
         spas = sdb.execute_pipeline(
             self.prog,
             [self.prog["spa_namespace_avl"].address_of_()],
-            [Avl(self.prog), Cast(self.prog, "spa_t *")],
+            [avl, Cast(self.prog, "spa_t *")],
         )
         for spa in spas:
             if (self.args.poolnames and
@@ -35,3 +35,13 @@ class SPLList(sdb.Walker):
                               type="void *",
                               value=int(node) - offset)
             node = node.next
+
+    def walk_reverse(self, obj: drgn.Object) -> Iterable[drgn.Object]:
+        offset = int(obj.list_offset)
+        first_node = obj.list_head.address_of_()
+        node = first_node.prev
+        while node != first_node:
+            yield drgn.Object(self.prog,
+                              type="void *",
+                              value=int(node) - offset)
+            node = node.prev
@@ -75,22 +75,23 @@ class Vdev(sdb.Locator, sdb.PrettyPrinter):
         print("".ljust(indent), "-" * 60)
 
         for vdev in vdevs:
+            vd = sdb.coalesce(vdev)
             level = 0
-            pvd = vdev.vdev_parent
+            pvd = vd.vdev_parent
             while pvd:
                 level += 2
                 pvd = pvd.vdev_parent
 
-            if int(vdev.vdev_path) != 0:
+            if int(vd.vdev_path) != 0:
                 print(
                     "".ljust(indent),
                     hex(vdev).ljust(18),
                     enum_lookup(self.prog, "vdev_state_t",
-                                vdev.vdev_state).ljust(7),
+                                vd.vdev_state).ljust(7),
                     enum_lookup(self.prog, "vdev_aux_t",
-                                vdev.vdev_stat.vs_aux).ljust(4),
+                                vd.vdev_stat.vs_aux).ljust(4),
                     "".ljust(level),
-                    vdev.vdev_path.string_().decode("utf-8"),
+                    vd.vdev_path.string_().decode("utf-8"),
                 )
 
             else:
@@ -98,11 +99,11 @@ class Vdev(sdb.Locator, sdb.PrettyPrinter):
                     "".ljust(indent),
                     hex(vdev).ljust(18),
                     enum_lookup(self.prog, "vdev_state_t",
-                                vdev.vdev_state).ljust(7),
+                                vd.vdev_state).ljust(7),
                     enum_lookup(self.prog, "vdev_aux_t",
-                                vdev.vdev_stat.vs_aux).ljust(4),
+                                vd.vdev_stat.vs_aux).ljust(4),
                     "".ljust(level),
-                    vdev.vdev_ops.vdev_op_type.string_().decode("utf-8"),
+                    vd.vdev_ops.vdev_op_type.string_().decode("utf-8"),
                 )
             if self.args.metaslab:
                 metaslabs = sdb.execute_pipeline(self.prog, [vdev],
@@ -62,3 +62,9 @@ class ZfsDbgmsg(sdb.Locator, sdb.PrettyPrinter):
             [SPLList(self.prog),
              Cast(self.prog, "zfs_dbgmsg_t *")]):
             yield obj
+
+    def no_input_reverse(self) -> Iterable[drgn.Object]:
+        proc_list = self.prog["zfs_dbgmsgs"].pl_list
+        out_type = sdb.get_type(self.prog, self.output_type)
+        for obj in SPLList(self.prog).walk_reverse(proc_list.address_of_()):
+            yield drgn.cast(out_type, obj)
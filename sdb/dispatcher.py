@@ -0,0 +1,163 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""This module contains the "sdb.TypeDispatcher" class."""
+
+import re
+from typing import Dict, Generic, List, Optional, Tuple, TypeVar
+
+import drgn
+import sdb
+
+V = TypeVar("V")
+
+
+def _canonical(typename: str) -> str:
+    """
+    Return the given type name spelled like drgn.Type.type_name() spells
+    it, as far as the stars of pointer types go (e.g. "char **" for
+    "char* *").
+    """
+    name = " ".join(typename.replace("*", " * ").split())
+    return re.sub(r"\* (?=\*)", "*", name)
+
+
+class TypeDispatcher(Generic[V]):
+    """
+    A TypeDispatcher maps the types of objects to values (e.g. the
+    methods or the classes that handle them), given a table keyed by
+    type name. Objects are dispatched on the name of their type with a
+    single dictionary lookup, followed by an equality check against the
+    resolved type of the name, which tells apart different types of the
+    same name.
+
+    The type names of the table are only resolved as objects of those
+    names come along, since resolving a type may load the debug info of
+    the kernel module that it belongs to (see sdb.internal.modules).
+
+    Objects tend to come in runs of the same type (e.g. all the vdevs of
+    a pool), so the outcome of the last lookup is remembered and reused
+    for as long as the same type keeps coming.
+    """
+
+    def __init__(self, prog: drgn.Program, table: Dict[str, V]) -> None:
+        self.prog = prog
+        self.table: Dict[str, V] = {}
+        for (typename, value) in table.items():
+            self.table.setdefault(_canonical(typename), value)
+        # type name -> (resolved type, value), or None if it didn't resolve
+        self.entries: Dict[str, Optional[Tuple[drgn.Type, V]]] = {}
+        self.last_type: Optional[drgn.Type] = None
+        self.last_value: Optional[V] = None
+
+    def _entry(self, typename: str) -> Optional[Tuple[drgn.Type, V]]:
+        if typename in self.entries:
+            return self.entries[typename]
+        #
+        # A type that the target doesn't have can't be the type of any
+        # of its objects, so it can safely be left out.
+        #
+        entry = None
+        try:
+            entry = (sdb.get_type(self.prog, typename), self.table[typename])
+        except LookupError:
+            pass
+        self.entries[typename] = entry
+        return entry
+
+    def lookup(self, type_: drgn.Type) -> Optional[V]:
+        """
+        Return the value of the given type, or None if it has none.
+        """
+        if type_ is self.last_type:
+            return self.last_value
+        value = None
+        typename = type_.type_name()
+        if typename in self.table:
+            entry = self._entry(typename)
+            if entry is not None and type_ == entry[0]:
+                value = entry[1]
+        self.last_type = type_
+        self.last_value = value
+        return value
+
+    def types(self) -> List[Tuple[drgn.Type, V]]:
+        """
+        Return the (resolved type, value) pairs of the dispatcher. This
+        resolves all the type names of the table.
+        """
+        entries = [self._entry(typename) for typename in self.table]
+        return [entry for entry in entries if entry is not None]
+
+
+class _RegistryDispatcher(TypeDispatcher[str]):
+    """
+    A TypeDispatcher to the keys of a registry of walkers or pretty
+    printers. The registry only knows of the keys of the modules that
+    were imported or declared in the manifest, and the manifest can't
+    tell the input type of every class (e.g. one that is inherited from
+    a base class of another module). So before a type is reported to
+    have no value, all the modules of the manifest are imported and the
+    keys that they registered are added to the table.
+    """
+
+    def __init__(self, prog: drgn.Program, registry: "sdb.Registry") -> None:
+        super().__init__(prog, {name: name for name in registry})
+        self.registry = registry
+        self.complete = False
+
+    def _complete(self) -> None:
+        if self.complete:
+            return
+        self.complete = True
+        sdb.import_all()
+        for name in self.registry:
+            self.table.setdefault(_canonical(name), name)
+        self.last_type = None
+
+    def lookup(self, type_: drgn.Type) -> Optional[str]:
+        value = super().lookup(type_)
+        if value is None and not self.complete:
+            self._complete()
+            value = super().lookup(type_)
+        return value
+
+    def types(self) -> List[Tuple[drgn.Type, str]]:
+        self._complete()
+        return super().types()
+
+
+def get_dispatcher(prog: drgn.Program,
+                   registry: "sdb.Registry") -> TypeDispatcher[str]:
+    """
+    Return a TypeDispatcher from the types of the given program to the
+    keys of the given registry of walkers or pretty printers, keyed by
+    input type. The dispatcher is built once per program and registry,
+    and built again only if the registry grows or the types of the
+    program are invalidated, so the types that it resolved are kept.
+    A type that no key matches is looked up again after all the modules
+    of the manifest are imported (see sdb.import_all()).
+    """
+    #
+    # The dispatcher is kept along with the data derived from the types
+    # of the program, since it holds on to some of them.
+    #
+    derived = sdb.get_type_cache(prog).derived
+    key = ("dispatcher", str(id(registry)))
+    entry = derived.get(key)
+    if entry is None or entry[0] != len(registry):
+        entry = (len(registry), _RegistryDispatcher(prog, registry))
+        derived[key] = entry
+    return entry[1]
@@ -0,0 +1,347 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This module contains the "sdb.FieldReader" class, which reads the
+members of objects straight from the memory of the target.
+"""
+
+import re
+import struct
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import drgn
+
+#
+# The reads of the fields of a batch of objects are merged into a single
+# read when the fields are no further apart than PREFETCH_GAP bytes,
+# as long as the merged read stays within PREFETCH_MAX bytes.
+#
+PREFETCH_GAP = 512
+PREFETCH_MAX = 64 << 10
+
+_MEMBER_PATH = re.compile(r"^obj((\s*\.\s*[A-Za-z_][A-Za-z0-9_]*)+)$")
+
+_INT_CODES = {1: "b", 2: "h", 4: "i", 8: "q"}
+
+
+def member_path(expr: str) -> Optional[List[str]]:
+    """
+    Return the names of the members of the given expression if it is a
+    plain member access of obj (e.g. ["a", "b"] for "obj.a.b"), or None
+    otherwise.
+    """
+    match = _MEMBER_PATH.match(expr.strip())
+    if match is None:
+        return None
+    return [name.strip() for name in match.group(1).split(".")[1:]]
+
+
+def _unqualified(type_: drgn.Type) -> drgn.Type:
+    type_ = type_.unqualified()
+    while type_.kind is drgn.TypeKind.TYPEDEF:
+        type_ = type_.type.unqualified()
+    return type_
+
+
+def _find_member(type_: drgn.Type,
+                 name: str) -> Optional[Tuple[drgn.Type, int, int]]:
+    """
+    Return the type, bit offset and bit field size of the member of the
+    given structure or union type, looking into its anonymous members.
+    """
+    for (member_type, member_name, bit_offset,
+         bit_field_size) in type_.members:
+        if member_name == name:
+            return (member_type, bit_offset, bit_field_size)
+        if member_name is None:
+            inner = _unqualified(member_type)
+            if inner.kind in (drgn.TypeKind.STRUCT, drgn.TypeKind.UNION):
+                found = _find_member(inner, name)
+                if found is not None:
+                    return (found[0], bit_offset + found[1], found[2])
+    return None
+
+
+class FieldLayout:
+    """
+    The location of a member of the objects of some type: for pointers,
+    relative to the address that they point to, and for other objects,
+    relative to their own address. type_ is the type of the member.
+    Character arrays are read as strings (is_string), and the rest as
+    the number (is_number, and is_float for floating-point ones) or the
+    address that they hold.
+    """
+
+    # pylint: disable=too-few-public-methods,too-many-instance-attributes
+
+    def __init__(self, prog: drgn.Program, type_: drgn.Type, deref: bool,
+                 offset: int) -> None:
+        self.type_ = type_
+        self.deref = deref
+        self.offset = offset
+        self.is_string = False
+        self.is_number = False
+        self.is_float = False
+        self.signed = False
+
+        little_endian = bool(prog.platform.flags
+                             & drgn.PlatformFlags.IS_LITTLE_ENDIAN)
+        self.byteorder = "little" if little_endian else "big"
+
+        leaf = _unqualified(type_)
+        self.size = leaf.size
+        code = None
+        if leaf.kind is drgn.TypeKind.ARRAY:
+            self.is_string = True
+        elif leaf.kind is drgn.TypeKind.FLOAT:
+            self.is_number = True
+            self.is_float = True
+            code = "f" if leaf.size == 4 else "d"
+        else:
+            self.is_number = leaf.kind is not drgn.TypeKind.POINTER
+            if leaf.kind is drgn.TypeKind.ENUM:
+                self.signed = leaf.type.is_signed
+            elif leaf.kind is drgn.TypeKind.INT:
+                self.signed = leaf.is_signed
+            code = _INT_CODES.get(leaf.size)
+            if code is not None and not self.signed:
+                code = code.upper()
+
+        #
+        # Numbers of the usual sizes are unpacked by a precompiled
+        # struct, which saves slicing them out of the data that they
+        # were read with.
+        #
+        self.unpack_from: Optional[Callable[[bytes, int], Tuple[Any, ...]]]
+        self.unpack_from = None
+        if code is not None:
+            self.unpack_from = struct.Struct(("<" if little_endian else ">") +
+                                             code).unpack_from
+
+    def decode(self, data: bytes, offset: int = 0) -> Any:
+        """
+        Return the value of the member, given the raw bytes that it
+        starts at the given offset of.
+        """
+        if self.unpack_from is not None:
+            return self.unpack_from(data, offset)[0]
+        data = data[offset:offset + self.size]
+        if self.is_string:
+            return data.split(b"\0", 1)[0]
+        return int.from_bytes(data, self.byteorder, signed=self.signed)
+
+
+def field_layout(prog: drgn.Program, type_: drgn.Type,
+                 path: List[str]) -> Optional[FieldLayout]:
+    """
+    Return the layout of the member of the given path for objects of the
+    given type, if the member can be read on its own, i.e. the path
+    doesn't go through pointers (other than the object itself) or bit
+    fields, and the member is a number, a pointer or a character array.
+    Otherwise, return None.
+    """
+    # pylint: disable=too-many-return-statements
+    type_ = _unqualified(type_)
+    deref = type_.kind is drgn.TypeKind.POINTER
+    if deref:
+        type_ = _unqualified(type_.type)
+
+    member_type = type_
+    bit_offset = 0
+    for name in path:
+        if type_.kind not in (drgn.TypeKind.STRUCT, drgn.TypeKind.UNION):
+            return None
+        found = _find_member(type_, name)
+        if found is None or found[2]:
+            return None
+        (member_type, member_offset, _) = found
+        bit_offset += member_offset
+        type_ = _unqualified(member_type)
+    if bit_offset % 8:
+        return None
+
+    if type_.kind is drgn.TypeKind.ARRAY:
+        element = _unqualified(type_.type)
+        if element.kind is not drgn.TypeKind.INT or element.size != 1 or (
+                type_.length is None):
+            return None
+    elif type_.kind is drgn.TypeKind.ENUM:
+        if type_.type is None:
+            return None
+    elif type_.kind is drgn.TypeKind.FLOAT:
+        if type_.size not in (4, 8):
+            return None
+    elif type_.kind not in (drgn.TypeKind.INT, drgn.TypeKind.BOOL,
+                            drgn.TypeKind.POINTER):
+        return None
+    return FieldLayout(prog, member_type, deref, bit_offset // 8)
+
+
+def drgn_value(obj: drgn.Object) -> Any:
+    """
+    Return the value of the given object in the form that the members
+    read by a FieldReader are returned in, i.e. the contents of character
+    arrays as bytes and everything else as its drgn.Object.value_().
+    """
+    type_ = _unqualified(obj.type_)
+    if type_.kind is drgn.TypeKind.ARRAY and type_.type.size == 1:
+        return obj.string_()
+    return obj.value_()
+
+
+class FieldReader:
+    """
+    A FieldReader reads the member of a given path (e.g. obj.a.b) of
+    the objects that it is given straight from the memory of the target,
+    rather than through the drgn.Object of every member along the path.
+    The layout of the member is worked out once per type of object.
+
+    Commands that handle their input in batches should prefetch() the
+    member of the whole batch first, which merges the reads of the
+    members that are close to each other (e.g. those of the elements of
+    an array, or of objects of the same slab) into a single read.
+    """
+
+    def __init__(self, prog: drgn.Program, path: List[str]) -> None:
+        self.prog = prog
+        self.path = path
+        self.layouts: Dict[str, Tuple[drgn.Type, Optional[FieldLayout]]] = {}
+        self.last_type: Optional[drgn.Type] = None
+        self.last_layout: Optional[FieldLayout] = None
+        self.prefetched: Dict[int, Tuple[drgn.Object, FieldLayout, Any]] = {}
+
+    def layout(self, type_: drgn.Type) -> Optional[FieldLayout]:
+        """
+        Return the layout of the member for objects of the given type.
+        """
+        if type_ is self.last_type:
+            return self.last_layout
+        name = type_.type_name()
+        entry = self.layouts.get(name)
+        if entry is None or not entry[0] == type_:
+            #
+            # Reading members on our own is only an optimization, so
+            # anything that we fail to lay out is left to drgn.
+            #
+            try:
+                layout = field_layout(self.prog, type_, self.path)
+            except (LookupError, TypeError, ValueError):
+                layout = None
+            entry = (type_, layout)
+            self.layouts[name] = entry
+        self.last_type = type_
+        self.last_layout = entry[1]
+        return entry[1]
+
+    def _address(self, obj: drgn.Object, layout: FieldLayout) -> Optional[int]:
+        if layout.deref:
+            base = obj.value_()
+            #
+            # Leave NULL pointers to drgn, so they fail the same way as
+            # they would without us.
+            #
+            if not base:
+                return None
+        else:
+            base = obj.address_
+            if base is None:
+                return None
+        return base + layout.offset
+
+    def prefetch(self, objs: Iterable[drgn.Object]) -> None:
+        """
+        Read the member of all the given objects, with as few reads as
+        possible, for the read() calls that follow. Anything prefetched
+        earlier is dropped.
+        """
+        self.prefetched = {}
+        located = []
+        for obj in objs:
+            layout = self.layout(obj.type_)
+            if layout is None:
+                continue
+            address = self._address(obj, layout)
+            if address is not None:
+                located.append((address, id(obj), layout, obj))
+        located.sort()
+
+        run: List[Tuple[int, int, FieldLayout, drgn.Object]] = []
+        end = 0
+        for entry in located:
+            (address, _, layout, _) = entry
+            if run and (address - end > PREFETCH_GAP
+                        or address + layout.size - run[0][0] > PREFETCH_MAX):
+                self._read_run(run, end)
+                run = []
+            if not run or address + layout.size > end:
+                end = address + layout.size
+            run.append(entry)
+        if run:
+            self._read_run(run, end)
+
+    def _read_run(self, run: List[Tuple[int, int, FieldLayout, drgn.Object]],
+                  end: int) -> None:
+        start = run[0][0]
+        try:
+            data = self.prog.read(start, end - start)
+        except drgn.FaultError:
+            #
+            # Some of the run isn't there, so leave it to read() to read
+            # its members one by one.
+            #
+            return
+        for (address, key, layout, obj) in run:
+            self.prefetched[key] = (obj, layout,
+                                    layout.decode(data, address - start))
+
+    def read(self, obj: drgn.Object) -> Optional[Tuple[FieldLayout, Any]]:
+        """
+        Return the layout and the value of the member of the given
+        object, or None if it can't be read on its own, in which case
+        the caller should evaluate the member through drgn.
+        """
+        entry = self.prefetched.get(id(obj))
+        if entry is not None and entry[0] is obj:
+            return (entry[1], entry[2])
+        layout = self.layout(obj.type_)
+        if layout is None:
+            return None
+        address = self._address(obj, layout)
+        if address is None:
+            return None
+        return (layout, layout.decode(self.prog.read(address, layout.size)))
+
+    def value(self, obj: drgn.Object) -> Any:
+        """
+        Return the value of the member of the given object, in the form
+        that read() returns it in, evaluating it through drgn if it can't
+        be read on its own. Like drgn, this raises a LookupError or a
+        TypeError if the object has no such member.
+        """
+        found = self.read(obj)
+        if found is not None:
+            return found[1]
+        for name in self.path:
+            obj = obj.member_(name)
+        return drgn_value(obj)
+
+    def values(self, objs: List[drgn.Object]) -> List[Any]:
+        """
+        Prefetch the member of the given objects and return the value()
+        of each.
+        """
+        self.prefetch(objs)
+        return [self.value(obj) for obj in objs]
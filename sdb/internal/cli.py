@@ -19,14 +19,45 @@ like the entry point, command line interface, etc...
 """
 
 import argparse
+import atexit
+import fnmatch
 import os
+import queue
 import sys
+import threading
+from typing import Dict, List, Optional, Tuple
 
 import drgn
 import sdb
+from sdb.internal.index import (TypeIndex, elf_build_id, file_signature,
+                                index_dir, index_key, live_build_ids)
+from sdb.internal.modules import (LazyModules, find_vmlinux, loaded_modules,
+                                  module_dirs)
 from sdb.internal.repl import REPL
 
 
+_SIZE_SUFFIXES = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(text: str) -> int:
+    """
+    Parse a size in bytes, optionally followed by a K, M, or G suffix
+    for binary kilobytes, megabytes, or gigabytes respectively.
+    """
+    number = text.strip().upper()
+    multiplier = 1
+    if number and number[-1] in _SIZE_SUFFIXES:
+        multiplier = _SIZE_SUFFIXES[number[-1]]
+        number = number[:-1]
+    try:
+        size = int(number) * multiplier
+    except ValueError:
+        size = -1
+    if size < 0:
+        raise argparse.ArgumentTypeError("invalid size: {}".format(text))
+    return size
+
+
 def parse_arguments() -> argparse.Namespace:
     """
     Sets up argument parsing and does the first pass of validation
@@ -79,6 +110,70 @@ def parse_arguments() -> argparse.Namespace:
         help=
         "don't load any debugging symbols that were not explicitly added with -s",
     )
+    dis_group.add_argument(
+        "--load-all-modules",
+        action="store_true",
+        help="load the debug info of all the modules of the running kernel" +
+        " at startup, rather than when they are first needed",
+    )
+    dis_group.add_argument(
+        "-M",
+        "--module",
+        metavar="PATTERN",
+        dest="module_allow",
+        action="append",
+        help="only load the debug info of the kernel modules whose name" +
+        " matches the given pattern (e.g. \"zfs\" or \"z*\"), whether" +
+        " found in -s directories or loaded on demand; this option may be" +
+        " given more than once",
+    )
+    dis_group.add_argument(
+        "-X",
+        "--exclude-module",
+        metavar="PATTERN",
+        dest="module_deny",
+        action="append",
+        help="don't load the debug info of the kernel modules whose name" +
+        " matches the given pattern; this option may be given more than once",
+    )
+    dis_group.add_argument(
+        "--scan-threads",
+        metavar="N",
+        type=int,
+        default=1,
+        help="the number of threads that traverse -s directories",
+    )
+    dis_group.add_argument(
+        "--no-index-cache",
+        dest="index_cache",
+        action="store_false",
+        help="always load the debug info of the target, rather than use" +
+        " the index of the types and constants of earlier sessions;" +
+        " the index can't serve variables and functions, whose addresses" +
+        " change between boots, so looking one up loads the debug info",
+    )
+
+    mem_group = parser.add_argument_group("target memory access")
+    mem_group.add_argument(
+        "--read-stats",
+        action="store_true",
+        help="keep statistics of the memory reads done on the target;" +
+        " these can be viewed with the \"stats\" command",
+    )
+    mem_group.add_argument(
+        "--read-cache",
+        type=parse_size,
+        default=0,
+        metavar="SIZE",
+        help="cache up to SIZE bytes (e.g. 256M) of the memory read from" +
+        " the target, for the duration of each pipeline",
+    )
+    mem_group.add_argument(
+        "--keep-read-cache",
+        action="store_true",
+        help="keep the contents of the read cache across pipelines," +
+        " for the whole session",
+    )
 
     parser.add_argument("-q",
                         "--quiet",
@@ -114,52 +209,247 @@ def parse_arguments() -> argparse.Namespace:
     #
     if args.object and not args.core:
         parser.error("raw object file target is not supported yet")
+
+    #
+    # The memory of running processes is not read through sdb's own
+    # readers, so there is nothing for them to account for.
+    #
+    if args.pid and (args.read_stats or args.read_cache):
+        parser.error(
+            "--read-stats and --read-cache are not supported with --pid")
+    if args.keep_read_cache and not args.read_cache:
+        parser.error("--keep-read-cache requires --read-cache")
     return args
 
 
-def load_debug_info(prog: drgn.Program, dpaths: [str]) -> None:
+def module_name(path: str) -> str:
+    """
+    Return the name of the kernel module at the given path. Like the
+    kernel, we don't distinguish dashes from underscores in the names
+    of modules.
+    """
+    return os.path.basename(path)[:-len(".ko")].replace("-", "_")
+
+
+class ModuleFilter:
+    """
+    Decides which of the kernel modules found in the directories that we
+    traverse we should load the debug info of (at startup or on demand),
+    based on the --module and --exclude-module patterns.
+    """
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self,
+                 allow: Optional[List[str]] = None,
+                 deny: Optional[List[str]] = None) -> None:
+        self.allow = [pattern.replace("-", "_") for pattern in allow or []]
+        self.deny = [pattern.replace("-", "_") for pattern in deny or []]
+
+    def __call__(self, path: str) -> bool:
+        name = module_name(path)
+        if self.allow and not any(
+                fnmatch.fnmatchcase(name, pattern) for pattern in self.allow):
+            return False
+        return not any(
+            fnmatch.fnmatchcase(name, pattern) for pattern in self.deny)
+
+
+def _scan_dir(path: str) -> Tuple[List[str], List[str]]:
+    """
+    Return the kernel modules and the subdirectories of the given
+    directory.
+    """
+    modules, subdirs = [], []
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return (modules, subdirs)
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            subdirs.append(entry.path)
+        elif entry.name.endswith(".ko"):
+            modules.append(entry.path)
+    return (modules, subdirs)
+
+
+def find_modules(path: str, threads: int = 1) -> List[str]:
+    """
+    Traverse the given directory in search of kernel modules, scanning
+    up to the given number of directories at a time. Trees like
+    /lib/modules/<version> have thousands of directories, and the time
+    spent on each one is mostly spent waiting for the filesystem, so
+    scanning them in parallel pays off even with the GIL.
+    """
+    if threads <= 1:
+        modules = []
+        for (ppath, __, files) in os.walk(path):
+            for i in files:
+                if i.endswith(".ko"):
+                    modules.append(os.sep.join([ppath, i]))
+        return sorted(modules)
+
+    modules: List[str] = []
+    errors: List[Exception] = []
+    work: "queue.Queue[Optional[str]]" = queue.Queue()
+
+    def scan() -> None:
+        while True:
+            path = work.get()
+            if path is None:
+                return
+            #
+            # Every directory taken off the queue must be marked as done,
+            # or work.join() below would wait for it forever. Once a
+            # scanner has failed, the rest of the queue is drained
+            # without being scanned, and the error is raised by the
+            # caller.
+            #
+            try:
+                if errors:
+                    continue
+                (found, subdirs) = _scan_dir(path)
+                modules.extend(found)
+                for subdir in subdirs:
+                    work.put(subdir)
+            except Exception as err:  # pylint: disable=broad-except
+                errors.append(err)
+            finally:
+                work.task_done()
+
+    work.put(path)
+    scanners = [threading.Thread(target=scan) for _ in range(threads)]
+    for scanner in scanners:
+        scanner.start()
+    work.join()
+    for _ in scanners:
+        work.put(None)
+    for scanner in scanners:
+        scanner.join()
+    if errors:
+        raise errors[0]
+    return sorted(modules)
+
+
+def debug_info_files(dpaths: List[str],
+                     module_filter: Optional[ModuleFilter] = None,
+                     threads: int = 1) -> List[str]:
+    """
+    Return the files that debug info is loaded from for the paths
+    provided (`dpaths`). Directories are traversed in search of kernel
+    modules, which are only returned if they pass the given filter.
+    """
+    files = []
+    for path in dpaths:
+        if os.path.isfile(path):
+            files.append(path)
+        elif os.path.isdir(path):
+            modules = find_modules(path, threads)
+            if module_filter is not None:
+                modules = [
+                    module for module in modules if module_filter(module)
+                ]
+            files += modules
+    return files
+
+
+def load_debug_info(prog: drgn.Program,
+                    dpaths: [str],
+                    module_filter: Optional[ModuleFilter] = None,
+                    threads: int = 1) -> None:
     """
     Iterates over all the paths provided (`dpaths`) and attempts
     to load any debug information it finds. If the path provided
     is a directory, the whole directory is traversed in search
-    of debug info.
+    of debug info, which is loaded for the kernel modules that
+    pass the given filter.
     """
     for path in dpaths:
         if os.path.isfile(path):
             prog.load_debug_info([path])
         elif os.path.isdir(path):
-            kos = []
-            for (ppath, __, files) in os.walk(path):
-                for i in files:
-                    if i.endswith(".ko"):
-                        kos.append(os.sep.join([ppath, i]))
-            prog.load_debug_info(kos)
+            #
+            # All the modules are handed to drgn at once, as it indexes
+            # the debug info of the files that it is given in parallel.
+            #
+            prog.load_debug_info(
+                debug_info_files([path], module_filter, threads))
         else:
             print("sdb: " + path + " is not a regular file or directory")
 
 
-def setup_target(args: argparse.Namespace) -> drgn.Program:
+def setup_target_memory(prog: drgn.Program, args: argparse.Namespace) -> None:
     """
-    Based on the validated input from the command line, setup the
-    drgn.Program for our target and its metadata.
+    Have the memory of the target be read through sdb's own readers
+    (see sdb.TargetMemory), rather than the ones built into drgn.
+    Core dumps are read through a memory mapping, which is cheaper
+    than a system call for every read. This is still slower than
+    drgn's own reader, so sdb's readers are only used when the reads
+    are accounted for or cached.
     """
-    prog = drgn.Program()
-    if args.core:
-        prog.set_core_dump(args.core)
-
+    path = args.core if args.core else "/proc/kcore"
+    try:
+        sdb.TargetMemory(prog,
+                         path,
+                         accounting=args.read_stats,
+                         cache_size=args.read_cache,
+                         keep_cache=args.keep_read_cache,
+                         use_mmap=bool(args.core))
+    except (OSError, ValueError) as err:
         #
-        # This is currently a short-coming of drgn. Whenever we
-        # open a crash/core dump we need to specify the vmlinux
-        # or userland binary using the non-default debug info
-        # load API.
+        # We can still debug the target through drgn's readers, so
+        # just warn the user that the options they asked for won't
+        # take effect and proceed.
         #
-        args.symbol_search.insert(0, args.object)
-    elif args.pid:
-        prog.set_pid(args.pid)
-    else:
-        prog.set_kernel()
+        print("sdb: cannot read memory from {}: {}".format(path, err),
+              file=sys.stderr)
+
+
+def setup_lazy_modules(prog: drgn.Program, args: argparse.Namespace) -> bool:
+    """
+    When debugging the running kernel, load the debug info of vmlinux and
+    have the debug info of its modules be loaded on demand (see
+    sdb.internal.modules.LazyModules). Returns False if the debug info
+    should be loaded up front instead.
+    """
+    if args.core or args.pid or args.load_all_modules:
+        return False
+    release = os.uname().release
+    vmlinux = find_vmlinux(release)
+    if vmlinux is None:
+        return False
+    try:
+        prog.load_debug_info([vmlinux])
+    except (drgn.FileFormatError, drgn.MissingDebugInfoError, OSError):
+        return False
+
+    def module_files() -> Dict[str, str]:
+        module_filter = ModuleFilter(args.module_allow, args.module_deny)
+        try:
+            loaded = loaded_modules()
+        except OSError:
+            return {}
+        files: Dict[str, str] = {}
+        for path in module_dirs(release):
+            if not os.path.isdir(path):
+                continue
+            for module in debug_info_files([path], module_filter,
+                                           args.scan_threads):
+                name = module_name(module)
+                if name in loaded:
+                    files.setdefault(name, module)
+        return files
+
+    LazyModules(prog, module_files, quiet=args.quiet).install()
+    return True
 
-    if args.default_symbols:
+
+def load_target_debug_info(prog: drgn.Program,
+                           args: argparse.Namespace) -> None:
+    """
+    Load the debug info of the target, as specified in the command line.
+    """
+    if args.default_symbols and not setup_lazy_modules(prog, args):
         try:
             prog.load_default_debug_info()
         except drgn.MissingDebugInfoError as debug_info_err:
@@ -169,8 +459,8 @@ def setup_target(args: argparse.Namespace) -> drgn.Program:
             # That's fine because the user may not need those, so
             # print a warning and proceed.
             #
-            # Again because of the aforementioned short-coming of drgn
-            # we quiet any errors when loading the *default debug info*
+            # Again because of the short-coming of drgn mentioned in
+            # setup_target() we quiet any errors when loading the *default debug info*
             # if we are looking at a crash/core dump.
             #
             if not args.quiet and not args.object:
@@ -178,7 +468,9 @@ def setup_target(args: argparse.Namespace) -> drgn.Program:
 
     if args.symbol_search:
         try:
-            load_debug_info(prog, args.symbol_search)
+            load_debug_info(prog, args.symbol_search,
+                            ModuleFilter(args.module_allow, args.module_deny),
+                            args.scan_threads)
         except (
                 drgn.FileFormatError,
                 drgn.MissingDebugInfoError,
@@ -190,12 +482,108 @@ def setup_target(args: argparse.Namespace) -> drgn.Program:
             if not args.quiet:
                 print("sdb: " + str(debug_info_err), file=sys.stderr)
 
+
+def open_index(prog: drgn.Program,
+               args: argparse.Namespace) -> Optional[TypeIndex]:
+    """
+    Return the index of the types and symbols of the target, which may
+    be empty if no session has used it yet. The index is keyed by the
+    build-ids of the kernel and of the files that debug info is loaded
+    from (or the signatures of the modules found in directories), so
+    None is returned if there are none.
+    """
+    if not args.index_cache or args.pid:
+        return None
+    build_ids = [] if args.core else live_build_ids()
+    dpaths = args.symbol_search or []
+    for path in dpaths:
+        if not os.path.isfile(path):
+            continue
+        try:
+            build_id = elf_build_id(path)
+        except OSError:
+            continue
+        if build_id is not None:
+            build_ids.append(build_id)
+    #
+    # The directories may hold hundreds of modules, so reading the
+    # build-id of each of them on every startup would cost more than the
+    # index saves. Those are keyed by their size and modification time
+    # instead.
+    #
+    module_filter = ModuleFilter(args.module_allow, args.module_deny)
+    dirs = [path for path in dpaths if os.path.isdir(path)]
+    for path in debug_info_files(dirs, module_filter, args.scan_threads):
+        signature = file_signature(path)
+        if signature is not None:
+            build_ids.append(signature)
+    if not build_ids:
+        return None
+    if not args.default_symbols:
+        build_ids.append("no-default-symbols")
+    path = os.path.join(index_dir(), index_key(build_ids) + ".json")
+    return TypeIndex(prog, path)
+
+
+def save_index(index: TypeIndex, args: argparse.Namespace) -> None:
+    """
+    Save the index, warning about but otherwise ignoring any failure,
+    since the next session can always fall back to loading debug info.
+    """
+    try:
+        index.save()
+    except (NotImplementedError, OSError) as err:
+        if not args.quiet:
+            print("sdb: cannot save the type index: {}".format(err),
+                  file=sys.stderr)
+
+
+def setup_target(args: argparse.Namespace) -> drgn.Program:
+    """
+    Based on the validated input from the command line, setup the
+    drgn.Program for our target and its metadata.
+    """
+    prog = drgn.Program()
+    if args.core:
+        prog.set_core_dump(args.core)
+
+        #
+        # This is currently a short-coming of drgn. Whenever we
+        # open a crash/core dump we need to specify the vmlinux
+        # or userland binary using the non-default debug info
+        # load API.
+        #
+        args.symbol_search = [args.object] + (args.symbol_search or [])
+    elif args.pid:
+        prog.set_pid(args.pid)
+    else:
+        prog.set_kernel()
+
+    if args.read_stats or args.read_cache:
+        setup_target_memory(prog, args)
+
+    #
+    # If an earlier session on the same target left an index of the
+    # types and symbols that it used, we serve those from the index and
+    # only load the debug info once something misses it.
+    #
+    index = open_index(prog, args)
+    if index is not None and index.hit:
+        index.install(lambda: load_target_debug_info(prog, args))
+    else:
+        load_target_debug_info(prog, args)
+        if index is not None:
+            index.record()
+    if index is not None:
+        atexit.register(save_index, index, args)
+
     return prog
 
 
 def main() -> None:
     """ The entry point of the sdb "executable" """
     args = parse_arguments()
+    sdb.update_manifest_cache()
 
     try:
         prog = setup_target(args)
@@ -0,0 +1,537 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains the persistent index of the types and symbols that
+sdb sessions look up, which is used to skip the loading of the debug
+info of a kernel that sdb has already been used on.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import struct
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import drgn
+import sdb
+
+#
+# Bump this whenever the format of the index changes, so that indexes
+# written by older versions of sdb are ignored.
+#
+INDEX_VERSION = 2
+
+_ELF_MAGIC = b"\x7fELF"
+_ELFCLASS64 = 2
+_ELFDATA2LSB = 1
+_SHT_NOTE = 7
+_NT_GNU_BUILD_ID = 3
+
+
+def parse_notes(data: bytes,
+                endian: str = "<") -> List[Tuple[bytes, int, bytes]]:
+    """
+    Return the (name, type, descriptor) triples of the ELF notes in the
+    given buffer (e.g. the contents of a SHT_NOTE section).
+    """
+    notes = []
+    header = struct.Struct(endian + "III")
+    offset = 0
+    while offset + header.size <= len(data):
+        (namesz, descsz, type_) = header.unpack_from(data, offset)
+        offset += header.size
+        name = data[offset:offset + namesz].rstrip(b"\0")
+        offset += (namesz + 3) & ~3
+        desc = data[offset:offset + descsz]
+        offset += (descsz + 3) & ~3
+        notes.append((name, type_, desc))
+    return notes
+
+
+def notes_build_id(data: bytes, endian: str = "<") -> Optional[str]:
+    """
+    Return the GNU build-id found in the given ELF notes, if any, as a
+    hex string.
+    """
+    for (name, type_, desc) in parse_notes(data, endian):
+        if name == b"GNU" and type_ == _NT_GNU_BUILD_ID:
+            return desc.hex()
+    return None
+
+
+def elf_build_id(path: str) -> Optional[str]:
+    """
+    Return the GNU build-id of the given ELF file (e.g. vmlinux or a
+    kernel module), if it has one.
+    """
+    # pylint: disable=too-many-locals
+    with open(path, "rb") as elf:
+        ident = elf.read(16)
+        if len(ident) != 16 or ident[:4] != _ELF_MAGIC:
+            return None
+        is64 = ident[4] == _ELFCLASS64
+        endian = "<" if ident[5] == _ELFDATA2LSB else ">"
+
+        if is64:
+            ehdr = struct.Struct(endian + "HHIQQQIHHHHHH")
+            shdr = struct.Struct(endian + "IIQQQQIIQQ")
+        else:
+            ehdr = struct.Struct(endian + "HHIIIIIHHHHHH")
+            shdr = struct.Struct(endian + "IIIIIIIIII")
+        (_, _, _, _, _, shoff, _, _, _, _, shentsize, shnum,
+         _) = ehdr.unpack(elf.read(ehdr.size))
+
+        elf.seek(shoff)
+        table = elf.read(shentsize * shnum)
+        for num in range(shnum):
+            (_, sh_type, _, _, offset, size, _, _, _,
+             _) = shdr.unpack_from(table, num * shentsize)
+            if sh_type != _SHT_NOTE:
+                continue
+            elf.seek(offset)
+            build_id = notes_build_id(elf.read(size), endian)
+            if build_id is not None:
+                return build_id
+    return None
+
+
+def file_signature(path: str) -> Optional[str]:
+    """
+    Return a string that changes whenever the given file is replaced or
+    rewritten (made of its path, size and modification time), which is
+    much cheaper to get than its build-id.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return "{}:{}:{}".format(path, stat.st_size, stat.st_mtime_ns)
+
+
+def live_build_ids() -> List[str]:
+    """
+    Return the build-ids of the running kernel and of its loaded
+    modules.
+    """
+    build_ids = []
+    paths = ["/sys/kernel/notes"]
+    paths += sorted(glob.glob("/sys/module/*/notes/.note.gnu.build-id"))
+    for path in paths:
+        try:
+            with open(path, "rb") as notes:
+                build_id = notes_build_id(notes.read())
+        except OSError:
+            continue
+        if build_id is not None:
+            build_ids.append(build_id)
+    return build_ids
+
+
+def index_key(build_ids: List[str]) -> str:
+    """
+    Return the name that the index of a target with the given build-ids
+    (or signatures of its debug info files) is stored under.
+    """
+    digest = hashlib.sha1()
+    for build_id in build_ids:
+        digest.update(build_id.encode("ascii") + b"\n")
+    return digest.hexdigest()
+
+
+def index_dir() -> str:
+    # pylint: disable=missing-docstring
+    cache = os.environ.get("XDG_CACHE_HOME",
+                           os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(cache, "sdb", "index")
+
+
+_KIND_PREFIXES = {
+    drgn.TypeKind.STRUCT: "struct ",
+    drgn.TypeKind.UNION: "union ",
+    drgn.TypeKind.ENUM: "enum ",
+}
+
+_NAMED_KINDS = {
+    drgn.TypeKind.VOID, drgn.TypeKind.INT, drgn.TypeKind.BOOL,
+    drgn.TypeKind.FLOAT, drgn.TypeKind.TYPEDEF
+}
+
+_TAGGED_KINDS = set(_KIND_PREFIXES)
+
+
+def lookup_name(kind: drgn.TypeKind, name: str) -> str:
+    """
+    Return the name that the type of the given kind and name, as passed
+    to a type finder, is looked up by with drgn.Program.type().
+    """
+    return _KIND_PREFIXES.get(kind, "") + name
+
+
+class TypeIndex:
+    """
+    A TypeIndex is the on-disk record of the types and objects that were
+    looked up by name during the sdb sessions on a given target.
+
+    When a session finds an index for its target, it doesn't load any
+    debug info. Instead, the index is installed as a type and an object
+    finder of the drgn.Program, and the types that it serves are
+    re-created from the index as they are looked up. The first lookup
+    that the index can't serve loads all of the debug info, after
+    which drgn is left to find everything on its own.
+
+    Only the objects that have no address (e.g. enumerators) are kept
+    in the index. The index is keyed by build-ids, which don't tell
+    apart two boots (or two dumps) of the same kernel, while the
+    addresses of variables and functions change between boots with
+    KASLR and with the order that modules are loaded in. Looking up
+    those objects always loads the debug info.
+
+    Whenever the debug info ends up being loaded, the index records the
+    names that are looked up and is rewritten with them when save() is
+    called, so the next session can be served by it.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, prog: drgn.Program, path: str) -> None:
+        self.prog = prog
+        self.path = path
+        self.hit = False
+        self.complete = False
+        self.busy = False
+        self.load_debug_info: Optional[Callable[[], None]] = None
+
+        # The serialized types; see _Serializer.
+        self.entries: List[Dict[str, Any]] = []
+        # "<kind> <name>" -> the index of the named type in entries
+        self.names: Dict[str, int] = {}
+        # symbol -> serialized constant
+        self.objects: Dict[str, Dict[str, Any]] = {}
+        self.types: Dict[int, drgn.Type] = {}
+
+        # Names looked up while the debug info is loaded.
+        self.used_types: Set[Tuple[drgn.TypeKind, str]] = set()
+        self.used_objects: Set[str] = set()
+
+        try:
+            with open(path) as index:
+                contents = json.load(index)
+        except (OSError, ValueError):
+            return
+        if contents.get("version") != INDEX_VERSION:
+            return
+        self.entries = contents["types"]
+        self.names = contents["names"]
+        self.objects = contents["objects"]
+        self.hit = True
+
+    def install(self, load_debug_info: Callable[[], None]) -> None:
+        """
+        Have the program look types and objects up in this index. If the
+        index has no record of a lookup, load_debug_info is called to
+        load all the debug info of the target.
+        """
+        self.load_debug_info = load_debug_info
+        self.prog.add_type_finder(self._find_type)
+        self.prog.add_object_finder(self._find_object)
+
+    def record(self) -> None:
+        """
+        Record the names that the program looks up, now that all of its
+        debug info has been loaded, so that save() can index them.
+        """
+        self.complete = True
+        self.install(lambda: None)
+
+    def save(self) -> None:
+        """
+        Rewrite the index with everything that it already had and all
+        the names recorded since the debug info was loaded. If nothing
+        missed the index, it is left untouched.
+        """
+        if not self.complete:
+            return
+        lookups = set(self.used_types)
+        for key in self.names:
+            (kind, _, name) = key.partition(" ")
+            lookups.add((drgn.TypeKind[kind], name))
+        symbols = self.used_objects | set(self.objects)
+
+        serializer = _Serializer()
+        names = {}
+        objects = {}
+        self.busy = True
+        try:
+            for (kind, name) in sorted(lookups, key=lambda item: item[1]):
+                try:
+                    type_ = self.prog.type(lookup_name(kind, name))
+                except LookupError:
+                    continue
+                names[kind.name + " " + name] = serializer.add(type_)
+            for symbol in sorted(symbols):
+                try:
+                    obj = self.prog.object(symbol)
+                except LookupError:
+                    continue
+                if obj.address_ is None:
+                    objects[symbol] = serializer.add_object(obj)
+            serializer.finish()
+        finally:
+            self.busy = False
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = "{}.{}".format(self.path, os.getpid())
+        with open(tmp, "w") as index:
+            json.dump(
+                {
+                    "version": INDEX_VERSION,
+                    "types": serializer.entries,
+                    "names": names,
+                    "objects": objects,
+                },
+                index,
+                separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def _miss(self) -> None:
+        """
+        Called when a lookup misses the index.
+        """
+        assert self.load_debug_info is not None
+        self.complete = True
+        self.busy = True
+        try:
+            self.load_debug_info()
+        finally:
+            self.busy = False
+        #
+        # The types that were served from the index so far are not the
+        # ones of the debug info, so they must not be handed out anymore.
+        #
+        sdb.get_type_cache(self.prog).invalidate()
+
+    def _find_type(self, kind: drgn.TypeKind, name: str,
+                   filename: Optional[str]) -> Optional[drgn.Type]:
+        if self.busy or filename is not None:
+            return None
+        if self.complete:
+            self.used_types.add((kind, name))
+            return None
+
+        num = self.names.get(kind.name + " " + name)
+        if num is not None:
+            return self.type(num)
+
+        self._miss()
+        self.used_types.add((kind, name))
+        #
+        # The finders of the debug info that was just loaded come after
+        # us, so look the type up again, now that we will be skipped.
+        #
+        self.busy = True
+        try:
+            return self.prog.type(lookup_name(kind, name))
+        except LookupError:
+            return None
+        finally:
+            self.busy = False
+
+    def _find_object(self, prog: drgn.Program, name: str,
+                     flags: drgn.FindObjectFlags,
+                     filename: Optional[str]) -> Optional[drgn.Object]:
+        # pylint: disable=too-many-return-statements
+        if self.busy or filename is not None:
+            return None
+        if self.complete:
+            self.used_objects.add(name)
+            return None
+
+        entry = self.objects.get(name)
+        if entry is not None:
+            if not flags & _OBJECT_FLAGS[entry["f"]]:
+                return None
+            return drgn.Object(prog, self.type(entry["t"]), value=entry["v"])
+
+        self._miss()
+        self.used_objects.add(name)
+        self.busy = True
+        try:
+            return self.prog.object(name, flags)
+        except LookupError:
+            return None
+        finally:
+            self.busy = False
+
+    def type(self, num: int) -> drgn.Type:
+        """
+        Return the type that is serialized at the given position of the
+        index, re-creating it if needed.
+        """
+        type_ = self.types.get(num)
+        if type_ is None:
+            type_ = self.types[num] = _deserialize(self, self.entries[num])
+        return type_
+
+
+_OBJECT_FLAGS = {
+    "c": drgn.FindObjectFlags.CONSTANT,
+}
+
+
+def _lazy(index: TypeIndex, num: int) -> Callable[[], drgn.Type]:
+    return lambda: index.type(num)
+
+
+def _deserialize(index: TypeIndex, entry: Dict[str, Any]) -> drgn.Type:
+    # pylint: disable=too-many-return-statements
+    kind = drgn.TypeKind[entry["k"]]
+    qualifiers = drgn.Qualifiers(entry["q"])
+    if kind == drgn.TypeKind.VOID:
+        return drgn.void_type(qualifiers)
+    if kind == drgn.TypeKind.INT:
+        return drgn.int_type(entry["n"], entry["s"], entry["g"], qualifiers)
+    if kind == drgn.TypeKind.BOOL:
+        return drgn.bool_type(entry["n"], entry["s"], qualifiers)
+    if kind == drgn.TypeKind.FLOAT:
+        return drgn.float_type(entry["n"], entry["s"], qualifiers)
+    if kind == drgn.TypeKind.TYPEDEF:
+        return drgn.typedef_type(entry["n"], index.type(entry["t"]),
+                                 qualifiers)
+    if kind == drgn.TypeKind.POINTER:
+        return drgn.pointer_type(entry["s"], index.type(entry["t"]),
+                                 qualifiers)
+    if kind == drgn.TypeKind.ARRAY:
+        return drgn.array_type(entry["l"], index.type(entry["t"]), qualifiers)
+    if kind == drgn.TypeKind.FUNCTION:
+        parameters = [(_lazy(index, num), name) for (num, name) in entry["p"]]
+        return drgn.function_type(index.type(entry["t"]), parameters,
+                                  entry["v"], qualifiers)
+    if kind == drgn.TypeKind.ENUM:
+        if entry["e"] is None:
+            return drgn.enum_type(entry["n"], qualifiers=qualifiers)
+        return drgn.enum_type(entry["n"], index.type(entry["t"]),
+                              [tuple(enumerator) for enumerator in entry["e"]],
+                              qualifiers)
+
+    constructor = (drgn.struct_type
+                   if kind == drgn.TypeKind.STRUCT else drgn.union_type)
+    if entry["m"] is None:
+        return constructor(entry["n"], qualifiers=qualifiers)
+    #
+    # The types of the members are only re-created once they are used,
+    # which also takes care of any references back to this type.
+    #
+    members = [(_lazy(index, num), name, bit_offset, bit_field_size)
+               for (num, name, bit_offset, bit_field_size) in entry["m"]]
+    return constructor(entry["n"], entry["s"], members, qualifiers)
+
+
+class _Serializer:
+    """
+    Serializes drgn types into a list of JSON-friendly dictionaries that
+    refer to each other by their position in the list. Named types are
+    only serialized once. The members of named structures, unions and
+    enums are serialized by finish(), rather than as the types are
+    added, so that there is no recursion through them.
+    """
+
+    def __init__(self) -> None:
+        self.entries: List[Dict[str, Any]] = []
+        self.keys: Dict[Tuple[str, str, int, bool], int] = {}
+        self.pending: List[Tuple[int, drgn.Type]] = []
+
+    def add(self, type_: drgn.Type) -> int:
+        """
+        Return the position of the given type in the list of entries,
+        adding it if needed.
+        """
+        key = None
+        if type_.kind in _TAGGED_KINDS and type_.tag is not None:
+            key = (type_.kind.name, type_.tag, type_.qualifiers.value,
+                   type_.is_complete())
+        elif type_.kind in _NAMED_KINDS:
+            key = (type_.kind.name, type_.name
+                   or "", type_.qualifiers.value, True)
+        if key is not None and key in self.keys:
+            return self.keys[key]
+
+        num = len(self.entries)
+        self.entries.append({})
+        if key is not None:
+            self.keys[key] = num
+            if type_.kind in _TAGGED_KINDS:
+                self.pending.append((num, type_))
+                return num
+        self.entries[num] = self._entry(type_)
+        return num
+
+    def add_object(self, obj: drgn.Object) -> Dict[str, Any]:
+        """
+        Serialize the given object, which must be a constant (i.e. have
+        no address; see TypeIndex).
+        """
+        assert obj.address_ is None
+        return {"t": self.add(obj.type_), "f": "c", "v": obj.value_()}
+
+    def finish(self) -> None:
+        """
+        Serialize the named types whose serialization was deferred.
+        """
+        while self.pending:
+            (num, type_) = self.pending.pop()
+            self.entries[num] = self._entry(type_)
+
+    def _entry(self, type_: drgn.Type) -> Dict[str, Any]:
+        # pylint: disable=too-many-branches
+        kind = type_.kind
+        entry: Dict[str, Any] = {"k": kind.name, "q": type_.qualifiers.value}
+        if kind in _TAGGED_KINDS:
+            entry["n"] = type_.tag
+        elif kind in _NAMED_KINDS:
+            entry["n"] = type_.name
+
+        if kind == drgn.TypeKind.INT:
+            entry.update(s=type_.size, g=type_.is_signed)
+        elif kind in (drgn.TypeKind.BOOL, drgn.TypeKind.FLOAT):
+            entry["s"] = type_.size
+        elif kind == drgn.TypeKind.TYPEDEF:
+            entry["t"] = self.add(type_.type)
+        elif kind == drgn.TypeKind.POINTER:
+            entry.update(s=type_.size, t=self.add(type_.type))
+        elif kind == drgn.TypeKind.ARRAY:
+            entry.update(l=type_.length, t=self.add(type_.type))
+        elif kind == drgn.TypeKind.FUNCTION:
+            entry.update(t=self.add(type_.type),
+                         p=[[self.add(param[0]), param[1]]
+                            for param in type_.parameters],
+                         v=type_.is_variadic)
+        elif kind == drgn.TypeKind.ENUM:
+            entry["e"] = None
+            if type_.is_complete():
+                entry.update(
+                    t=self.add(type_.type),
+                    e=[list(enumerator) for enumerator in type_.enumerators])
+        elif kind in (drgn.TypeKind.STRUCT, drgn.TypeKind.UNION):
+            entry["m"] = None
+            if type_.is_complete():
+                entry.update(s=type_.size,
+                             m=[[self.add(member[0])] + list(member[1:])
+                                for member in type_.members])
+        elif kind != drgn.TypeKind.VOID:
+            raise NotImplementedError("can't index {} types".format(
+                kind.name.lower()))
+        return entry
@@ -0,0 +1,393 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains the logic that loads the debug info of the modules
+of the running kernel on demand, rather than at startup.
+"""
+
+import os
+import struct
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import drgn
+from sdb.internal.index import lookup_name
+
+
+def vmlinux_candidates(release: str) -> List[str]:
+    """
+    Return the paths that the vmlinux of the given kernel release is
+    usually found at, in order of preference.
+    """
+    return [
+        "/usr/lib/debug/boot/vmlinux-{}".format(release),
+        "/usr/lib/debug/lib/modules/{}/vmlinux".format(release),
+        "/boot/vmlinux-{}".format(release),
+        "/lib/modules/{}/build/vmlinux".format(release),
+    ]
+
+
+def find_vmlinux(release: str) -> Optional[str]:
+    # pylint: disable=missing-docstring
+    for path in vmlinux_candidates(release):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def module_dirs(release: str) -> List[str]:
+    """
+    Return the directories that the modules of the given kernel release
+    are usually found in, in order of preference (i.e. the ones with
+    separate debug info first).
+    """
+    return [
+        "/usr/lib/debug/lib/modules/{}".format(release),
+        "/lib/modules/{}".format(release),
+    ]
+
+
+def loaded_modules(path: str = "/proc/modules") -> Set[str]:
+    """
+    Return the names of the modules loaded in the running kernel.
+    """
+    with open(path) as modules:
+        return {line.split(" ", 1)[0] for line in modules if line.strip()}
+
+
+def kallsyms_modules(path: str = "/proc/kallsyms") -> Dict[str, str]:
+    """
+    Return a map from the symbols of the loaded modules of the running
+    kernel to the names of the modules that they belong to.
+    """
+    symbols = {}
+    with open(path) as kallsyms:
+        for line in kallsyms:
+            #
+            # The lines of symbols of modules look like this:
+            # ffffffffc0a8aee0 d zfs_dbgmsgs	[zfs]
+            #
+            if not line.endswith("]\n"):
+                continue
+            fields = line.split()
+            symbols[fields[2]] = fields[3][1:-1]
+    return symbols
+
+
+# module -> the names of the types and enumerators that it defines
+ModuleNames = Dict[str, Set[str]]
+
+_BTF_MAGIC = 0xeb9f
+_BTF_KIND_ENUM = 6
+_BTF_KIND_ENUM64 = 19
+
+#
+# The prefixes of the names that the types of the BTF kinds that we
+# index are looked up by (i.e. structs, unions, enums and typedefs).
+#
+_BTF_KIND_PREFIXES = {
+    4: "struct ",
+    5: "union ",
+    _BTF_KIND_ENUM: "enum ",
+    8: "",
+    _BTF_KIND_ENUM64: "enum ",
+}
+
+#
+# The size of the data that follows the header of a BTF type of each
+# kind, as a fixed size and a size per member (or enumerator, etc.).
+# Kinds that are not listed have no such data.
+#
+_BTF_KIND_EXTRA = {
+    1: (4, 0),
+    3: (12, 0),
+    4: (0, 12),
+    5: (0, 12),
+    _BTF_KIND_ENUM: (0, 8),
+    13: (0, 8),
+    14: (4, 0),
+    15: (0, 12),
+    17: (4, 0),
+    _BTF_KIND_ENUM64: (0, 12),
+}
+_BTF_MAX_KIND = 19
+
+
+def _btf_sections(data: bytes) -> Optional[Tuple[str, bytes, bytes]]:
+    """
+    Return the byte order, the type section and the string section of
+    the given BTF, or None if it isn't BTF.
+    """
+    for endian in "<>":
+        if len(data) >= 24 and struct.unpack_from(endian + "H",
+                                                  data)[0] == _BTF_MAGIC:
+            break
+    else:
+        return None
+    (hdr_len, type_off, type_len, str_off,
+     str_len) = struct.unpack_from(endian + "IIIII", data, 4)
+    types = data[hdr_len + type_off:hdr_len + type_off + type_len]
+    strings = data[hdr_len + str_off:hdr_len + str_off + str_len]
+    return (endian, types, strings)
+
+
+def _btf_types(endian: str,
+               types: bytes) -> Iterable[Tuple[int, int, List[int]]]:
+    """
+    Yield the kind and the offset of the name of every type of the given
+    BTF type section, along with the offsets of the names of its
+    enumerators, if it is an enum.
+    """
+    header = struct.Struct(endian + "III")
+    name_off = struct.Struct(endian + "I")
+    offset = 0
+    while offset + header.size <= len(types):
+        (name, info, _) = header.unpack_from(types, offset)
+        offset += header.size
+        kind = (info >> 24) & 0x1f
+        vlen = info & 0xffff
+        if kind > _BTF_MAX_KIND:
+            #
+            # We can't tell where the types of kinds that we don't know
+            # of end, so we stop at the first one.
+            #
+            return
+        (fixed, per_member) = _BTF_KIND_EXTRA.get(kind, (0, 0))
+        enumerators = []
+        if kind in (_BTF_KIND_ENUM, _BTF_KIND_ENUM64):
+            enumerators = [
+                name_off.unpack_from(types, offset + num * per_member)[0]
+                for num in range(vlen)
+            ]
+        offset += fixed + per_member * vlen
+        yield (kind, name, enumerators)
+
+
+def btf_names(data: bytes, base_strings: bytes = b"") -> Set[str]:
+    """
+    Return the names of the structs, unions, enums and typedefs (as they
+    are looked up, e.g. "struct spa") and of the enumerators that the
+    given BTF defines. The BTF of a module is split BTF, whose names may
+    be in the strings of the BTF of vmlinux, which are given separately.
+    """
+    sections = _btf_sections(data)
+    if sections is None:
+        return set()
+    (endian, types, strings) = sections
+
+    def name(offset: int) -> str:
+        table = base_strings
+        if offset >= len(base_strings):
+            (table, offset) = (strings, offset - len(base_strings))
+        return table[offset:table.find(b"\0", offset)].decode(
+            "utf-8", "replace")
+
+    names = set()
+    for (kind, type_name, enumerators) in _btf_types(endian, types):
+        prefix = _BTF_KIND_PREFIXES.get(kind)
+        if prefix is not None and type_name != 0:
+            names.add(prefix + name(type_name))
+        names.update(name(enumerator) for enumerator in enumerators)
+    return names
+
+
+def btf_modules(path: str = "/sys/kernel/btf") -> ModuleNames:
+    """
+    Return a map from the names of the loaded modules of the running
+    kernel that have BTF to the names of the types and enumerators that
+    they define (see btf_names()). A module's BTF only has the types
+    that vmlinux doesn't, and is read from memory rather than from disk,
+    so this is much cheaper than loading the debug info of the modules.
+    """
+    try:
+        with open(os.path.join(path, "vmlinux"), "rb") as vmlinux:
+            sections = _btf_sections(vmlinux.read())
+        entries = list(os.scandir(path))
+    except OSError:
+        return {}
+    if sections is None:
+        return {}
+    base_strings = sections[2]
+
+    modules = {}
+    for entry in entries:
+        if entry.name == "vmlinux":
+            continue
+        try:
+            with open(entry.path, "rb") as btf:
+                modules[entry.name] = btf_names(btf.read(), base_strings)
+        except OSError:
+            continue
+    return modules
+
+
+class LazyModules:
+    """
+    LazyModules is a type and an object finder of a drgn.Program that
+    loads the debug info of kernel modules when lookups miss the debug
+    info loaded so far, one module at a time. A symbol that misses is
+    looked up in /proc/kallsyms, and a type or an enumerator in the BTF
+    of the modules, and only the debug info of the module that it
+    belongs to is loaded. A name found in neither can only belong to
+    the modules that have no BTF, so only those are loaded then (which
+    are all of them, if the kernel has no BTF for its modules).
+
+    find_modules is called once, on the first miss, and returns a map
+    from the names of the modules whose debug info may be loaded to the
+    files that it is loaded from. find_symbols and find_names return
+    the maps of kallsyms_modules() and btf_modules() respectively, and
+    are also only called on the first miss that needs them. load loads
+    the debug info of the files that it is given.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self,
+                 prog: drgn.Program,
+                 find_modules: Callable[[], Dict[str, str]],
+                 find_symbols: Callable[[], Dict[str, str]] = kallsyms_modules,
+                 load: Optional[Callable[[List[str]], None]] = None,
+                 quiet: bool = False,
+                 find_names: Callable[[], ModuleNames] = btf_modules) -> None:
+        # pylint: disable=too-many-arguments
+        self.prog = prog
+        self.find_modules = find_modules
+        self.find_symbols = find_symbols
+        self.find_names = find_names
+        self.load_debug_info = load or prog.load_debug_info
+        self.quiet = quiet
+        self.busy = False
+        self.modules: Optional[Dict[str, str]] = None
+        self.symbols: Optional[Dict[str, str]] = None
+        # type or enumerator name -> module, and the modules with BTF
+        self.names: Optional[Dict[str, str]] = None
+        self.described: Set[str] = set()
+        self.loaded: Set[str] = set()
+
+    def install(self) -> None:
+        # pylint: disable=missing-docstring
+        self.prog.add_type_finder(self._find_type)
+        self.prog.add_object_finder(self._find_object)
+
+    def remaining(self) -> List[str]:
+        """
+        Return the names of the modules whose debug info hasn't been
+        loaded yet.
+        """
+        if self.modules is None:
+            self.modules = self.find_modules()
+        return sorted(set(self.modules) - self.loaded)
+
+    def load(self, names: List[str]) -> None:
+        """
+        Load the debug info of the given modules.
+        """
+        assert self.modules is not None
+        self.loaded.update(names)
+        try:
+            self.load_debug_info([self.modules[name] for name in names])
+        except (drgn.FileFormatError, drgn.MissingDebugInfoError,
+                OSError) as err:
+            if not self.quiet:
+                print("sdb: " + str(err), file=sys.stderr)
+
+    def _module_of(self, symbol: str) -> Optional[str]:
+        if self.symbols is None:
+            try:
+                self.symbols = self.find_symbols()
+            except OSError:
+                self.symbols = {}
+        return self.symbols.get(symbol)
+
+    def _owner_of(self, name: str) -> Optional[str]:
+        if self.names is None:
+            modules = self.find_names()
+            self.described = set(modules)
+            self.names = {}
+            for module in sorted(modules):
+                for defined in modules[module]:
+                    self.names.setdefault(defined, module)
+        return self.names.get(name)
+
+    def _load_owner(self, module: Optional[str]) -> bool:
+        """
+        Load the debug info of the given module, which a name that
+        missed belongs to, or of the modules that it may belong to if
+        that isn't known. Return False if there was nothing to load.
+        """
+        remaining = self.remaining()
+        if module is not None:
+            names = [module] if module in remaining else []
+        else:
+            names = [name for name in remaining if name not in self.described]
+        if names:
+            self.load(names)
+        return bool(names)
+
+    def _done(self) -> bool:
+        return self.modules is not None and not self.remaining()
+
+    def _find_type(self, kind: drgn.TypeKind, name: str,
+                   filename: Optional[str]) -> Optional[drgn.Type]:
+        if self.busy or self._done():
+            return None
+        self.busy = True
+        try:
+            #
+            # Depending on the order that the finders were added in, we
+            # may be asked before the finders of the debug info loaded
+            # so far, so make sure that it really is a miss first. The
+            # module directories are only scanned then.
+            #
+            try:
+                return self.prog.type(lookup_name(kind, name), filename)
+            except LookupError:
+                pass
+            if not self._load_owner(self._owner_of(lookup_name(kind, name))):
+                return None
+            try:
+                return self.prog.type(lookup_name(kind, name), filename)
+            except LookupError:
+                return None
+        finally:
+            self.busy = False
+
+    def _find_object(self, prog: drgn.Program, name: str,
+                     flags: drgn.FindObjectFlags,
+                     filename: Optional[str]) -> Optional[drgn.Object]:
+        if self.busy or self._done():
+            return None
+        self.busy = True
+        try:
+            try:
+                return prog.object(name, flags, filename)
+            except LookupError:
+                pass
+            #
+            # Enumerators aren't symbols, but the BTF of a module tells
+            # which ones it defines.
+            #
+            module = self._module_of(name)
+            if module is None:
+                module = self._owner_of(name)
+            if not self._load_owner(module):
+                return None
+            try:
+                return prog.object(name, flags, filename)
+            except LookupError:
+                return None
+        finally:
+            self.busy = False
@@ -0,0 +1,114 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""This module contains the "sdb.IntSet" class."""
+
+import array
+import bisect
+from typing import Dict, Iterator, Union
+
+#
+# Integers are grouped into chunks of 2^CHUNK_BITS consecutive values.
+# The values of a chunk are kept in a sorted array of 16-bit offsets,
+# until there are more of them than ARRAY_MAX, at which point the array
+# would take more space than a bitmap of the whole chunk (8KB).
+#
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+ARRAY_MAX = 4096
+BITMAP_SIZE = (1 << CHUNK_BITS) // 8
+
+Chunk = Union[array.array, bytearray]
+
+
+class IntSet:
+    """
+    An IntSet is a set of integers (e.g. the addresses of the objects
+    seen so far) that takes a couple of bytes per member, or less than
+    one when its members are dense, rather than the ~70 bytes of a
+    member of a Python set. Members that are close to each other, like
+    the addresses of the objects of the same slab, share a chunk.
+    """
+
+    def __init__(self) -> None:
+        self.chunks: Dict[int, Chunk] = {}
+        self.count = 0
+
+    def add(self, value: int) -> bool:
+        """
+        Add the given integer to the set, and return whether it wasn't
+        already a member.
+        """
+        high = value >> CHUNK_BITS
+        low = value & CHUNK_MASK
+        chunk = self.chunks.get(high)
+        if chunk is None:
+            self.chunks[high] = array.array("H", [low])
+        elif isinstance(chunk, bytearray):
+            bit = 1 << (low & 7)
+            if chunk[low >> 3] & bit:
+                return False
+            chunk[low >> 3] |= bit
+        else:
+            index = bisect.bisect_left(chunk, low)
+            if index < len(chunk) and chunk[index] == low:
+                return False
+            if len(chunk) < ARRAY_MAX:
+                chunk.insert(index, low)
+            else:
+                bitmap = bytearray(BITMAP_SIZE)
+                for member in chunk:
+                    bitmap[member >> 3] |= 1 << (member & 7)
+                bitmap[low >> 3] |= 1 << (low & 7)
+                self.chunks[high] = bitmap
+        self.count += 1
+        return True
+
+    def __contains__(self, value: object) -> bool:
+        if not isinstance(value, int):
+            return False
+        chunk = self.chunks.get(value >> CHUNK_BITS)
+        if chunk is None:
+            return False
+        low = value & CHUNK_MASK
+        if isinstance(chunk, bytearray):
+            return bool(chunk[low >> 3] & (1 << (low & 7)))
+        index = bisect.bisect_left(chunk, low)
+        return index < len(chunk) and chunk[index] == low
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[int]:
+        for high in sorted(self.chunks):
+            chunk = self.chunks[high]
+            base = high << CHUNK_BITS
+            if isinstance(chunk, bytearray):
+                for (byte, bits) in enumerate(chunk):
+                    for bit in range(8):
+                        if bits & (1 << bit):
+                            yield base + byte * 8 + bit
+            else:
+                for low in chunk:
+                    yield base + low
+
+    def nbytes(self) -> int:
+        """
+        Return the number of bytes taken by the members of the set,
+        excluding the overhead of the dictionary of chunks.
+        """
+        return sum(
+            len(chunk) if isinstance(chunk, bytearray) else len(chunk) *
+            chunk.itemsize for chunk in self.chunks.values())
@@ -15,8 +15,10 @@
 #
 """This module contains the "sdb.Locator" class."""
 
+import collections
 import inspect
-from typing import Callable, Iterable, TypeVar
+import itertools
+from typing import Callable, Dict, Iterable, Optional, TypeVar
 
 import drgn
 import sdb
@@ -34,6 +36,27 @@ class Locator(sdb.Command):
 
     output_type: str = ""
 
+    # The names of the methods of the class that handle input of a given
+    # type (see InputHandler), keyed by type name.
+    input_handlers: Dict[str, str] = {}
+
+    # Set when a "tail N" that comes after the locator is fused with it
+    # (see fuse()), in which case the locator only produces the last N
+    # objects that it locates.
+    tail: Optional[int] = None
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Find the input handlers of the subclass once, when it is created,
+        rather than for every object that it is given.
+        """
+        super().__init_subclass__(**kwargs)
+        cls.input_handlers = {}
+        for (name, func) in inspect.getmembers(cls, inspect.isfunction):
+            typename = getattr(func, "input_typename_handled", None)
+            if typename is not None:
+                cls.input_handlers.setdefault(typename, name)
+
     def __init__(self, prog: drgn.Program, args: str = "",
                  name: str = "_") -> None:
         super().__init__(prog, args, name)
@@ -50,47 +73,84 @@ class Locator(sdb.Command):
         # pylint: disable=missing-docstring
         raise TypeError('command "{}" requires an input'.format(self.names))
 
+    def no_input_reverse(self) -> Iterable[drgn.Object]:
+        """
+        Yield the objects of no_input() in reverse order. Locators whose
+        no_input() walks a data structure that can be walked from its end
+        should override this method (see Walker.walk_reverse()).
+        """
+        return reversed(list(self.no_input()))
+
+    def fuse(self, cmd: "sdb.Command") -> bool:
+        limit = cmd.tail_limit()
+        if limit is None or limit < 0 or (type(self).no_input_reverse
+                                          is Locator.no_input_reverse):
+            return False
+        self.tail = limit if self.tail is None else min(self.tail, limit)
+        return True
+
+    def _locate_last(self,
+                     objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
+        """
+        Return the last self.tail objects that caller() would yield for
+        the given input. Without any input, these are found by walking
+        back from the end of no_input().
+        """
+        assert self.tail is not None
+        it = iter(objs)
+        first = next(it, None)
+        if first is None:
+            last = list(itertools.islice(self.no_input_reverse(), self.tail))
+            last.reverse()
+            return last
+        return collections.deque(self.caller(itertools.chain([first], it)),
+                                 maxlen=self.tail)
+
     def caller(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
         """
         This method will dispatch to the appropriate instance function
         based on the type of the input we receive.
         """
 
-        out_type = self.prog.type(self.output_type)
+        #
+        # The output type is only resolved once an object of the input
+        # needs it. Without any input, no_input() looks up a symbol
+        # first, and a symbol tells which module's debug info to load
+        # (see sdb.internal.modules), while a type may not.
+        #
+        out_type: Optional[drgn.Type] = None
+        handlers = sdb.TypeDispatcher(
+            self.prog, {
+                typename: getattr(self, name)
+                for (typename, name) in self.input_handlers.items()
+            })
+        walk = None
         has_input = False
         for i in objs:
             has_input = True
 
             # try subclass-specified input types first, so that they can
             # override any other behavior
-            try:
-                for (_, method) in inspect.getmembers(self, inspect.ismethod):
-                    if not hasattr(method, "input_typename_handled"):
-                        continue
-
-                    # Cache parsed type by setting an attribute on the
-                    # function that this method is bound to (same place
-                    # the input_typename_handled attribute is set).
-                    if not hasattr(method, "input_type_handled"):
-                        method.__func__.input_type_handled = self.prog.type(
-                            method.input_typename_handled)
-
-                    if i.type_ == method.input_type_handled:
-                        yield from method(i)
-                        raise StopIteration
-            except StopIteration:
+            handler = handlers.lookup(i.type_)
+            if handler is not None:
+                yield from handler(i)
                 continue
 
             # try passthrough of output type
             # note, this may also be handled by subclass-specified input types
+            if out_type is None:
+                out_type = sdb.get_type(self.prog, self.output_type)
             if i.type_ == out_type:
                 yield i
                 continue
 
             # try walkers
-            try:
+            if walk is None:
+                # pylint: disable=import-outside-toplevel
                 from sdb.commands.walk import Walk
-                for obj in Walk(self.prog).call([i]):
+                walk = Walk(self.prog)
+            try:
+                for obj in walk.call([i]):
                     yield drgn.cast(out_type, obj)
                 continue
             except TypeError:
@@ -106,12 +166,15 @@ class Locator(sdb.Command):
     def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
         # pylint: disable=missing-docstring
         # If this is a hybrid locator/pretty printer, this is where that is
-        # leveraged.
-        if self.islast and isinstance(self, sdb.PrettyPrinter):
+        # leveraged. A locator that was fused with a "tail" after it wasn't
+        # last in the pipeline as it was written, so it doesn't print.
+        if self.tail is not None:
+            yield from self.limited(self._locate_last(objs))
+        elif self.islast and isinstance(self, sdb.PrettyPrinter):
             # pylint: disable=no-member
             self.pretty_print(self.caller(objs))
         else:
-            yield from self.caller(objs)
+            yield from self.limited(self.caller(objs))
 
 
 # pylint: disable=invalid-name
@@ -0,0 +1,473 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This module contains the "sdb.TargetMemory" class and the readers that
+it is built from.
+"""
+
+import bisect
+import errno
+import mmap
+import os
+import struct
+from collections import OrderedDict, namedtuple
+from typing import Dict, List, Optional
+
+import drgn
+import sdb
+
+#
+# A loadable (PT_LOAD) segment of an ELF core file, like /proc/kcore or
+# an ELF vmcore, which maps memsz bytes at virtual address vaddr. The
+# first filesz of those bytes are found at the given offset of the file
+# and the rest of them are zero.
+#
+CoreSegment = namedtuple("CoreSegment",
+                         ["vaddr", "paddr", "offset", "filesz", "memsz"])
+
+_ELF_MAGIC = b"\x7fELF"
+_ELFCLASS64 = 2
+_ELFDATA2LSB = 1
+_PT_LOAD = 1
+_PN_XNUM = 0xffff
+
+
+def core_segments(path: str) -> List[CoreSegment]:
+    """
+    Return the loadable segments of the given ELF core file. ValueError
+    is raised if the file is not in ELF format.
+    """
+    # pylint: disable=too-many-locals
+    with open(path, "rb") as core:
+        ident = core.read(16)
+        if len(ident) != 16 or ident[:4] != _ELF_MAGIC:
+            raise ValueError("{} is not an ELF file".format(path))
+        is64 = ident[4] == _ELFCLASS64
+        endian = "<" if ident[5] == _ELFDATA2LSB else ">"
+
+        if is64:
+            ehdr = struct.Struct(endian + "HHIQQQIHHHHHH")
+            phdr = struct.Struct(endian + "IIQQQQQQ")
+        else:
+            ehdr = struct.Struct(endian + "HHIIIIIHHHHHH")
+            phdr = struct.Struct(endian + "IIIIIIII")
+        (_, _, _, _, phoff, shoff, _, _, phentsize, phnum, _, _,
+         _) = ehdr.unpack(core.read(ehdr.size))
+
+        if phnum == _PN_XNUM:
+            #
+            # The real number of program headers didn't fit in the ELF
+            # header, so it is stored in the sh_info field of the first
+            # section header instead.
+            #
+            core.seek(shoff + (44 if is64 else 28))
+            (phnum,) = struct.unpack(endian + "I", core.read(4))
+
+        segments = []
+        core.seek(phoff)
+        table = core.read(phentsize * phnum)
+        for num in range(phnum):
+            fields = phdr.unpack_from(table, num * phentsize)
+            if is64:
+                (p_type, _, offset, vaddr, paddr, filesz, memsz, _) = fields
+            else:
+                (p_type, offset, vaddr, paddr, filesz, memsz, _, _) = fields
+            if p_type == _PT_LOAD and memsz > 0:
+                segments.append(CoreSegment(vaddr, paddr, offset, filesz,
+                                            memsz))
+        return segments
+
+
+class MemoryReader:
+    """
+    A MemoryReader reads ranges of the memory of the target. Readers can
+    be stacked on top of each other, with each one adding some behavior
+    (e.g. accounting) on top of the reader below it.
+    """
+
+    def read(self, address: int, size: int) -> bytes:
+        """
+        Read size bytes from the given virtual address. The range never
+        crosses the boundaries of the segment that the address is in.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """
+        Release any resources held by this reader.
+        """
+
+
+class SegmentMap:
+    """
+    A SegmentMap finds the loadable segment of a core file that a given
+    address belongs to.
+    """
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, segments: List[CoreSegment]) -> None:
+        self.segments = sorted(segments, key=lambda segment: segment.vaddr)
+        self.starts = [segment.vaddr for segment in self.segments]
+        #
+        # Consecutive reads tend to hit the same segment (most of the
+        # memory of a kernel is in a few big ones), so we remember the
+        # last segment found and check it before searching.
+        #
+        self.last = CoreSegment(0, 0, 0, 0, 0)
+        self.last_end = 0
+
+    def segment(self, address: int) -> CoreSegment:
+        """
+        Return the segment that the given address belongs to.
+        """
+        if self.last.vaddr <= address < self.last_end:
+            return self.last
+        num = bisect.bisect_right(self.starts, address) - 1
+        if num < 0 or address >= self.starts[num] + self.segments[num].memsz:
+            raise ValueError("address {} is not in any segment".format(
+                hex(address)))
+        self.last = self.segments[num]
+        self.last_end = self.last.vaddr + self.last.memsz
+        return self.last
+
+
+class FileReader(MemoryReader):
+    """
+    A MemoryReader that reads from the loadable segments of an ELF core
+    file with a pread() for each range.
+    """
+
+    def __init__(self, path: str, segments: List[CoreSegment]) -> None:
+        self.fd = os.open(path, os.O_RDONLY)
+        self.map = SegmentMap(segments)
+
+    def read(self, address: int, size: int) -> bytes:
+        segment = self.map.segment(address)
+        offset = address - segment.vaddr
+        infile = max(0, min(size, segment.filesz - offset))
+        data = b""
+        if infile:
+            data = os.pread(self.fd, infile, segment.offset + offset)
+            if len(data) != infile:
+                raise OSError(
+                    errno.EIO,
+                    "short read at address {}".format(hex(address + len(data))))
+        return data + bytes(size - infile)
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class MmapReader(MemoryReader):
+    """
+    A MemoryReader that maps an ELF core file into our address space and
+    reads from the loadable segments of the mapping. Reads are served
+    from the page cache of the kernel without any system calls, which
+    pays off for the many small, scattered reads that the walkers of
+    large data structures do. /proc/kcore can't be mapped, so this is
+    only usable with core dumps.
+    """
+
+    def __init__(self, path: str, segments: List[CoreSegment]) -> None:
+        with open(path, "rb") as core:
+            self.mapping = mmap.mmap(core.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(self.mapping, "madvise"):
+            #
+            # Available since Python 3.8. Our reads have no locality to
+            # speak of, so readahead would mostly bring in pages that
+            # we'll never look at.
+            #
+            self.mapping.madvise(mmap.MADV_RANDOM)
+        self.map = SegmentMap(segments)
+
+    def read(self, address: int, size: int) -> bytes:
+        segment = self.map.segment(address)
+        offset = address - segment.vaddr
+        infile = max(0, min(size, segment.filesz - offset))
+        data = b""
+        if infile:
+            start = segment.offset + offset
+            data = self.mapping[start:start + infile]
+            if len(data) != infile:
+                raise OSError(
+                    errno.EIO,
+                    "short read at address {}".format(hex(address + len(data))))
+        if infile == size:
+            return data
+        return data + bytes(size - infile)
+
+    def close(self) -> None:
+        self.mapping.close()
+
+
+PAGE_SIZE = 4096
+_PAGE_MASK = ~(PAGE_SIZE - 1)
+
+
+class PageCache(MemoryReader):
+    """
+    A MemoryReader that caches the pages read through it from the reader
+    below it, evicting the least recently used pages once more than size
+    bytes are cached. Reads that miss the cache are rounded out to whole
+    pages (clipped to the segment that they are in), so the neighbouring
+    fields of a structure are found in the cache once one of them has
+    been read. Only pages that are entirely within a segment are kept.
+
+    Nothing tells us when the memory of a live target changes, so it is
+    up to the owner of the cache to invalidate() it whenever stale data
+    can't be tolerated anymore.
+    """
+
+    def __init__(self, reader: MemoryReader, segments: List[CoreSegment],
+                 size: int) -> None:
+        self.reader = reader
+        self.map = SegmentMap(segments)
+        self.capacity = max(1, size // PAGE_SIZE)
+        # page address -> page contents
+        self.pages: "OrderedDict[int, bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self) -> None:
+        """
+        Drop all the cached pages.
+        """
+        self.pages.clear()
+
+    def read(self, address: int, size: int) -> bytes:
+        page = address & _PAGE_MASK
+        offset = address - page
+        if offset + size <= PAGE_SIZE:
+            #
+            # The common case of a read within a single page.
+            #
+            data = self.pages.get(page)
+            if data is not None:
+                self.hits += 1
+                self.pages.move_to_end(page)
+                return data[offset:offset + size]
+        elif size <= self.capacity * PAGE_SIZE // 2:
+            pages = range(page, address + size, PAGE_SIZE)
+            if all(page in self.pages for page in pages):
+                self.hits += 1
+                for page in pages:
+                    self.pages.move_to_end(page)
+                data = b"".join(self.pages[page] for page in pages)
+                return data[offset:offset + size]
+        else:
+            #
+            # Don't let a single large read flush the whole cache.
+            #
+            self.misses += 1
+            return self.reader.read(address, size)
+
+        self.misses += 1
+        return self._fill(address, size)
+
+    def _fill(self, address: int, size: int) -> bytes:
+        """
+        Read the pages that the given range is in from the reader below
+        with a single read, cache the ones that are entirely within the
+        segment, and return the given range.
+        """
+        segment = self.map.segment(address)
+        seg_end = segment.vaddr + segment.memsz
+        start = max(address & _PAGE_MASK, segment.vaddr)
+        end = min((address + size + PAGE_SIZE - 1) & _PAGE_MASK, seg_end)
+        data = self.reader.read(start, end - start)
+
+        page = (start + PAGE_SIZE - 1) & _PAGE_MASK
+        while page + PAGE_SIZE <= end:
+            self.pages[page] = data[page - start:page - start + PAGE_SIZE]
+            self.pages.move_to_end(page)
+            page += PAGE_SIZE
+        while len(self.pages) > self.capacity:
+            self.pages.popitem(last=False)
+        return data[address - start:address - start + size]
+
+    def close(self) -> None:
+        self.invalidate()
+        self.reader.close()
+
+
+class ReadAccounting(MemoryReader):
+    """
+    A MemoryReader that keeps statistics of the reads passed through it
+    to the reader below it: the number of reads and bytes, a histogram
+    of the read sizes, and the command that was running at the time
+    each read was done.
+    """
+
+    def __init__(self, reader: MemoryReader) -> None:
+        self.reader = reader
+        self.active = _ActiveStage()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Zero out all the statistics gathered so far.
+        """
+        self.reads = 0
+        self.bytes = 0
+        # power of two bucket -> number of reads
+        self.sizes: Dict[int, int] = {}
+        # command -> [number of reads, number of bytes]
+        self.commands: Dict[str, List[int]] = {}
+
+    def read(self, address: int, size: int) -> bytes:
+        self.reads += 1
+        self.bytes += size
+
+        bucket = 1 << (size.bit_length() - 1) if size else 0
+        self.sizes[bucket] = self.sizes.get(bucket, 0) + 1
+
+        command = self.commands.get(self.active.label)
+        if command is None:
+            command = self.commands[self.active.label] = [0, 0]
+        command[0] += 1
+        command[1] += size
+
+        return self.reader.read(address, size)
+
+    def close(self) -> None:
+        self.reader.close()
+
+
+class _ActiveStage(sdb.StageMonitor):
+    """
+    A StageMonitor that keeps track of the stage that is running.
+    """
+
+    def __init__(self) -> None:
+        self.stack: List[str] = []
+        self.label = "-"
+
+    def enter(self, stage: "sdb.Command") -> None:
+        self.stack.append(self.label)
+        self.label = sdb.stage_label(stage)
+
+    def leave(self, stage: "sdb.Command") -> None:
+        self.label = self.stack.pop()
+
+
+class TargetMemory:
+    """
+    The TargetMemory of a drgn.Program takes over the reads of the
+    loadable segments of an ELF core file (e.g. /proc/kcore or an ELF
+    vmcore) from drgn, by registering memory segments of its own that
+    are backed by a stack of MemoryReader objects. This is what allows
+    sdb to account for the reads of the target and to cache them, or
+    to read core dumps through a memory mapping (see MmapReader).
+
+    The accounting is done below the cache, so it only sees the reads
+    that actually reach the target. Unless keep_cache is set, the cache
+    is invalidated whenever sdb.invoke() starts a new pipeline, so that
+    the state of a live target is never older than the pipeline that
+    looks at it.
+    """
+
+    def __init__(self,
+                 prog: drgn.Program,
+                 path: str,
+                 accounting: bool = False,
+                 cache_size: int = 0,
+                 keep_cache: bool = False,
+                 use_mmap: bool = False) -> None:
+        # pylint: disable=too-many-arguments
+        self.prog = prog
+        self.path = path
+        self.segments = core_segments(path)
+        self.reader: MemoryReader
+        if use_mmap:
+            self.reader = MmapReader(path, self.segments)
+        else:
+            self.reader = FileReader(path, self.segments)
+
+        self.accounting: Optional[ReadAccounting] = None
+        if accounting:
+            self.accounting = ReadAccounting(self.reader)
+            self.reader = self.accounting
+            sdb.add_stage_monitor(self.accounting.active)
+            sdb.add_profile_counter("reads", self._reads)
+            sdb.add_profile_counter("read bytes", self._read_bytes)
+
+        self.cache: Optional[PageCache] = None
+        self.keep_cache = keep_cache
+        if cache_size:
+            self.cache = PageCache(self.reader, self.segments, cache_size)
+            self.reader = self.cache
+
+        for segment in self.segments:
+            prog.add_memory_segment(segment.vaddr, segment.memsz, self._read)
+        _TARGETS[prog] = self
+
+    def invalidate(self) -> None:
+        """
+        Drop anything cached from the memory of the target.
+        """
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    def close(self) -> None:
+        """
+        Stop any accounting and release the resources held by the
+        readers. drgn provides no way to unregister memory segments, so
+        the program can't read the memory of the target past this point.
+        """
+        if self.accounting is not None:
+            sdb.remove_stage_monitor(self.accounting.active)
+            sdb.remove_profile_counter("reads")
+            sdb.remove_profile_counter("read bytes")
+        self.reader.close()
+        del _TARGETS[self.prog]
+
+    def _read(self, address: int, count: int, offset: int,
+              physical: bool) -> bytes:
+        # pylint: disable=unused-argument
+        return self.reader.read(address, count)
+
+    def _reads(self) -> int:
+        assert self.accounting is not None
+        return self.accounting.reads
+
+    def _read_bytes(self) -> int:
+        assert self.accounting is not None
+        return self.accounting.bytes
+
+
+_TARGETS: Dict[drgn.Program, TargetMemory] = {}
+
+
+def coalesce(obj: drgn.Object) -> drgn.Object:
+    """
+    Return a copy of the structure that obj is (or points to), read from
+    the target with a single read. Its members can then be accessed
+    without any further reads of the target, so commands that are about
+    to look at several members of the same structure should do so
+    through its copy, rather than read each member separately. Note
+    that the copy is a value, so it has no address.
+    """
+    if obj.type_.kind is drgn.TypeKind.POINTER:
+        obj = obj[0]
+    return obj.read_()
+
+
+def get_target_memory(prog: drgn.Program) -> Optional[TargetMemory]:
+    """
+    Return the TargetMemory set up for the given program, if any.
+    """
+    return _TARGETS.get(prog)
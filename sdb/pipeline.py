@@ -0,0 +1,228 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""This module contains the "sdb.Pipeline" class."""
+
+from typing import Any, Callable, Iterable, List, Optional
+
+import drgn
+import sdb
+
+
+class StageMonitor:
+    """
+    A StageMonitor observes the execution of the stages of all the
+    pipelines that run while it is installed (see add_stage_monitor()).
+    Since stages are generators, a stage is entered and left whenever
+    it is asked for its next output, so anything that happens between
+    a call to enter() and the matching call to leave() (excluding any
+    stages entered in between) is done on behalf of that stage.
+    """
+
+    def begin(self, plan: "Pipeline") -> None:
+        """Called when the given plan starts executing."""
+
+    def enter(self, stage: "sdb.Command") -> None:
+        """Called when the given stage is about to run."""
+
+    def leave(self, stage: "sdb.Command") -> None:
+        """Called when the given stage is suspended or done."""
+
+    def passed(self, src: Optional["sdb.Command"], dst: Optional["sdb.Command"],
+               count: int) -> None:
+        """
+        Called when count objects have been passed from the src stage to
+        the dst stage. src is None for the input of a pipeline and dst
+        is None for its output.
+        """
+
+
+_MONITORS: List[StageMonitor] = []
+
+
+def stage_label(stage: "sdb.Command") -> str:
+    """
+    Return the name that the given stage is reported under by stage
+    monitors.
+    """
+    if stage.name != "_":
+        return stage.name
+    if stage.names:
+        return stage.names[0]
+    return type(stage).__name__.lower()
+
+
+def add_stage_monitor(monitor: StageMonitor) -> None:
+    """
+    Install the given monitor for all the pipelines that start
+    executing from now on, until it is removed.
+    """
+    _MONITORS.append(monitor)
+
+
+def remove_stage_monitor(monitor: StageMonitor) -> None:
+    # pylint: disable=missing-docstring
+    _MONITORS.remove(monitor)
+
+
+def _monitored_call(monitors: List[StageMonitor], stage: "sdb.Command",
+                    func: Callable[[Any], Any], objs: Any) -> Any:
+    for monitor in monitors:
+        monitor.enter(stage)
+    try:
+        return func(objs)
+    finally:
+        for monitor in reversed(monitors):
+            monitor.leave(stage)
+
+
+def _monitored(monitors: List[StageMonitor], src: Optional["sdb.Command"],
+               dst: Optional["sdb.Command"], items: Iterable[Any],
+               count: Callable[[Any], int]) -> Iterable[Any]:
+    it = iter(items)
+    while True:
+        if src is not None:
+            for monitor in monitors:
+                monitor.enter(src)
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        finally:
+            if src is not None:
+                for monitor in reversed(monitors):
+                    monitor.leave(src)
+        for monitor in monitors:
+            monitor.passed(src, dst, count(item))
+        yield item
+
+
+class Pipeline:
+    """
+    A Pipeline is the execution plan of a list of sdb.Command objects.
+
+    The plan is compiled once, when the Pipeline is constructed. This is
+    where the "coerce" stages are inserted, where consecutive commands
+    that can do their work in a single stage are fused (see
+    sdb.Command.fuse()), where the stages learn how many objects of
+    their output will be consumed (see sdb.Command.limit), and where we
+    decide whether the pipeline yields any results. Executing the plan
+    then chains the stages together with a flat loop, so each object
+    only has to go through the generators of the commands themselves,
+    rather than an additional level of recursion for every stage of the
+    pipeline.
+    """
+
+    def __init__(self, prog: drgn.Program,
+                 commands: List["sdb.Command"]) -> None:
+        assert commands
+        self.prog = prog
+        self.stages: List["sdb.Command"] = []
+        for cmd in commands:
+            #
+            # If a stage wants its input to be of a certain type, we
+            # automatically insert a "coerce" stage before it, so that
+            # the input can be safely coerced into the type that it
+            # wants.
+            #
+            if cmd.input_type is not None:
+                self.stages.append(sdb.Coerce(prog, cmd.input_type))
+            elif self.stages and self.stages[-1].fuse(cmd):
+                self.stages[-1].islast = cmd.islast
+                continue
+            self.stages.append(cmd)
+        self.ispipeable = self.stages[-1].ispipeable
+
+        #
+        # Pass the limits of stages like "head N" (see
+        # sdb.Command.head_limit()) up the plan, so that the stages that
+        # produce objects stop producing them once the rest of the
+        # pipeline is not going to consume any more of them. Past the
+        # first stage that isn't one-to-one, the number of objects that
+        # will be consumed is unknown, but the stages are still marked
+        # as bounded (see sdb.Command.bounded), so that they don't
+        # produce more objects than needed in a single batch.
+        #
+        limit: Optional[int] = None
+        bounded = False
+        for stage in reversed(self.stages):
+            if limit is not None:
+                stage.limit = limit if stage.limit is None else min(
+                    stage.limit, limit)
+            if bounded:
+                stage.bounded = True
+            head = stage.head_limit()
+            if head is not None and head >= 0:
+                limit = head if limit is None else min(head, limit)
+            elif not stage.one_to_one:
+                bounded = bounded or limit is not None
+                limit = None
+
+    def execute(
+            self, first_input: Iterable[drgn.Object]
+    ) -> Optional[Iterable[drgn.Object]]:
+        """
+        Chain all the stages of the plan together, feeding each stage
+        the output of the one before it, and return the output of the
+        last stage. If the last stage is not pipeable, this runs the
+        whole pipeline and returns None.
+        """
+        if _MONITORS:
+            return self._execute_monitored(first_input, "call", lambda _: 1)
+
+        objs = first_input
+        for stage in self.stages[:-1]:
+            objs = stage.call(objs)
+        return self.stages[-1].call(objs)
+
+    def execute_batches(
+        self, first_input: Iterable[drgn.Object]
+    ) -> Optional[Iterable[List[drgn.Object]]]:
+        """
+        This is the batched counterpart of execute(). The stages of the
+        plan exchange lists of objects through their call_batch()
+        methods, and the output of the last stage is returned as an
+        iterable of such lists.
+        """
+        batches = sdb.batched(first_input, sdb.BATCH_SIZE,
+                              1 if self.stages[0].bounded else None)
+        if _MONITORS:
+            return self._execute_monitored(batches, "call_batch", len)
+
+        for stage in self.stages[:-1]:
+            batches = stage.call_batch(batches)
+        return self.stages[-1].call_batch(batches)
+
+    def _execute_monitored(self, first_input: Iterable[Any], method: str,
+                           count: Callable[[Any], int]) -> Optional[Any]:
+        """
+        Chain the stages of the plan like execute() and execute_batches()
+        do, but have every stage run and pass its output through the
+        installed stage monitors. count is used to tell the number of
+        objects in each item that a stage passes to the next one.
+        """
+        monitors = list(_MONITORS)
+        for monitor in monitors:
+            monitor.begin(self)
+
+        items = _monitored(monitors, None, self.stages[0], first_input, count)
+        for (num, stage) in enumerate(self.stages):
+            output = _monitored_call(monitors, stage, getattr(stage, method),
+                                     items)
+            if output is None:
+                return None
+            dst = self.stages[num + 1] if num + 1 < len(self.stages) else None
+            items = _monitored(monitors, stage, dst, output, count)
+        return items
@@ -15,7 +15,7 @@
 #
 """This module contains the "sdb.PrettyPrinter" class."""
 
-from typing import Dict, Iterable, Type
+from typing import Iterable
 
 import drgn
 import sdb
@@ -32,7 +32,7 @@ class PrettyPrinter(sdb.Command):
     out a specific type of data, in a human readable way.
     """
 
-    all_printers: Dict[str, Type["PrettyPrinter"]] = {}
+    all_printers: "sdb.Registry" = sdb.Registry()
 
     # When a subclass is created, register it
     def __init_subclass__(cls, **kwargs):
@@ -51,7 +51,7 @@ class PrettyPrinter(sdb.Command):
         """
 
         assert self.input_type is not None
-        type_ = self.prog.type(self.input_type)
+        type_ = sdb.get_type(self.prog, self.input_type)
         for obj in objs:
             if obj.type_ != type_:
                 raise TypeError(
@@ -0,0 +1,192 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""This module contains the "sdb.Profiler" class."""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import sdb
+
+#
+# Counters that the profiler samples whenever a stage is entered or
+# left, so it can attribute their increments (e.g. the number of memory
+# reads done) to the stage that was running. Subsystems that keep such
+# counters register them with add_profile_counter().
+#
+_PROFILE_COUNTERS: "OrderedDict[str, Callable[[], int]]" = OrderedDict()
+
+
+def add_profile_counter(name: str, read: Callable[[], int]) -> None:
+    """
+    Register a counter to be reported by the profiler under the given
+    name. read() should return the current value of the counter.
+    """
+    _PROFILE_COUNTERS[name] = read
+
+
+def remove_profile_counter(name: str) -> None:
+    # pylint: disable=missing-docstring
+    del _PROFILE_COUNTERS[name]
+
+
+#
+# The lookups of the type caches (see sdb.TypeCache) are always counted.
+#
+add_profile_counter("type hits", sdb.type_cache_hits)
+add_profile_counter("type misses", sdb.type_cache_misses)
+
+
+def _sample_counters() -> List[int]:
+    return [read() for read in _PROFILE_COUNTERS.values()]
+
+
+class _ProfileRow:
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, label: str, depth: int, ncounters: int) -> None:
+        self.label = label
+        self.depth = depth
+        self.time = 0.0
+        self.objs_in = 0
+        self.objs_out = 0
+        self.counters = [0] * ncounters
+        self.children: List["_ProfileRow"] = []
+
+
+class Profiler(sdb.StageMonitor):
+    """
+    The Profiler is a StageMonitor that keeps track of the wall time,
+    the number of objects passed in and out, and the increments of the
+    registered profile counters of every stage it observes. Time and
+    counters are attributed exclusively: while a stage pulls objects
+    from the stage before it, that time is charged to the latter.
+
+    Pipelines that are started by the stages themselves (e.g. "spa"
+    walking the "spa_namespace_avl" tree) are reported nested under the
+    stage that started them, and the rows of pipelines that run more
+    than once from the same place are merged.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self) -> None:
+        self.counter_names = list(_PROFILE_COUNTERS)
+        self.rows: Dict[Tuple[int, int, str], _ProfileRow] = {}
+        self.toplevel: List[_ProfileRow] = []
+        self.stage_rows: Dict[int, Tuple["sdb.Command", _ProfileRow]] = {}
+        self.stack: List[_ProfileRow] = []
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.checkpoint = self.started
+        self.checkpoint_counters = _sample_counters()
+
+    def _row(self, stage: Optional["sdb.Command"]) -> Optional[_ProfileRow]:
+        if stage is None:
+            return None
+        entry = self.stage_rows.get(id(stage))
+        if entry is None:
+            # a stage that we didn't see beginning; report it on its own
+            row = _ProfileRow(sdb.stage_label(stage), 0,
+                              len(self.counter_names))
+            self.toplevel.append(row)
+            self.stage_rows[id(stage)] = (stage, row)
+            return row
+        return entry[1]
+
+    def _charge(self) -> None:
+        now = time.perf_counter()
+        counters = _sample_counters()[:len(self.counter_names)]
+        if self.stack:
+            row = self.stack[-1]
+            row.time += now - self.checkpoint
+            for (num, value) in enumerate(counters):
+                row.counters[num] += value - self.checkpoint_counters[num]
+        self.checkpoint = now
+        self.checkpoint_counters = counters
+
+    def begin(self, plan: "sdb.Pipeline") -> None:
+        parent = self.stack[-1] if self.stack else None
+        depth = parent.depth + 1 if parent is not None else 0
+        for (num, stage) in enumerate(plan.stages):
+            key = (id(parent), num, sdb.stage_label(stage))
+            row = self.rows.get(key)
+            if row is None:
+                row = _ProfileRow(key[2], depth, len(self.counter_names))
+                self.rows[key] = row
+                if parent is None:
+                    self.toplevel.append(row)
+                else:
+                    parent.children.append(row)
+            #
+            # We hold a reference to the stage, so its id() can't be
+            # reused by a later stage while we are profiling.
+            #
+            self.stage_rows[id(stage)] = (stage, row)
+
+    def enter(self, stage: "sdb.Command") -> None:
+        self._charge()
+        row = self._row(stage)
+        assert row is not None
+        self.stack.append(row)
+
+    def leave(self, stage: "sdb.Command") -> None:
+        self._charge()
+        self.stack.pop()
+
+    def passed(self, src: Optional["sdb.Command"], dst: Optional["sdb.Command"],
+               count: int) -> None:
+        src_row = self._row(src)
+        if src_row is not None:
+            src_row.objs_out += count
+        dst_row = self._row(dst)
+        if dst_row is not None:
+            dst_row.objs_in += count
+
+    def stop(self) -> None:
+        """
+        Mark the end of the profiled run.
+        """
+        self._charge()
+        self.finished = time.perf_counter()
+
+    def report(self) -> None:
+        """
+        Print out a table with the statistics gathered for each stage.
+        """
+        if self.finished is None:
+            self.stop()
+        assert self.finished is not None
+
+        header = "{:<32} {:>12} {:>10} {:>10}".format("STAGE", "TIME(ms)", "IN",
+                                                      "OUT")
+        for name in self.counter_names:
+            header += " {:>12}".format(name.upper())
+        print(header)
+        print("-" * len(header))
+        rows = list(reversed(self.toplevel))
+        while rows:
+            row = rows.pop()
+            line = "{:<32} {:>12.3f} {:>10} {:>10}".format(
+                "  " * row.depth + row.label, row.time * 1000, row.objs_in,
+                row.objs_out)
+            for value in row.counters:
+                line += " {:>12}".format(value)
+            print(line)
+            rows.extend(reversed(row.children))
+        print("-" * len(header))
+        print("{:<32} {:>12.3f}".format("TOTAL",
+                                        (self.finished - self.started) * 1000))
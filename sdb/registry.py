@@ -0,0 +1,327 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This module contains the "sdb.Registry" class and the manifest of the
+modules that commands are defined in, which allows those modules to be
+imported only once one of their commands is used.
+"""
+
+import ast
+import collections.abc
+import importlib
+import importlib.util
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+#
+# All the modules listed in the manifest, in the order that they were
+# found in.
+#
+_MODULES: List[str] = []
+_IMPORTED_ALL = False
+
+
+def import_all() -> None:
+    """
+    Import all the modules listed in the manifest, so that everything
+    that they define is registered.
+    """
+    global _IMPORTED_ALL  # pylint: disable=global-statement
+    if _IMPORTED_ALL:
+        return
+    _IMPORTED_ALL = True
+    for module in _MODULES:
+        importlib.import_module(module)
+
+
+class Registry(collections.abc.MutableMapping):
+    """
+    A Registry maps keys (e.g. command names or the input types of
+    walkers) to the classes that they are registered for. Classes are
+    registered as they are defined, but a key can also be declared
+    ahead of time along with the module that its class is defined in,
+    in which case that module is only imported once the key is looked
+    up.
+
+    If a key is neither registered nor declared, all the modules of the
+    manifest are imported before giving up on it, as the manifest can't
+    tell what every module will register.
+    """
+
+    def __init__(self) -> None:
+        self.loaded: Dict[str, Any] = {}
+        self.declared: Dict[str, str] = {}
+
+    def declare(self, key: str, module: str) -> None:
+        """
+        Declare that the class of the given key is defined in the given
+        module.
+        """
+        if key not in self.loaded:
+            self.declared[key] = module
+
+    def __getitem__(self, key: str) -> Any:
+        class_ = self.loaded.get(key)
+        if class_ is not None:
+            return class_
+        module = self.declared.pop(key, None)
+        if module is not None:
+            importlib.import_module(module)
+        if key not in self.loaded:
+            import_all()
+        return self.loaded[key]
+
+    def __setitem__(self, key: str, class_: Any) -> None:
+        self.declared.pop(key, None)
+        self.loaded[key] = class_
+
+    def __delitem__(self, key: str) -> None:
+        self.loaded.pop(key, None)
+        self.declared.pop(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        if key in self.loaded or key in self.declared:
+            return True
+        import_all()
+        return key in self.loaded
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self.loaded)
+        yield from [key for key in self.declared if key not in self.loaded]
+
+    def __len__(self) -> int:
+        return len(self.loaded) + len(
+            [key for key in self.declared if key not in self.loaded])
+
+
+def _string(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if hasattr(ast, "Str") and isinstance(node, ast.Str):
+        return node.s  # type: ignore
+    return None
+
+
+def _base_name(node: ast.AST) -> str:
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Name):
+        return node.id
+    return ""
+
+
+def scan_source(source: str) -> List[Tuple[str, str]]:
+    """
+    Return the (kind, key) pairs of everything that the given module
+    source registers when imported. kind is one of "command", "walker"
+    and "printer", and key is a command name for commands and an input
+    type for the rest. Only what can be told by looking at the class
+    definitions of the module is returned.
+    """
+    # pylint: disable=too-many-branches
+    entries = []
+    bases: Dict[str, List[str]] = {}
+    for node in ast.parse(source).body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+
+        #
+        # Classes defined earlier in the same module are resolved to
+        # their own bases, so that subclasses of local walkers and
+        # pretty printers are recognized as such.
+        #
+        names = []
+        for base in node.bases:
+            name = _base_name(base)
+            names += bases.get(name, [name])
+        bases[node.name] = names
+
+        attrs: Dict[str, Any] = {}
+        for stmt in node.body:
+            if isinstance(stmt, ast.AnnAssign):
+                targets = [stmt.target]
+            elif isinstance(stmt, ast.Assign):
+                targets = stmt.targets
+            else:
+                continue
+            for target in targets:
+                if isinstance(target, ast.Name) and stmt.value is not None:
+                    attrs[target.id] = stmt.value
+
+        if isinstance(attrs.get("names"), ast.List):
+            for elt in attrs["names"].elts:
+                name = _string(elt)
+                if name is not None:
+                    entries.append(("command", name))
+        input_type = _string(attrs.get("input_type", ast.AST()))
+        if input_type is not None:
+            if "Walker" in names:
+                entries.append(("walker", input_type))
+            if "PrettyPrinter" in names:
+                entries.append(("printer", input_type))
+    return entries
+
+
+def package_modules(package: str) -> List[Tuple[str, str]]:
+    """
+    Return the (module name, path) pairs of the modules of the given
+    package and of its subpackages.
+    """
+    spec = importlib.util.find_spec(package)
+    if spec is None or spec.origin is None:
+        return []
+    if spec.submodule_search_locations is None:
+        return [(package, spec.origin)]
+
+    modules = []
+    for location in spec.submodule_search_locations:
+        for entry in sorted(os.listdir(location)):
+            path = os.path.join(location, entry)
+            if entry.endswith(".py") and entry != "__init__.py":
+                modules.append(("{}.{}".format(package, entry[:-3]), path))
+            elif os.path.isfile(os.path.join(path, "__init__.py")):
+                modules += package_modules("{}.{}".format(package, entry))
+    return modules
+
+
+def _cache_path() -> str:
+    cache = os.environ.get("XDG_CACHE_HOME",
+                           os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(cache, "sdb", "manifest.json")
+
+
+def build_manifest(packages: List[str],
+                   cache_path: Optional[str] = None,
+                   update_cache: bool = False) -> Dict[str, Any]:
+    """
+    Return the manifest of the given packages: a map from the name of
+    each of their modules to the (kind, key) pairs that it registers.
+    The result of scanning each module is looked up in the given cache
+    file, along with the size and modification time of the module, so
+    only modules that changed have to be scanned again. The cache file
+    is only written if update_cache is set, which is left to the sdb
+    executable (see update_manifest_cache()), so that importing sdb
+    never writes to it.
+    """
+    if cache_path is None:
+        cache_path = _cache_path()
+    try:
+        with open(cache_path) as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        cache = {}
+
+    manifest = {}
+    updated = False
+    for package in packages:
+        for (module, path) in package_modules(package):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            cached = cache.get(path)
+            if cached is None or cached["stat"] != [
+                    stat.st_size, stat.st_mtime_ns
+            ]:
+                with open(path) as source:
+                    entries = scan_source(source.read())
+                cached = cache[path] = {
+                    "stat": [stat.st_size, stat.st_mtime_ns],
+                    "entries": entries,
+                }
+                updated = True
+            manifest[module] = [tuple(entry) for entry in cached["entries"]]
+
+    if updated and update_cache:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = "{}.{}".format(cache_path, os.getpid())
+            with open(tmp, "w") as cache_file:
+                json.dump(cache, cache_file)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass
+    return manifest
+
+
+#
+# Out-of-tree packages register their commands through entry points of
+# this group, whose values are the packages (or modules) that the
+# commands are defined in. For example, in the setup.py of a plugin:
+#
+#     entry_points={"sdb.commands": ["myplugin = myplugin.commands"]}
+#
+ENTRY_POINT_GROUP = "sdb.commands"
+
+
+def plugin_packages() -> List[str]:
+    """
+    Return the packages registered through entry points of the
+    ENTRY_POINT_GROUP group.
+    """
+    # pylint: disable=import-outside-toplevel
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        #
+        # importlib.metadata is only available since Python 3.8, so fall
+        # back to pkg_resources, if setuptools is installed.
+        #
+        try:
+            import pkg_resources
+        except ImportError:
+            return []
+        return [
+            ep.module_name
+            for ep in pkg_resources.iter_entry_points(ENTRY_POINT_GROUP)
+        ]
+    eps = entry_points()
+    if hasattr(eps, "select"):
+        group = eps.select(group=ENTRY_POINT_GROUP)
+    else:
+        group = eps.get(ENTRY_POINT_GROUP, [])  # type: ignore
+    return [ep.value.partition(":")[0].strip() for ep in group]
+
+
+def manifest_packages() -> List[str]:
+    """
+    Return the packages that the commands of the manifest are defined
+    in: sdb's own and those of plugins.
+    """
+    return ["sdb.commands"] + plugin_packages()
+
+
+def update_manifest_cache(cache_path: Optional[str] = None) -> None:
+    """
+    Bring the cache of the scans of the modules of manifest_packages()
+    up to date (see build_manifest()), so that the next import of sdb
+    doesn't scan them again.
+    """
+    build_manifest(manifest_packages(), cache_path, update_cache=True)
+
+
+def declare_manifest(registries: Dict[str, Registry],
+                     manifest: Dict[str, Any]) -> None:
+    """
+    Declare everything listed in the given manifest in the registry of
+    its kind.
+    """
+    for (module, entries) in manifest.items():
+        if module not in _MODULES:
+            _MODULES.append(module)
+        for (kind, key) in entries:
+            registries[kind].declare(key, module)
@@ -0,0 +1,150 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""This module contains the "sdb.TypeCache" class."""
+
+import os
+from typing import Any, Callable, Dict, Tuple, TypeVar
+
+import drgn
+
+T = TypeVar("T")
+
+
+class TypeCache:
+    """
+    A TypeCache memoizes the types of a program that are looked up by
+    name, along with data derived from them (e.g. the names of the
+    members of a structure), so commands that resolve the same types for
+    every object that they are given only pay for a dictionary lookup.
+
+    Only successful lookups are cached, so a type that is missing now
+    can still be found once more debug info is loaded. Anything that
+    replaces the types already found (e.g. the type index falling back
+    to the real debug info) should invalidate() the cache.
+    """
+
+    def __init__(self, prog: drgn.Program) -> None:
+        self.prog = prog
+        self.types: Dict[str, drgn.Type] = {}
+        self.derived: Dict[Tuple[str, str], Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def type(self, name: str) -> drgn.Type:
+        """
+        Return the type of the given name, like drgn.Program.type().
+        """
+        type_ = self.types.get(name)
+        if type_ is not None:
+            self.hits += 1
+            return type_
+        self.misses += 1
+        type_ = self.prog.type(name)
+        self.types[name] = type_
+        return type_
+
+    def derive(self, what: str, name: str, compute: Callable[[drgn.Type],
+                                                             T]) -> T:
+        """
+        Return compute() of the type of the given name, computing it only
+        the first time that it is asked for. what names the kind of data
+        computed, so different data can be derived from the same type.
+        """
+        key = (what, name)
+        if key in self.derived:
+            self.hits += 1
+            return self.derived[key]
+        self.misses += 1
+        value = compute(self.type(name))
+        self.derived[key] = value
+        return value
+
+    def member_names(self, name: str) -> Tuple[str, ...]:
+        """
+        Return the names of the members of the structure type of the
+        given name, in the order that they are declared in.
+        """
+        return self.derive(
+            "member_names", name,
+            lambda type_: tuple(member[1] for member in type_.members))
+
+    def enum_names(self, name: str) -> Tuple[str, ...]:
+        """
+        Return the names of the enumerators of the enum type (or typedef
+        of one) of the given name, with the prefix that all of them have
+        in common (e.g. "VDEV_STATE_") cut off.
+        """
+
+        def short_names(type_: drgn.Type) -> Tuple[str, ...]:
+            if type_.kind is drgn.TypeKind.TYPEDEF:
+                type_ = type_.type
+            fields = [field[0] for field in type_.enumerators]
+            prefix = os.path.commonprefix(fields)
+            return tuple(field[prefix.rfind("_") + 1:] for field in fields)
+
+        return self.derive("enum_names", name, short_names)
+
+    def invalidate(self) -> None:
+        """
+        Drop everything cached.
+        """
+        self.types.clear()
+        self.derived.clear()
+
+    def reset(self) -> None:
+        """
+        Zero out the counters of the cache.
+        """
+        self.hits = 0
+        self.misses = 0
+
+
+_TYPE_CACHES: Dict[drgn.Program, TypeCache] = {}
+
+
+def type_cache_hits() -> int:
+    """
+    Return the number of hits of the type caches of all programs.
+    """
+    return sum(cache.hits for cache in _TYPE_CACHES.values())
+
+
+def type_cache_misses() -> int:
+    """
+    Return the number of misses of the type caches of all programs.
+    """
+    return sum(cache.misses for cache in _TYPE_CACHES.values())
+
+
+def get_type_cache(prog: drgn.Program) -> TypeCache:
+    """
+    Return the TypeCache of the given program, creating it the first time
+    that it is asked for.
+    """
+    cache = _TYPE_CACHES.get(prog)
+    if cache is None:
+        cache = TypeCache(prog)
+        _TYPE_CACHES[prog] = cache
+    return cache
+
+
+def get_type(prog: drgn.Program, name: str) -> drgn.Type:
+    """
+    Return the type of the given name through the TypeCache of the
+    program. Commands should use this rather than prog.type() for the
+    types that they look up over and over.
+    """
+    return get_type_cache(prog).type(name)
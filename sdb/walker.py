@@ -15,7 +15,8 @@
 #
 """This module contains the "sdb.Walker" class."""
 
-from typing import Dict, Iterable, Type
+import itertools
+from typing import Iterable, List, Optional
 
 import drgn
 import sdb
@@ -27,7 +28,12 @@ class Walker(sdb.Command):
     structures that contain arbitrary data types.
     """
 
-    allWalkers: Dict[str, Type["Walker"]] = {}
+    allWalkers: "sdb.Registry" = sdb.Registry()
+
+    # Set when a "tail N" that comes after the walker is fused with it
+    # (see fuse()), in which case the walker only produces the last N
+    # objects of its output, by walking backwards.
+    tail: Optional[int] = None
 
     # When a subclass is created, register it
     def __init_subclass__(cls, **kwargs):
@@ -39,6 +45,56 @@ class Walker(sdb.Command):
         # pylint: disable=missing-docstring
         raise NotImplementedError
 
+    def walk_reverse(self, obj: drgn.Object) -> Iterable[drgn.Object]:
+        """
+        Yield the objects of walk() in reverse order. Walkers of data
+        structures that can be walked from their end (e.g. doubly linked
+        lists) should override this method, so that the last few objects
+        of a data structure can be found without walking all of it.
+        """
+        return reversed(list(self.walk(obj)))
+
+    def fuse(self, cmd: "sdb.Command") -> bool:
+        limit = cmd.tail_limit()
+        if limit is None or limit < 0 or (type(self).walk_reverse
+                                          is Walker.walk_reverse):
+            return False
+        self.tail = limit if self.tail is None else min(self.tail, limit)
+        return True
+
+    def _check(self, obj: drgn.Object, type_: drgn.Type) -> None:
+        if obj.type_ != type_:
+            raise TypeError(
+                'command "{}" does not handle input of type {}'.format(
+                    self.names, obj.type_))
+
+    def _walk_all(self, objs: Iterable[drgn.Object],
+                  type_: drgn.Type) -> Iterable[drgn.Object]:
+        for obj in objs:
+            self._check(obj, type_)
+            yield from self.walk(obj)
+
+    def _walk_last(self, objs: Iterable[drgn.Object],
+                   type_: drgn.Type) -> List[drgn.Object]:
+        """
+        Return the last self.tail objects of the walks of all the given
+        objects, walking back from the end of the last one.
+        """
+        assert self.tail is not None
+        inputs = list(objs)
+        for obj in inputs:
+            self._check(obj, type_)
+
+        last: List[drgn.Object] = []
+        for obj in reversed(inputs):
+            if len(last) == self.tail:
+                break
+            last.extend(
+                itertools.islice(self.walk_reverse(obj),
+                                 self.tail - len(last)))
+        last.reverse()
+        return last
+
     # Iterate over the inputs and call the walk command on each of them,
     # verifying the types as we go.
     def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
@@ -47,11 +103,24 @@ class Walker(sdb.Command):
         the types as we go.
         """
         assert self.input_type is not None
-        type_ = self.prog.type(self.input_type)
-        for obj in objs:
-            if obj.type_ != type_:
-                raise TypeError(
-                    'command "{}" does not handle input of type {}'.format(
-                        self.names, obj.type_))
+        type_ = sdb.get_type(self.prog, self.input_type)
+        if self.tail is not None:
+            yield from self.limited(self._walk_last(objs, type_))
+        else:
+            yield from self.limited(self._walk_all(objs, type_))
 
-            yield from self.walk(obj)
+    def call_batch(
+            self, batches: Iterable[List[drgn.Object]]
+    ) -> Iterable[List[drgn.Object]]:
+        """
+        This function is the batched version of call(). The objects
+        generated by walk() are gathered into batches directly, rather
+        than being yielded one by one through call().
+        """
+        assert self.input_type is not None
+        type_ = sdb.get_type(self.prog, self.input_type)
+        objs = itertools.chain.from_iterable(batches)
+        if self.tail is not None:
+            yield from self.limited_batches(self._walk_last(objs, type_))
+        else:
+            yield from self.limited_batches(self._walk_all(objs, type_))
@@ -14,6 +14,10 @@ setup(
         "sdb.internal",
     ],
 
+    extras_require={
+        'columns': ['numpy'],
+    },
+
     entry_points={
         'console_scripts': ['sdb=sdb.internal.cli:main'],
     },
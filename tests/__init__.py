@@ -16,9 +16,11 @@
 
 # pylint: disable=missing-docstring
 
-from typing import Iterable, List, Optional
+import struct
+from typing import Any, Callable, Iterable, List, Optional, Tuple
 
 import drgn
+import pytest
 import sdb
 
 
@@ -126,6 +128,167 @@ def setup_basic_mock_program() -> drgn.Program:
     return prog
 
 
+def create_elf_core(path: str, segments: List[Tuple[int, bytes]]) -> None:
+    """
+    Writes a minimal little-endian ELF64 core file with a PT_LOAD
+    program header for every (virtual address, contents) pair given,
+    similar to the ones found in /proc/kcore and ELF vmcores.
+    """
+    ehdr = struct.Struct("<16sHHIQQQIHHHHHH")
+    phdr = struct.Struct("<IIQQQQQQ")
+    offset = ehdr.size + phdr.size * len(segments)
+    headers = []
+    for vaddr, contents in segments:
+        headers.append(
+            phdr.pack(1, 4, offset, vaddr, 0, len(contents), len(contents),
+                      4096))
+        offset += len(contents)
+
+    ident = b"\x7fELF\x02\x01\x01" + bytes(9)
+    with open(path, "wb") as core:
+        # e_type: ET_CORE, e_machine: EM_X86_64
+        core.write(
+            ehdr.pack(ident, 4, 62, 1, 0, ehdr.size, 0, 0, ehdr.size, phdr.size,
+                      len(segments), 0, 0, 0))
+        for header in headers:
+            core.write(header)
+        for _, contents in segments:
+            core.write(contents)
+
+
+#
+# The layout of the array of create_struct_core(): the members of the
+# mock "struct test_struct" are both at offset 0, and the structure is
+# 12 bytes long, so the elements of the array are laid out back to back
+# at STRUCTS_ADDR, with each ts_int holding one of the values given.
+#
+STRUCTS_ADDR = 0xffff880000000000
+STRUCT_SIZE = 12
+
+
+def create_struct_core(path: str, values: List[int]) -> sdb.TargetMemory:
+    """
+    Writes an ELF core file with an array of "struct test_struct" whose
+    ts_int members have the given values to the given path, and returns
+    an sdb.TargetMemory that reads it for a basic mock program, with its
+    reads counted.
+    """
+    contents = b"".join(struct.pack("<i8x", value) for value in values)
+    create_elf_core(path, [(STRUCTS_ADDR, contents + bytes(4096))])
+    return sdb.TargetMemory(setup_basic_mock_program(), path, accounting=True)
+
+
+def struct_core_fixture(values: List[int]) -> Callable[..., Any]:
+    """
+    Returns a "target" fixture that yields the sdb.TargetMemory of
+    create_struct_core() for the given values, for a test module to
+    assign to a name of its own.
+    """
+
+    @pytest.fixture(name="target")
+    def fixture_target(tmp_path):
+        memory = create_struct_core(str(tmp_path / "core"), values)
+        yield memory
+        memory.close()
+
+    return fixture_target
+
+
+def struct_pointers(prog: drgn.Program, count: int) -> List[drgn.Object]:
+    """
+    Returns pointers to the first count elements of the array of
+    create_struct_core().
+    """
+    type_ = prog.type('struct test_struct *')
+    return [
+        drgn.Object(prog, type_, value=STRUCTS_ADDR + STRUCT_SIZE * num)
+        for num in range(count)
+    ]
+
+
+#
+# The layout of the AVL tree of setup_avl_mock_program(): an avl_tree_t
+# at AVL_TREE_ADDR, followed by the entries of the tree, each of which
+# is a "struct avl_entry" made of a long (its index) and an avl_node_t.
+#
+AVL_TREE_ADDR = 0xffff880000000000
+AVL_ENTRIES_OFFSET = 64
+AVL_ENTRY_SIZE = 32
+AVL_NODE_OFFSET = 8
+
+
+def avl_entry_addr(num: int) -> int:
+    return AVL_TREE_ADDR + AVL_ENTRIES_OFFSET + AVL_ENTRY_SIZE * num
+
+
+def setup_avl_mock_program(path: str, nentries: int, **kwargs) -> drgn.Program:
+    """
+    Writes an ELF core file with a balanced AVL tree of the given number
+    of entries to the given path, and returns a mock program that reads
+    it through an sdb.TargetMemory, which is created with the given
+    keyword arguments. The entries are laid out in the order that they
+    are in the tree, so walking it in order yields increasing addresses.
+    """
+    platform = drgn.Platform(
+        drgn.Architecture.X86_64,
+        drgn.PlatformFlags.IS_LITTLE_ENDIAN | drgn.PlatformFlags.IS_64_BIT)
+    prog = drgn.Program(platform)
+
+    voidp_type = prog.type('void *')
+    ulong_type = prog.type('unsigned long')
+    node_struct = drgn.struct_type('avl_node', 24, [
+        (lambda: drgn.array_type(2, drgn.pointer_type(8, node_struct)),
+         'avl_child', 0, 0),
+        (ulong_type, 'avl_pcb', 128, 0),
+    ])
+    tree_struct = drgn.struct_type('avl_tree', 40, [
+        (drgn.pointer_type(8, node_struct), 'avl_root', 0, 0),
+        (voidp_type, 'avl_compar', 64, 0),
+        (ulong_type, 'avl_offset', 128, 0),
+        (ulong_type, 'avl_numnodes', 192, 0),
+        (ulong_type, 'avl_size', 256, 0),
+    ])
+    mocked_types = {
+        'avl_node': node_struct,
+        'avl_node_t': drgn.typedef_type('avl_node_t', node_struct),
+        'avl_tree': tree_struct,
+        'avl_tree_t': drgn.typedef_type('avl_tree_t', tree_struct),
+    }
+
+    def mock_type_find(kind: drgn.TypeKind, name: str,
+                       filename: Optional[str]) -> Optional[drgn.Type]:
+        assert filename is None
+        type_ = mocked_types.get(name)
+        if type_ is not None and type_.kind == kind:
+            return type_
+        return None
+
+    prog.add_type_finder(mock_type_find)
+
+    contents = bytearray(AVL_ENTRIES_OFFSET + AVL_ENTRY_SIZE * nentries)
+    for num in range(nentries):
+        struct.pack_into("<q", contents,
+                         avl_entry_addr(num) - AVL_TREE_ADDR, num)
+
+    def build(low: int, high: int) -> int:
+        # Link the entries in [low, high) into a balanced subtree, and
+        # return the address of the node at its root.
+        if low >= high:
+            return 0
+        mid = (low + high) // 2
+        children = (build(low, mid), build(mid + 1, high))
+        struct.pack_into("<QQ", contents,
+                         avl_entry_addr(mid) - AVL_TREE_ADDR + AVL_NODE_OFFSET,
+                         *children)
+        return avl_entry_addr(mid) + AVL_NODE_OFFSET
+
+    struct.pack_into("<QQQQQ", contents, 0, build(0, nentries), 0,
+                     AVL_NODE_OFFSET, nentries, AVL_ENTRY_SIZE)
+    create_elf_core(path, [(AVL_TREE_ADDR, bytes(contents))])
+    sdb.TargetMemory(prog, path, **kwargs)
+    return prog
+
+
 #
 # Basic mock program to be used by the very primitive commands
 # like echo, address, member, cast, head, tail, filter, and help.
@@ -0,0 +1,128 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import pytest
+import sdb
+from sdb.commands import aggregate
+
+from tests import (invoke, setup_basic_mock_program, struct_core_fixture,
+                   struct_pointers)
+
+#
+# The value of ts_int of each structure is its index modulo 4. Since
+# ts_voidp overlaps ts_int and the padding after it, it has the same
+# value.
+#
+NSTRUCTS = 64
+VALUES = [num % 4 for num in range(NSTRUCTS)]
+
+fixture_target = struct_core_fixture(VALUES)
+
+
+def test_count(target, capsys):
+    invoke(target.prog, struct_pointers(target.prog, NSTRUCTS), 'count')
+
+    assert capsys.readouterr().out == "{}\n".format(NSTRUCTS)
+
+
+def test_count_no_input(capsys):
+    invoke(setup_basic_mock_program(), [], 'count')
+
+    assert capsys.readouterr().out == "0\n"
+
+
+def test_sum(target, capsys):
+    invoke(target.prog, struct_pointers(target.prog, NSTRUCTS), 'sum ts_int')
+
+    assert capsys.readouterr().out == "{}\n".format(NSTRUCTS // 4 * 6)
+    assert target.accounting.reads == 1
+
+
+def test_sum_no_arg():
+    with pytest.raises(sdb.CommandArgumentsError):
+        invoke(setup_basic_mock_program(), [], 'sum')
+
+
+def test_sum_member_not_found(target):
+    with pytest.raises(sdb.CommandError) as err:
+        invoke(target.prog, struct_pointers(target.prog, NSTRUCTS), 'sum bogus')
+
+    assert "'struct test_struct' has no member 'bogus'" in str(err.value)
+
+
+def test_summarize(target, capsys):
+    invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+           'summarize ts_int')
+
+    assert capsys.readouterr().out.split("\n") == [
+        "{:<24} {:>20}".format("", "TS_INT"),
+        "{:<24} {:>20}".format("count", NSTRUCTS),
+        "{:<24} {:>20}".format("sum", NSTRUCTS // 4 * 6),
+        "{:<24} {:>20}".format("min", 0),
+        "{:<24} {:>20}".format("max", 3),
+        "{:<24} {:>20}".format("mean", "1.50"),
+        "",
+    ]
+
+
+def test_summarize_no_input(capsys):
+    invoke(setup_basic_mock_program(), [], 'summarize ts_int')
+
+    assert "{:<24} {:>20}".format("min", "-") in capsys.readouterr().out
+
+
+def test_stats_takes_no_member():
+    with pytest.raises(sdb.CommandArgumentsError):
+        invoke(setup_basic_mock_program(), [], 'stats ts_int')
+
+
+def test_groupby_count(target, capsys):
+    invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+           'groupby ts_int')
+
+    assert capsys.readouterr().out.split("\n") == [
+        "{:<24} {:>20}".format("TS_INT", "COUNT"),
+    ] + ["{:<24} {:>20}".format(key, NSTRUCTS // 4) for key in range(4)] + [""]
+
+
+def test_groupby_sum(target, capsys):
+    invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+           'groupby ts_voidp sum ts_int')
+
+    assert capsys.readouterr().out.split("\n") == [
+        "{:<24} {:>20}".format("TS_VOIDP", "SUM(ts_int)"),
+    ] + [
+        "{:<24} {:>20}".format(hex(key), key * NSTRUCTS // 4)
+        for key in range(4)
+    ] + [""]
+
+
+def test_groupby_unhashable_key(target, monkeypatch):
+    monkeypatch.setattr(aggregate, "member_values",
+                        lambda name, reader, batch: [[0] for _ in batch])
+
+    with pytest.raises(sdb.CommandError) as err:
+        invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+               'groupby ts_int')
+
+    assert "cannot group by ts_int" in str(err.value)
+
+
+def test_groupby_bad_aggregate():
+    with pytest.raises(sdb.CommandArgumentsError):
+        invoke(setup_basic_mock_program(), [], 'groupby ts_int avg ts_int')
@@ -0,0 +1,91 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import drgn
+import pytest
+import sdb
+
+from tests import (AVL_TREE_ADDR, avl_entry_addr, invoke,
+                   setup_avl_mock_program)
+
+NENTRIES = 100
+
+
+@pytest.fixture(name="target")
+def fixture_target(tmp_path):
+    prog = setup_avl_mock_program(str(tmp_path / "core"),
+                                  NENTRIES,
+                                  accounting=True)
+    memory = sdb.get_target_memory(prog)
+    yield memory
+    memory.close()
+
+
+def avl_tree(prog):
+    return drgn.Object(prog, 'avl_tree_t *', value=AVL_TREE_ADDR)
+
+
+def test_walk(target):
+    ret = invoke(target.prog, [avl_tree(target.prog)], 'avl')
+
+    assert [obj.value_() for obj in ret
+            ] == [avl_entry_addr(num) for num in range(NENTRIES)]
+    assert all(obj.type_ == target.prog.type('void *') for obj in ret)
+
+
+def test_walk_reverse(target):
+    ret = invoke(target.prog, [avl_tree(target.prog)], 'avl -r')
+
+    assert [obj.value_() for obj in ret
+            ] == [avl_entry_addr(num) for num in reversed(range(NENTRIES))]
+
+
+def test_walk_reads_each_node_once(target):
+    tree = avl_tree(target.prog)
+    reads = target.accounting.reads
+
+    invoke(target.prog, [tree], 'avl')
+
+    # the two members of the tree, and a read for each node
+    assert target.accounting.reads - reads == 2 + NENTRIES
+
+
+def test_walk_empty(tmp_path):
+    prog = setup_avl_mock_program(str(tmp_path / "core"), 0)
+
+    assert not invoke(prog, [avl_tree(prog)], 'avl')
+
+    sdb.get_target_memory(prog).close()
+
+
+def test_head(target):
+    ret = invoke(target.prog, [avl_tree(target.prog)], 'avl | head 3')
+
+    assert [obj.value_()
+            for obj in ret] == [avl_entry_addr(num) for num in range(3)]
+    # the leftmost path of the tree is read before anything is yielded
+    assert target.accounting.reads < 2 + 3 + 7
+
+
+def test_tail(target):
+    ret = invoke(target.prog, [avl_tree(target.prog)], 'avl | tail 3')
+
+    assert [obj.value_() for obj in ret] == [
+        avl_entry_addr(num) for num in range(NENTRIES - 3, NENTRIES)
+    ]
+    assert target.accounting.reads < 2 + 3 + 7
@@ -19,6 +19,7 @@
 import drgn
 import pytest
 import sdb
+from sdb.commands.filter import Filter
 
 from tests import invoke, MOCK_PROGRAM
 
@@ -292,3 +293,79 @@ def test_struct_input_bogus_member():
 
     with pytest.raises(sdb.CommandError):
         invoke(MOCK_PROGRAM, objs, line)
+
+
+def test_int_converted_to_lhs_type():
+    line = 'filter obj == -1'
+    objs = [
+        drgn.Object(MOCK_PROGRAM, 'unsigned int', value=0xffffffff),
+        drgn.Object(MOCK_PROGRAM, 'unsigned int', value=1),
+    ]
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert [obj.value_() for obj in ret] == [0xffffffff]
+
+
+def test_and():
+    line = 'filter obj > 1 and obj < 4'
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(5)]
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert [obj.value_() for obj in ret] == [2, 3]
+
+
+def test_or():
+    line = 'filter obj == 0 or obj == 3'
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(5)]
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert [obj.value_() for obj in ret] == [0, 3]
+
+
+def test_and_binds_tighter_than_or():
+    line = 'filter obj == 0 or obj > 2 and obj < 4'
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(5)]
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert [obj.value_() for obj in ret] == [0, 3]
+
+
+def test_and_missing_comparison():
+    line = 'filter obj == 0 and obj'
+    objs = []
+
+    with pytest.raises(sdb.CommandInvalidInputError):
+        invoke(MOCK_PROGRAM, objs, line)
+
+
+def test_consecutive_filters_fused():
+    line = 'filter obj > 1 | filter obj < 4'
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(5)]
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+    plan = sdb.Pipeline(MOCK_PROGRAM, [
+        Filter(MOCK_PROGRAM, "obj > 1"),
+        Filter(MOCK_PROGRAM, "obj < 4"),
+    ])
+
+    assert [obj.value_() for obj in ret] == [2, 3]
+    assert len(plan.stages) == 1
+
+
+def test_fused_filters_planned_twice():
+    commands = [
+        Filter(MOCK_PROGRAM, "obj > 1"),
+        Filter(MOCK_PROGRAM, "obj < 4"),
+    ]
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(5)]
+
+    sdb.Pipeline(MOCK_PROGRAM, commands)
+    match = commands[0].match
+    plan = sdb.Pipeline(MOCK_PROGRAM, commands)
+
+    assert commands[0].match is match
+    assert [obj.value_() for obj in plan.execute(objs)] == [2, 3]
@@ -0,0 +1,80 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import drgn
+import sdb
+from sdb.commands.head import Head
+
+from tests import invoke, MOCK_PROGRAM
+
+
+def test_empty():
+    line = 'head'
+    objs = []
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert not ret
+
+
+def test_default_count():
+    line = 'head'
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(20)]
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert [obj.value_() for obj in ret] == list(range(10))
+
+
+def test_count_larger_than_input():
+    line = 'head 5'
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(3)]
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert [obj.value_() for obj in ret] == [0, 1, 2]
+
+
+def test_count_across_batches():
+    count = sdb.BATCH_SIZE + 7
+    line = 'head {}'.format(count)
+    objs = [
+        drgn.Object(MOCK_PROGRAM, 'void *', value=i)
+        for i in range(3 * sdb.BATCH_SIZE)
+    ]
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert [obj.value_() for obj in ret] == list(range(count))
+
+
+def test_negative_count():
+    line = 'head -1'
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(6)]
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert [obj.value_() for obj in ret] == list(range(6))
+
+
+def test_negative_count_batches():
+    head = Head(MOCK_PROGRAM, '-1')
+
+    ret = list(head.call_batch([[0, 1, 2], [3, 4, 5]]))
+
+    assert ret == [[0, 1, 2], [3, 4, 5]]
@@ -0,0 +1,97 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+from typing import Dict, Iterable, List
+
+import drgn
+import pytest
+import sdb
+
+from tests import invoke, MOCK_PROGRAM
+
+
+def register_printer(type_name: str, printed: List[List[int]]) -> None:
+    """
+    Register a pretty printer for the given type, which appends the
+    values of each group of objects that it is given to printed.
+    """
+
+    # pylint: disable=unused-variable
+    class RecordingPrinter(sdb.PrettyPrinter):
+        input_type = type_name
+
+        def pretty_print(self, objs: Iterable[drgn.Object]) -> None:
+            printed.append([obj.value_() for obj in objs])
+
+
+@pytest.fixture(name="groups")
+def fixture_groups():
+    """
+    Register pretty printers for "int *" and "void *" for the duration
+    of a test, and yield the lists of groups of values that each one
+    of them was given, by type. The printers are unregistered after the
+    test, so that they don't change the dispatch of any other test.
+    """
+    groups: Dict[str, List[List[int]]] = {"int *": [], "void *": []}
+    for (type_name, printed) in groups.items():
+        register_printer(type_name, printed)
+
+    yield groups
+
+    for type_name in groups:
+        del sdb.PrettyPrinter.all_printers[type_name]
+    sdb.get_type_cache(MOCK_PROGRAM).invalidate()
+
+
+def test_groups_of_same_type(groups):
+    line = 'pretty_print'
+    objs = [
+        drgn.Object(MOCK_PROGRAM, 'int *', value=0),
+        drgn.Object(MOCK_PROGRAM, 'int *', value=1),
+        drgn.Object(MOCK_PROGRAM, 'void *', value=2),
+        drgn.Object(MOCK_PROGRAM, 'int *', value=3),
+    ]
+
+    invoke(MOCK_PROGRAM, objs, line)
+
+    assert groups == {"int *": [[0, 1], [3]], "void *": [[2]]}
+
+
+def test_no_printer(groups):
+    line = 'pretty_print'
+    objs = [
+        drgn.Object(MOCK_PROGRAM, 'int *', value=0),
+        drgn.Object(MOCK_PROGRAM, 'char *', value=1),
+    ]
+
+    with pytest.raises(TypeError):
+        invoke(MOCK_PROGRAM, objs, line)
+
+    assert groups["int *"] == [[0]]
+
+
+def test_long_run_printed_once(groups):
+    line = 'pretty_print'
+    objs = [
+        drgn.Object(MOCK_PROGRAM, 'int *', value=i)
+        for i in range(sdb.BATCH_SIZE + 1)
+    ]
+
+    invoke(MOCK_PROGRAM, objs, line)
+
+    assert groups["int *"] == [list(range(sdb.BATCH_SIZE + 1))]
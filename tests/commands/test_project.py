@@ -0,0 +1,84 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import pytest
+import sdb
+from sdb.commands import project
+
+from tests import (invoke, setup_basic_mock_program, struct_core_fixture,
+                   struct_pointers)
+
+#
+# The value of ts_int of each structure is its index, negated.
+#
+NSTRUCTS = 64
+VALUES = [-num for num in range(NSTRUCTS)]
+
+fixture_target = struct_core_fixture(VALUES)
+
+
+def test_no_arg():
+    with pytest.raises(sdb.CommandArgumentsError):
+        invoke(setup_basic_mock_program(), [], 'project')
+
+
+def test_invalid_member():
+    with pytest.raises(sdb.CommandArgumentsError):
+        invoke(setup_basic_mock_program(), [], 'project ts_int ts-voidp')
+
+
+def test_without_numpy(target, monkeypatch):
+    monkeypatch.setattr(project, "numpy", None)
+
+    with pytest.raises(sdb.CommandError) as err:
+        invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+               'project ts_int')
+
+    assert "requires NumPy" in str(err.value)
+
+
+def test_columns(target):
+    numpy = pytest.importorskip("numpy")
+    objs = struct_pointers(target.prog, NSTRUCTS)
+
+    command = project.Project(target.prog, "ts_int")
+    columns = command.read_columns(sdb.batched(objs, 16))
+
+    assert len(columns) == 1
+    assert columns[0].dtype == numpy.int64
+    assert list(columns[0]) == [-num for num in range(NSTRUCTS)]
+    assert target.accounting.reads == NSTRUCTS // 16
+
+
+def test_table(target, capsys):
+    pytest.importorskip("numpy")
+    objs = struct_pointers(target.prog, NSTRUCTS)[:3]
+
+    invoke(target.prog, objs, 'project ts_int')
+
+    assert capsys.readouterr().out == "TS_INT\n     0\n    -1\n    -2\n"
+
+
+def test_member_not_found(target):
+    pytest.importorskip("numpy")
+    objs = struct_pointers(target.prog, NSTRUCTS)
+
+    with pytest.raises(sdb.CommandError) as err:
+        invoke(target.prog, objs, 'project bogus')
+
+    assert "'struct test_struct' has no member 'bogus'" in str(err.value)
@@ -0,0 +1,89 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import pytest
+import sdb
+from sdb.commands import sort
+
+from tests import (invoke, setup_basic_mock_program, struct_core_fixture,
+                   struct_pointers, STRUCTS_ADDR, STRUCT_SIZE)
+
+NSTRUCTS = 64
+KEYS = [(num * 37) % 16 for num in range(NSTRUCTS)]
+
+fixture_target = struct_core_fixture(KEYS)
+
+
+def expected(reverse=False):
+    order = sorted(range(NSTRUCTS), key=lambda num: KEYS[num], reverse=reverse)
+    return [STRUCTS_ADDR + STRUCT_SIZE * num for num in order]
+
+
+def test_no_arg():
+    with pytest.raises(sdb.CommandArgumentsError):
+        invoke(setup_basic_mock_program(), [], 'sort')
+
+
+def test_sort(target):
+    ret = invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+                 'sort ts_int')
+
+    assert [obj.value_() for obj in ret] == expected()
+
+
+def test_sort_reverse(target):
+    ret = invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+                 'sort -r ts_int')
+
+    assert [obj.value_() for obj in ret] == expected(reverse=True)
+
+
+def test_sort_spilled(target, monkeypatch):
+    monkeypatch.setattr(sort, "SORT_MEMORY", 10 * sort.RECORD_SIZE)
+    monkeypatch.setattr(sort, "RECORDS_PER_CHUNK", 3)
+    objs = struct_pointers(target.prog, NSTRUCTS)
+
+    #
+    # With batches of 5 objects, runs of 10 objects are spilled along
+    # the way, and the remaining 4 objects are merged from memory.
+    #
+    batches = [objs[num:num + 5] for num in range(0, NSTRUCTS, 5)]
+    ret = list(sort.Sort(target.prog, "ts_int").call_batch(batches))
+
+    assert [obj.value_() for batch in ret for obj in batch] == expected()
+
+
+def test_sort_spilled_by_address(target, monkeypatch):
+    monkeypatch.setattr(sort, "SORT_MEMORY", 10 * sort.RECORD_SIZE)
+    objs = [obj[0] for obj in struct_pointers(target.prog, NSTRUCTS)]
+
+    ret = list(
+        sort.Sort(target.prog, "-r ts_int").call_batch([objs[:32], objs[32:]]))
+
+    assert [obj.address_ for batch in ret for obj in batch
+           ] == expected(reverse=True)
+    assert [obj.ts_int.value_() for batch in ret for obj in batch
+           ] == sorted(KEYS, reverse=True)
+
+
+def test_sort_member_not_found(target):
+    with pytest.raises(sdb.CommandError) as err:
+        invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+               'sort bogus')
+
+    assert "'struct test_struct' has no member 'bogus'" in str(err.value)
@@ -0,0 +1,60 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import drgn
+import sdb
+
+from tests import invoke, MOCK_PROGRAM
+
+
+def test_empty():
+    line = 'tail'
+    objs = []
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert not ret
+
+
+def test_default_count():
+    line = 'tail'
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(20)]
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert [obj.value_() for obj in ret] == list(range(10, 20))
+
+
+def test_count_larger_than_input():
+    line = 'tail 5'
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(3)]
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert [obj.value_() for obj in ret] == [0, 1, 2]
+
+
+def test_count_across_batches():
+    total = 3 * sdb.BATCH_SIZE
+    line = 'tail {}'.format(sdb.BATCH_SIZE + 7)
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(total)]
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert [obj.value_() for obj in ret
+           ] == list(range(total - sdb.BATCH_SIZE - 7, total))
@@ -0,0 +1,74 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import pytest
+import sdb
+
+from tests import (invoke, setup_basic_mock_program, struct_core_fixture,
+                   struct_pointers, STRUCTS_ADDR, STRUCT_SIZE)
+
+NSTRUCTS = 64
+KEYS = [(num * 37) % 16 for num in range(NSTRUCTS)]
+
+fixture_target = struct_core_fixture(KEYS)
+
+
+def test_no_arg():
+    with pytest.raises(sdb.CommandArgumentsError):
+        invoke(setup_basic_mock_program(), [], 'top')
+
+
+def test_negative_count():
+    with pytest.raises(sdb.CommandArgumentsError):
+        invoke(setup_basic_mock_program(), [], 'top -1 ts_int')
+
+
+def test_top(target):
+    ret = invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+                 'top 5 ts_int')
+
+    #
+    # The 5 largest keys are 15, 14, 13, 12 and 11, each of which is
+    # found 4 times, so ties are broken by keeping the earliest objects.
+    #
+    order = sorted(range(NSTRUCTS), key=lambda num: -KEYS[num])[:5]
+    assert [obj.value_() for obj in ret
+           ] == [STRUCTS_ADDR + STRUCT_SIZE * num for num in order]
+    assert [KEYS[num] for num in order] == [15, 15, 15, 15, 14]
+
+
+def test_top_more_than_input(target):
+    ret = invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+                 'top 100 ts_int')
+
+    assert len(ret) == NSTRUCTS
+
+
+def test_top_zero(target):
+    ret = invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+                 'top 0 ts_int')
+
+    assert not ret
+
+
+def test_top_member_not_found(target):
+    with pytest.raises(sdb.CommandError) as err:
+        invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+               'top 3 bogus')
+
+    assert "'struct test_struct' has no member 'bogus'" in str(err.value)
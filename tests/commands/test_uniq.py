@@ -0,0 +1,79 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import pytest
+import sdb
+
+from tests import (invoke, struct_core_fixture, struct_pointers, STRUCTS_ADDR,
+                   STRUCT_SIZE)
+
+NSTRUCTS = 64
+KEYS = [(num * 37) % 16 for num in range(NSTRUCTS)]
+
+fixture_target = struct_core_fixture(KEYS)
+
+
+def test_uniq_by_address(target):
+    objs = struct_pointers(target.prog, NSTRUCTS)
+
+    ret = invoke(target.prog, objs + objs[::-1] + objs, 'uniq')
+
+    assert [obj.value_() for obj in ret] == [obj.value_() for obj in objs]
+
+
+def test_uniq_by_address_of_struct(target):
+    objs = [obj[0] for obj in struct_pointers(target.prog, NSTRUCTS)]
+
+    ret = invoke(target.prog, objs[:10] + objs[5:15], 'uniq')
+
+    assert [obj.address_ for obj in ret] == [obj.address_ for obj in objs[:15]]
+
+
+def test_uniq_by_member(target):
+    ret = invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+                 'uniq ts_int')
+
+    assert [KEYS[(obj.value_() - STRUCTS_ADDR) // STRUCT_SIZE] for obj in ret
+           ] == list(dict.fromkeys(KEYS))
+
+
+def test_uniq_count(target, capsys):
+    objs = struct_pointers(target.prog, NSTRUCTS)
+
+    ret = invoke(target.prog, objs[:2] + objs[:1], 'uniq -c')
+
+    assert not ret
+    assert capsys.readouterr().out == "{:>12} {}\n{:>12} {}\n".format(
+        2, hex(STRUCTS_ADDR), 1, hex(STRUCTS_ADDR + STRUCT_SIZE))
+
+
+def test_uniq_count_by_member(target, capsys):
+    invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+           'uniq -c ts_int')
+
+    assert capsys.readouterr().out == "".join(
+        "{:>12} {}\n".format(NSTRUCTS // 16, key)
+        for key in dict.fromkeys(KEYS))
+
+
+def test_uniq_member_not_found(target):
+    with pytest.raises(sdb.CommandError) as err:
+        invoke(target.prog, struct_pointers(target.prog, NSTRUCTS),
+               'uniq bogus')
+
+    assert "'struct test_struct' has no member 'bogus'" in str(err.value)
@@ -0,0 +1,76 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+from typing import Iterable
+
+import drgn
+import pytest
+import sdb
+
+from tests import invoke, MOCK_PROGRAM
+
+
+@pytest.fixture(name="walker")
+def fixture_walker():
+    """
+    Register a walker of "int *" pointers for the duration of a test,
+    which walks the two ints at each pointer and counts its instances.
+    The walker is unregistered after the test, so that it doesn't change
+    the dispatch of any other test.
+    """
+
+    class IntArrayWalker(sdb.Walker):
+        input_type = "int *"
+
+        instances = 0
+
+        def __init__(self, prog: drgn.Program, args: str = "",
+                     name: str = "_") -> None:
+            super().__init__(prog, args, name)
+            IntArrayWalker.instances += 1
+
+        def walk(self, obj: drgn.Object) -> Iterable[drgn.Object]:
+            for i in range(2):
+                yield drgn.Object(self.prog,
+                                  'int *',
+                                  value=obj.value_() + 4 * i)
+
+    yield IntArrayWalker
+
+    del sdb.Walker.allWalkers[IntArrayWalker.input_type]
+    sdb.get_type_cache(MOCK_PROGRAM).invalidate()
+
+
+def test_walk(walker):
+    line = 'walk'
+    objs = [drgn.Object(MOCK_PROGRAM, 'int *', value=i) for i in [0, 8, 16]]
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert [obj.value_() for obj in ret] == [0, 4, 8, 12, 16, 20]
+    assert walker.instances == 1
+
+
+def test_no_walker(capsys):
+    line = 'walk'
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=0)]
+
+    with pytest.raises(TypeError):
+        invoke(MOCK_PROGRAM, objs, line)
+
+    assert "The following types have walkers" in capsys.readouterr().out
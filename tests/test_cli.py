@@ -0,0 +1,92 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import os
+
+import pytest
+
+from sdb.internal import cli
+from sdb.internal.cli import ModuleFilter, debug_info_files, find_modules
+
+MODULES = [
+    "kernel/fs/ext4/ext4.ko",
+    "kernel/fs/xfs/xfs.ko",
+    "extra/zfs/zfs/zfs.ko",
+    "extra/spl/spl/spl.ko",
+    "extra/icp/icp.ko",
+    "extra/zfs/zfs/README",
+]
+
+
+@pytest.fixture(name="modules_dir")
+def fixture_modules_dir(tmp_path):
+    for module in MODULES:
+        path = tmp_path / module
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    return str(tmp_path)
+
+
+def relative(root, paths):
+    return [os.path.relpath(path, root) for path in paths]
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_find_modules(modules_dir, threads):
+    modules = find_modules(modules_dir, threads)
+
+    assert relative(modules_dir, modules) == sorted(MODULES[:-1])
+
+
+def test_find_modules_error(modules_dir, monkeypatch):
+    scan_dir = cli._scan_dir  # pylint: disable=protected-access
+
+    def failing_scan_dir(path):
+        if path.endswith("zfs"):
+            raise OSError("cannot scan {}".format(path))
+        return scan_dir(path)
+
+    monkeypatch.setattr(cli, "_scan_dir", failing_scan_dir)
+
+    with pytest.raises(OSError):
+        find_modules(modules_dir, 4)
+
+
+def test_module_filter_allow(modules_dir):
+    module_filter = ModuleFilter(allow=["zfs", "spl", "i*"])
+
+    files = debug_info_files([modules_dir], module_filter, 4)
+
+    assert relative(modules_dir, files) == [
+        "extra/icp/icp.ko", "extra/spl/spl/spl.ko", "extra/zfs/zfs/zfs.ko"
+    ]
+
+
+def test_module_filter_deny(modules_dir):
+    module_filter = ModuleFilter(allow=["*"], deny=["ext*", "xfs"])
+
+    files = debug_info_files([modules_dir], module_filter)
+
+    assert relative(modules_dir, files) == [
+        "extra/icp/icp.ko", "extra/spl/spl/spl.ko", "extra/zfs/zfs/zfs.ko"
+    ]
+
+
+def test_module_filter_dashes():
+    assert ModuleFilter(allow=["nf-conntrack"])("/lib/nf_conntrack.ko")
+    assert not ModuleFilter(deny=["nf_conntrack"])("/lib/nf-conntrack.ko")
@@ -0,0 +1,65 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import drgn
+import sdb
+from sdb.commands.filter import Filter
+from sdb.commands.head import Head
+
+from tests import invoke, MOCK_PROGRAM
+
+
+def test_parser_shared_by_instances():
+    assert Head(MOCK_PROGRAM, "1").parser is Head(MOCK_PROGRAM, "2").parser
+
+
+def test_parsed_args_not_shared_by_instances():
+    first = Head(MOCK_PROGRAM, "3")
+    second = Head(MOCK_PROGRAM, "3")
+
+    assert first.args is not second.args
+    assert first.args.count == second.args.count == 3
+
+
+def test_ispipeable():
+    assert Head.ispipeable
+    assert Head(MOCK_PROGRAM).ispipeable
+
+
+def test_repeated_line_starts_anew():
+    line = 'head 2'
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(5)]
+
+    first = invoke(MOCK_PROGRAM, objs, line)
+    second = invoke(MOCK_PROGRAM, objs, line)
+
+    assert [obj.value_() for obj in first] == [0, 1]
+    assert [obj.value_() for obj in second] == [0, 1]
+
+
+def test_repeated_arguments_still_validated():
+    filter_ = Filter(MOCK_PROGRAM, "obj == 1")
+    again = Filter(MOCK_PROGRAM, "obj == 1")
+
+    assert filter_.match is not again.match
+
+
+def test_batched_growing():
+    batches = list(sdb.batched(range(20), 8, 1))
+
+    assert [len(batch) for batch in batches] == [1, 2, 4, 8, 5]
@@ -0,0 +1,105 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import sdb
+
+from tests import (invoke, struct_core_fixture, struct_pointers, STRUCTS_ADDR,
+                   STRUCT_SIZE)
+
+#
+# The value of ts_int of each structure is its index.
+#
+NSTRUCTS = 64
+VALUES = list(range(NSTRUCTS))
+
+fixture_target = struct_core_fixture(VALUES)
+
+
+def test_member_path():
+    assert sdb.member_path("obj.a") == ["a"]
+    assert sdb.member_path("obj.a.b_c") == ["a", "b_c"]
+    assert sdb.member_path("obj") is None
+    assert sdb.member_path("obj.a[0]") is None
+    assert sdb.member_path("obj.a + 1") is None
+
+
+def test_field_layout(target):
+    prog = target.prog
+
+    layout = sdb.field_layout(prog, prog.type('struct test_struct *'),
+                              ["ts_int"])
+
+    assert layout is not None
+    assert (layout.deref, layout.offset, layout.size) == (True, 0, 4)
+    assert layout.is_number and layout.signed
+    assert sdb.field_layout(prog, prog.type('struct test_struct'),
+                            ["ts_bogus"]) is None
+    assert sdb.field_layout(prog, prog.type('int'), ["ts_int"]) is None
+
+
+def test_read(target):
+    objs = struct_pointers(target.prog, NSTRUCTS)
+    reader = sdb.FieldReader(target.prog, ["ts_int"])
+
+    values = [reader.read(obj)[1] for obj in objs]
+
+    assert values == list(range(NSTRUCTS))
+
+
+def test_prefetch_merges_reads(target):
+    objs = struct_pointers(target.prog, NSTRUCTS)
+    reader = sdb.FieldReader(target.prog, ["ts_int"])
+    target.accounting.reset()
+
+    reader.prefetch(objs)
+    values = [reader.read(obj)[1] for obj in objs]
+
+    assert values == list(range(NSTRUCTS))
+    assert target.accounting.reads == 1
+
+
+def test_filter_pushdown(target):
+    objs = struct_pointers(target.prog, NSTRUCTS)
+    target.accounting.reset()
+
+    ret = invoke(target.prog, objs, 'filter obj.ts_int >= 60')
+
+    assert [obj.value_() for obj in ret] == [
+        STRUCTS_ADDR + STRUCT_SIZE * num for num in range(60, NSTRUCTS)
+    ]
+    assert target.accounting.reads == 1
+
+
+def test_pyfilter_pushdown(target):
+    objs = struct_pointers(target.prog, NSTRUCTS)
+    target.accounting.reset()
+
+    ret = invoke(target.prog, objs,
+                 'pyfilter obj.ts_int < 2 or 62 < obj.ts_int')
+
+    assert [obj.value_() for obj in ret
+           ] == [STRUCTS_ADDR + STRUCT_SIZE * num for num in [0, 1, 63]]
+    assert target.accounting.reads == 2
+
+
+def test_pyfilter_constant_out_of_range(target):
+    objs = struct_pointers(target.prog, NSTRUCTS)
+
+    ret = invoke(target.prog, objs, 'pyfilter obj.ts_int == 0x100000000')
+
+    assert not ret
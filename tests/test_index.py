@@ -0,0 +1,151 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import struct
+from typing import Optional
+
+import drgn
+import pytest
+
+from sdb.internal.index import (TypeIndex, elf_build_id, file_signature,
+                                notes_build_id)
+from tests import setup_basic_mock_program
+
+BUILD_ID = bytes(range(20))
+GLOBAL_INT_ADDR = 0xffffffffc0a8aee0
+
+
+def build_id_note() -> bytes:
+    return struct.pack("<III", 4, len(BUILD_ID), 3) + b"GNU\0" + BUILD_ID
+
+
+def test_notes_build_id():
+    other = struct.pack("<III", 6, 4, 1) + b"Linux\0\0\0" + bytes(4)
+
+    assert notes_build_id(other + build_id_note()) == BUILD_ID.hex()
+    assert notes_build_id(other) is None
+
+
+def test_elf_build_id(tmp_path):
+    path = str(tmp_path / "zfs.ko")
+    note = build_id_note()
+    ehdr = struct.Struct("<16sHHIQQQIHHHHHH")
+    shdr = struct.Struct("<IIQQQQIIQQ")
+    shoff = ehdr.size + len(note)
+    with open(path, "wb") as elf:
+        # e_type: ET_REL, with a null section and a SHT_NOTE section
+        elf.write(
+            ehdr.pack(b"\x7fELF\x02\x01\x01" + bytes(9), 1, 62, 1, 0, 0, shoff,
+                      0, ehdr.size, 0, 0, shdr.size, 2, 0))
+        elf.write(note)
+        elf.write(bytes(shdr.size))
+        elf.write(shdr.pack(0, 7, 0, 0, ehdr.size, len(note), 0, 0, 4, 0))
+
+    assert elf_build_id(path) == BUILD_ID.hex()
+
+
+def test_file_signature(tmp_path):
+    path = tmp_path / "zfs.ko"
+    path.write_bytes(b"zfs")
+    signature = file_signature(str(path))
+
+    assert file_signature(str(path)) == signature
+    path.write_bytes(b"zfs 2")
+    assert file_signature(str(path)) != signature
+    assert file_signature(str(tmp_path / "missing.ko")) is None
+
+
+def new_program() -> drgn.Program:
+    return drgn.Program(
+        drgn.Platform(
+            drgn.Architecture.X86_64, drgn.PlatformFlags.IS_LITTLE_ENDIAN
+            | drgn.PlatformFlags.IS_64_BIT))
+
+
+def add_mock_objects(prog: drgn.Program, global_int_addr: int) -> None:
+    """
+    Add the constant TEST_CONSTANT and the "int" variable global_int, at
+    the given address, to the objects of the given program.
+    """
+    int_type = prog.type('int')
+
+    def mock_object_find(prog: drgn.Program, name: str,
+                         flags: drgn.FindObjectFlags,
+                         filename: Optional[str]) -> Optional[drgn.Object]:
+        # pylint: disable=unused-argument
+        if name == "TEST_CONSTANT":
+            return drgn.Object(prog, int_type, value=42)
+        if name == "global_int":
+            return drgn.Object(prog, int_type, address=global_int_addr)
+        return None
+
+    prog.add_object_finder(mock_object_find)
+
+
+@pytest.fixture(name="index_path")
+def fixture_index_path(tmp_path):
+    path = str(tmp_path / "index.json")
+    prog = setup_basic_mock_program()
+    add_mock_objects(prog, GLOBAL_INT_ADDR)
+    index = TypeIndex(prog, path)
+    assert not index.hit
+    index.record()
+    prog.type("struct test_struct")
+    prog["TEST_CONSTANT"]  # pylint: disable=pointless-statement
+    prog["global_int"]  # pylint: disable=pointless-statement
+    index.save()
+    return path
+
+
+def test_index_served(index_path):
+    loads = []
+    prog = new_program()
+    index = TypeIndex(prog, index_path)
+    index.install(lambda: loads.append(True))
+
+    assert index.hit
+    type_ = prog.type("struct test_struct")
+    assert [member[1] for member in type_.members] == ["ts_int", "ts_voidp"]
+    assert prog["TEST_CONSTANT"].value_() == 42
+    assert not loads
+
+
+def test_index_after_base_moved(index_path):
+    #
+    # The same kernel, loaded at a different address (e.g. after a
+    # reboot with KASLR), has the same index, but the addresses of its
+    # variables must come from its own debug info.
+    #
+    prog = new_program()
+    index = TypeIndex(prog, index_path)
+    index.install(lambda: add_mock_objects(prog, GLOBAL_INT_ADDR + 0x200000))
+
+    assert index.hit
+    assert prog["global_int"].address_ == GLOBAL_INT_ADDR + 0x200000
+    assert index.complete
+
+
+def test_index_miss_loads_debug_info(index_path):
+    loads = []
+    prog = new_program()
+    index = TypeIndex(prog, index_path)
+    index.install(lambda: loads.append(True))
+
+    with pytest.raises(LookupError):
+        prog.type("struct not_indexed")
+    assert loads == [True]
@@ -0,0 +1,68 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import random
+
+import sdb
+
+
+def test_add():
+    members = sdb.IntSet()
+
+    assert members.add(0xffff880000001000)
+    assert not members.add(0xffff880000001000)
+    assert members.add(0xffff880000001008)
+    assert members.add(-1)
+
+    assert len(members) == 3
+    assert 0xffff880000001008 in members
+    assert 0xffff880000001010 not in members
+    assert -1 in members
+    assert "bogus" not in members
+    assert list(members) == [-1, 0xffff880000001000, 0xffff880000001008]
+
+
+def test_dense_chunk_becomes_bitmap():
+    members = sdb.IntSet()
+    base = 0xffff880000000000
+    values = [base + 8 * num for num in range(sdb.ARRAY_MAX + 1)]
+    random.Random(0).shuffle(values)
+
+    for value in values:
+        assert members.add(value)
+    for value in values:
+        assert not members.add(value)
+
+    assert len(members) == len(values)
+    assert isinstance(members.chunks[base >> sdb.CHUNK_BITS], bytearray)
+    assert list(members) == sorted(values)
+    assert base + 4 not in members
+
+
+def test_matches_python_set():
+    members = sdb.IntSet()
+    expected = set()
+    rand = random.Random(1)
+    for _ in range(20000):
+        value = 0xffff880000000000 + rand.randrange(1 << 20) * 8
+        assert members.add(value) == (value not in expected)
+        expected.add(value)
+
+    assert len(members) == len(expected)
+    assert list(members) == sorted(expected)
+    assert members.nbytes() < 4 * len(expected)
@@ -0,0 +1,140 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+from typing import Iterable
+
+import drgn
+import pytest
+import sdb
+
+from tests import invoke, MOCK_PROGRAM
+
+
+class IntLocator(sdb.Locator):
+    output_type = "int *"
+
+    @sdb.InputHandler("struct test_struct *")
+    def from_struct(self, obj: drgn.Object) -> Iterable[drgn.Object]:
+        yield drgn.Object(self.prog, 'int *', value=obj.value_() + 1)
+
+    @sdb.InputHandler("struct bogus *")
+    def from_bogus(self, obj: drgn.Object) -> Iterable[drgn.Object]:
+        raise AssertionError("no object can be of a type that doesn't exist")
+
+
+def test_handlers_found_once():
+    assert IntLocator.input_handlers == {
+        "struct test_struct *": "from_struct",
+        "struct bogus *": "from_bogus",
+    }
+
+
+def test_dispatch():
+    objs = [
+        drgn.Object(MOCK_PROGRAM, 'struct test_struct *', value=0x10),
+        drgn.Object(MOCK_PROGRAM, 'struct test_struct *', value=0x20),
+        drgn.Object(MOCK_PROGRAM, 'int *', value=0x30),
+    ]
+
+    ret = list(IntLocator(MOCK_PROGRAM).caller(objs))
+
+    assert [str(obj.type_) for obj in ret] == ['int *'] * 3
+    assert [obj.value_() for obj in ret] == [0x11, 0x21, 0x30]
+
+
+def test_unhandled_type(capsys):
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=0)]
+
+    with pytest.raises(TypeError):
+        list(IntLocator(MOCK_PROGRAM).caller(objs))
+    capsys.readouterr()
+
+
+def test_dispatcher():
+    dispatcher = sdb.TypeDispatcher(MOCK_PROGRAM, {
+        'int': 'int',
+        'void *': 'pointer',
+        'struct bogus': 'bogus',
+    })
+
+    assert len(dispatcher.types()) == 2
+    assert dispatcher.lookup(MOCK_PROGRAM.type('void *')) == 'pointer'
+    assert dispatcher.lookup(MOCK_PROGRAM.type('int')) == 'int'
+    assert dispatcher.lookup(MOCK_PROGRAM.type('char')) is None
+
+
+def test_dispatcher_resolves_on_demand():
+    dispatcher = sdb.TypeDispatcher(MOCK_PROGRAM, {
+        'int': 'int',
+        'void*': 'pointer',
+        'struct bogus': 'bogus',
+    })
+
+    assert not dispatcher.entries
+    assert dispatcher.lookup(MOCK_PROGRAM.type('void *')) == 'pointer'
+    assert list(dispatcher.entries) == ['void *']
+
+
+class RangeLocator(sdb.Locator):
+    """
+    Locates the "int *" pointers 0 to 99 when it is given no input, and
+    counts the pointers that it finds that way.
+    """
+
+    names = ["test_range"]
+    output_type = "int *"
+
+    located = 0
+
+    def no_input(self) -> Iterable[drgn.Object]:
+        for i in range(100):
+            RangeLocator.located += 1
+            yield drgn.Object(self.prog, 'int *', value=i)
+
+    def no_input_reverse(self) -> Iterable[drgn.Object]:
+        for i in reversed(range(100)):
+            RangeLocator.located += 1
+            yield drgn.Object(self.prog, 'int *', value=i)
+
+
+def test_tail_without_input():
+    RangeLocator.located = 0
+
+    ret = invoke(MOCK_PROGRAM, [], 'test_range | tail 3')
+
+    assert [obj.value_() for obj in ret] == [97, 98, 99]
+    assert RangeLocator.located == 3
+
+
+def test_tail_with_input():
+    objs = [drgn.Object(MOCK_PROGRAM, 'int *', value=i) for i in range(5)]
+    RangeLocator.located = 0
+
+    ret = invoke(MOCK_PROGRAM, objs, 'test_range | tail 2')
+
+    assert [obj.value_() for obj in ret] == [3, 4]
+    assert RangeLocator.located == 0
+
+
+def test_head_without_input():
+    RangeLocator.located = 0
+
+    ret = invoke(MOCK_PROGRAM, [], 'test_range | head 3')
+
+    assert [obj.value_() for obj in ret] == [0, 1, 2]
+    assert RangeLocator.located == 3
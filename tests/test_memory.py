@@ -0,0 +1,222 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import drgn
+import pytest
+import sdb
+
+from tests import (create_elf_core, invoke, setup_basic_mock_program,
+                   MOCK_PROGRAM)
+
+SEGMENT_ADDR = 0xffff880000000000
+
+
+@pytest.fixture(name="target")
+def fixture_target(tmp_path):
+    path = str(tmp_path / "core")
+    create_elf_core(path, [(SEGMENT_ADDR, bytes(range(256)) * 16),
+                           (SEGMENT_ADDR + 0x10000, b"\x05\x00\x00\x00")])
+    prog = setup_basic_mock_program()
+    memory = sdb.TargetMemory(prog, path, accounting=True)
+    yield memory
+    memory.close()
+
+
+def test_core_segments(tmp_path):
+    path = str(tmp_path / "core")
+    create_elf_core(path, [(SEGMENT_ADDR, b"\x01" * 16),
+                           (SEGMENT_ADDR + 0x1000, b"\x02" * 8)])
+
+    segments = sdb.core_segments(path)
+
+    assert [(seg.vaddr, seg.filesz, seg.memsz) for seg in segments
+           ] == [(SEGMENT_ADDR, 16, 16), (SEGMENT_ADDR + 0x1000, 8, 8)]
+
+
+def test_not_elf(tmp_path):
+    path = str(tmp_path / "core")
+    with open(path, "wb") as core:
+        core.write(b"KDUMP   ")
+
+    with pytest.raises(ValueError):
+        sdb.core_segments(path)
+
+
+def test_read_through_target_memory(target):
+    data = target.prog.read(SEGMENT_ADDR + 16, 8)
+
+    assert data == bytes(range(16, 24))
+    assert target.accounting.reads == 1
+    assert target.accounting.bytes == 8
+    assert target.accounting.sizes == {8: 1}
+
+
+def test_read_attributed_to_command(target):
+    objs = [drgn.Object(target.prog, 'int', address=SEGMENT_ADDR + 0x10000)]
+
+    ret = invoke(target.prog, objs, 'echo | filter obj == 5')
+
+    assert len(ret) == 1
+    assert target.accounting.commands["filter"][0] > 0
+    assert "echo" not in target.accounting.commands
+
+
+def test_reads_profiled(target, capsys):
+    objs = [drgn.Object(target.prog, 'int', address=SEGMENT_ADDR + 0x10000)]
+
+    invoke(target.prog, objs, 'profile echo | filter obj == 5')
+
+    lines = capsys.readouterr().out.splitlines()
+    assert "READS" in lines[0]
+    assert lines[-1].split()[0] == "TOTAL"
+
+
+def test_stats(target, capsys):
+    target.prog.read(SEGMENT_ADDR, 3)
+
+    invoke(target.prog, [], 'stats -r')
+
+    out = capsys.readouterr().out
+    assert "2-3" in out
+    assert target.accounting.reads == 0
+
+
+def test_stats_without_accounting():
+    with pytest.raises(sdb.CommandError):
+        invoke(MOCK_PROGRAM, [], 'stats')
+
+
+@pytest.fixture(name="cached_target")
+def fixture_cached_target(tmp_path):
+    path = str(tmp_path / "core")
+    create_elf_core(path, [(SEGMENT_ADDR, bytes(range(256)) * 48)])
+    prog = setup_basic_mock_program()
+    memory = sdb.TargetMemory(prog,
+                              path,
+                              accounting=True,
+                              cache_size=2 * sdb.PAGE_SIZE)
+    yield memory
+    memory.close()
+
+
+def test_cached_reads_of_same_page(cached_target):
+    prog = cached_target.prog
+
+    assert prog.read(SEGMENT_ADDR + 16, 8) == bytes(range(16, 24))
+    assert prog.read(SEGMENT_ADDR + 32, 4) == bytes(range(32, 36))
+
+    assert cached_target.accounting.reads == 1
+    assert cached_target.accounting.bytes == sdb.PAGE_SIZE
+    assert (cached_target.cache.hits, cached_target.cache.misses) == (1, 1)
+
+
+def test_cached_read_across_pages(cached_target):
+    addr = SEGMENT_ADDR + sdb.PAGE_SIZE - 4
+
+    assert cached_target.prog.read(addr, 8) == bytes([252, 253, 254, 255] +
+                                                     [0, 1, 2, 3])
+    assert cached_target.prog.read(addr + 4, 4) == bytes([0, 1, 2, 3])
+    assert cached_target.accounting.reads == 1
+    assert cached_target.accounting.bytes == 2 * sdb.PAGE_SIZE
+
+
+def test_cache_eviction(cached_target):
+    for page in [0, 1, 2, 0]:
+        cached_target.prog.read(SEGMENT_ADDR + page * sdb.PAGE_SIZE, 8)
+
+    assert len(cached_target.cache.pages) == 2
+    assert cached_target.accounting.reads == 4
+
+
+def test_cache_invalidated_per_invocation(cached_target):
+    cached_target.prog.read(SEGMENT_ADDR, 8)
+    invoke(cached_target.prog, [], 'echo')
+    cached_target.prog.read(SEGMENT_ADDR, 8)
+
+    assert cached_target.accounting.reads == 2
+
+
+def test_cache_kept_for_session(cached_target):
+    cached_target.keep_cache = True
+
+    cached_target.prog.read(SEGMENT_ADDR, 8)
+    invoke(cached_target.prog, [], 'echo')
+    cached_target.prog.read(SEGMENT_ADDR, 8)
+
+    assert cached_target.accounting.reads == 1
+
+
+def test_stats_with_cache(cached_target, capsys):
+    cached_target.prog.read(SEGMENT_ADDR, 8)
+
+    invoke(cached_target.prog, [], 'stats')
+
+    assert "READ CACHE" in capsys.readouterr().out
+
+
+def test_stats_with_cache_only(tmp_path, capsys):
+    path = str(tmp_path / "core")
+    create_elf_core(path, [(SEGMENT_ADDR, bytes(range(256)))])
+    prog = setup_basic_mock_program()
+    memory = sdb.TargetMemory(prog, path, cache_size=sdb.PAGE_SIZE)
+    prog.read(SEGMENT_ADDR, 8)
+
+    invoke(prog, [], 'stats -r')
+
+    out = capsys.readouterr().out
+    assert "READ CACHE" in out
+    assert "READ SIZE" not in out
+    assert (memory.cache.hits, memory.cache.misses) == (0, 0)
+    memory.close()
+
+
+def test_mmap_reader(tmp_path):
+    path = str(tmp_path / "core")
+    create_elf_core(path, [(SEGMENT_ADDR, bytes(range(256)))])
+    prog = setup_basic_mock_program()
+    memory = sdb.TargetMemory(prog, path, use_mmap=True)
+
+    assert isinstance(memory.reader, sdb.MmapReader)
+    assert prog.read(SEGMENT_ADDR + 250, 6) == bytes(range(250, 256))
+    memory.close()
+
+
+def test_mmap_reader_zero_fill(tmp_path):
+    path = str(tmp_path / "core")
+    create_elf_core(path, [(SEGMENT_ADDR, b"\x01" * 8)])
+    segment = sdb.core_segments(path)[0]._replace(memsz=16)
+    reader = sdb.MmapReader(path, [segment])
+
+    assert reader.read(SEGMENT_ADDR + 4, 8) == b"\x01" * 4 + bytes(4)
+    reader.close()
+
+
+def test_coalesce(tmp_path):
+    path = str(tmp_path / "core")
+    create_elf_core(path, [(SEGMENT_ADDR, b"\x07" + bytes(15))])
+    prog = setup_basic_mock_program()
+    memory = sdb.TargetMemory(prog, path, accounting=True)
+    ptr = drgn.Object(prog, 'struct test_struct *', value=SEGMENT_ADDR)
+
+    struct = sdb.coalesce(ptr)
+
+    assert memory.accounting.reads == 1
+    assert struct.ts_int.value_() == 7
+    struct.ts_voidp.value_()
+    assert memory.accounting.reads == 1
+    memory.close()
@@ -0,0 +1,183 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import struct
+
+import pytest
+
+from sdb.internal.modules import LazyModules, btf_names, kallsyms_modules
+from tests import setup_basic_mock_program
+
+MODULES = {"zfs": "/lib/modules/zfs.ko", "spl": "/lib/modules/spl.ko"}
+SYMBOLS = {"zfs_dbgmsgs": "zfs", "spl_kmem_cache_list": "spl"}
+NAMES = {"zfs": {"spa_t", "struct spa", "VDEV_STATE_HEALTHY"}}
+
+
+def make_lazy(names):
+    prog = setup_basic_mock_program()
+    loads = []
+    scans = []
+
+    def find_modules():
+        scans.append(True)
+        return dict(MODULES)
+
+    lazy = LazyModules(prog,
+                       find_modules,
+                       lambda: dict(SYMBOLS),
+                       loads.append,
+                       find_names=lambda: names)
+    lazy.install()
+    return (prog, lazy, loads, scans)
+
+
+@pytest.fixture(name="lazy")
+def fixture_lazy():
+    """
+    LazyModules on a kernel without BTF for its modules.
+    """
+    return make_lazy({})[:3]
+
+
+@pytest.fixture(name="described")
+def fixture_described():
+    """
+    LazyModules on a kernel with BTF for zfs, but not for spl.
+    """
+    return make_lazy(NAMES)
+
+
+def test_kallsyms_modules(tmp_path):
+    path = tmp_path / "kallsyms"
+    path.write_text("ffffffff81000000 T _stext\n"
+                    "ffffffffc0a8aee0 d zfs_dbgmsgs\t[zfs]\n")
+
+    assert kallsyms_modules(str(path)) == {"zfs_dbgmsgs": "zfs"}
+
+
+def test_hit_loads_nothing(lazy):
+    (prog, _, loads) = lazy
+
+    prog["global_int"]  # pylint: disable=pointless-statement
+    prog.type("struct test_struct")
+
+    assert not loads
+
+
+def test_symbol_miss_loads_its_module(lazy):
+    (prog, _, loads) = lazy
+
+    with pytest.raises(LookupError):
+        prog["zfs_dbgmsgs"]  # pylint: disable=pointless-statement
+    with pytest.raises(LookupError):
+        prog["zfs_dbgmsgs"]  # pylint: disable=pointless-statement
+
+    assert loads == [["/lib/modules/zfs.ko"]]
+
+
+def test_type_miss_loads_remaining_modules(lazy):
+    (prog, lazy_modules, loads) = lazy
+
+    with pytest.raises(LookupError):
+        prog["zfs_dbgmsgs"]  # pylint: disable=pointless-statement
+    with pytest.raises(LookupError):
+        prog.type("spa_t")
+    with pytest.raises(LookupError):
+        prog.type("vdev_t")
+
+    assert loads == [["/lib/modules/zfs.ko"], ["/lib/modules/spl.ko"]]
+    assert not lazy_modules.remaining()
+
+
+def test_hit_scans_nothing(described):
+    (prog, _, loads, scans) = described
+
+    prog["global_int"]  # pylint: disable=pointless-statement
+    prog.type("struct test_struct")
+
+    assert not loads
+    assert not scans
+
+
+def test_type_miss_loads_its_module(described):
+    (prog, _, loads, scans) = described
+
+    with pytest.raises(LookupError):
+        prog.type("spa_t")
+    with pytest.raises(LookupError):
+        prog.type("struct spa")
+
+    assert loads == [["/lib/modules/zfs.ko"]]
+    assert scans == [True]
+
+
+def test_enumerator_miss_loads_its_module(described):
+    (prog, _, loads, _) = described
+
+    with pytest.raises(LookupError):
+        prog["VDEV_STATE_HEALTHY"]  # pylint: disable=pointless-statement
+
+    assert loads == [["/lib/modules/zfs.ko"]]
+
+
+def test_unknown_type_loads_modules_without_btf(described):
+    (prog, lazy_modules, loads, _) = described
+
+    with pytest.raises(LookupError):
+        prog.type("struct bogus")
+    with pytest.raises(LookupError):
+        prog.type("spa_t")
+
+    assert loads == [["/lib/modules/spl.ko"], ["/lib/modules/zfs.ko"]]
+    assert not lazy_modules.remaining()
+
+
+def btf(types, strings):
+    """
+    Return BTF of the given type section and string section.
+    """
+    header = struct.pack("<HBBIIIII", 0xeb9f, 1, 0, 24, 0, len(types),
+                         len(types), len(strings))
+    return header + types + strings
+
+
+def test_btf_names():
+    # The names at offsets below 16 are in the base strings of vmlinux.
+    base_strings = b"\0spa\0" + bytes(11)
+    strings = b"spa_t\0VDEV_STATE_HEALTHY\0VDEV_STATE_DEGRADED\0"
+    types = b"".join([
+        # struct spa, of one member
+        struct.pack("<III", 1, (4 << 24) | 1, 8),
+        struct.pack("<III", 0, 1, 0),
+        # typedef spa_t
+        struct.pack("<III", 16, 8 << 24, 1),
+        # a pointer, without a name
+        struct.pack("<III", 0, 2 << 24, 1),
+        # an anonymous enum of two enumerators
+        struct.pack("<III", 0, (6 << 24) | 2, 4),
+        struct.pack("<Ii", 22, 0),
+        struct.pack("<Ii", 41, 1),
+    ])
+
+    assert btf_names(btf(types, strings), base_strings) == {
+        "struct spa", "spa_t", "VDEV_STATE_HEALTHY", "VDEV_STATE_DEGRADED"
+    }
+
+
+def test_btf_names_not_btf():
+    assert btf_names(b"\x7fELF" + bytes(60)) == set()
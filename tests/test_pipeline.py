@@ -0,0 +1,262 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+from typing import Iterable
+
+import drgn
+import pytest
+import sdb
+from sdb.commands.cast import Cast
+from sdb.commands.echo import Echo
+from sdb.commands.filter import Filter
+from sdb.commands.head import Head
+from sdb.commands.tail import Tail
+
+from tests import invoke, MOCK_PROGRAM
+
+
+class IntPointerPassthrough(sdb.Command):
+    # pylint: disable=too-few-public-methods
+
+    input_type = "int *"
+
+    def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
+        yield from objs
+
+
+def test_plan_inserts_coerce():
+    commands = [Echo(MOCK_PROGRAM), IntPointerPassthrough(MOCK_PROGRAM)]
+
+    plan = sdb.Pipeline(MOCK_PROGRAM, commands)
+
+    assert [type(stage) for stage in plan.stages
+           ] == [Echo, sdb.Coerce, IntPointerPassthrough]
+    assert plan.ispipeable
+    # the list of commands passed in is left untouched
+    assert len(commands) == 2
+
+
+def test_plan_coerces_first_input():
+    plan = sdb.Pipeline(MOCK_PROGRAM, [IntPointerPassthrough(MOCK_PROGRAM)])
+
+    ret = list(plan.execute([drgn.Object(MOCK_PROGRAM, 'int', value=1)]))
+
+    assert len(ret) == 1
+    assert ret[0].value_() == 1
+    assert ret[0].type_ == MOCK_PROGRAM.type('int *')
+
+
+def test_execute_pipeline_is_reusable():
+    commands = [Echo(MOCK_PROGRAM), IntPointerPassthrough(MOCK_PROGRAM)]
+    objs = [drgn.Object(MOCK_PROGRAM, 'int', value=0)]
+
+    first = list(sdb.execute_pipeline(MOCK_PROGRAM, objs, commands))
+    second = list(sdb.execute_pipeline(MOCK_PROGRAM, objs, commands))
+
+    assert len(first) == len(second) == 1
+    assert len(commands) == 2
+
+
+def test_deep_pipeline():
+    line = ' | '.join(['echo'] * 64)
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(3)]
+
+    ret = invoke(MOCK_PROGRAM, objs, line)
+
+    assert [obj.value_() for obj in ret] == [0, 1, 2]
+
+
+class Doubler(sdb.Command):
+    # pylint: disable=too-few-public-methods
+
+    def call(self, objs: Iterable[drgn.Object]) -> Iterable[drgn.Object]:
+        for obj in objs:
+            yield obj
+            yield obj
+
+
+def test_call_batch_shim():
+    objs = [
+        drgn.Object(MOCK_PROGRAM, 'void *', value=i)
+        for i in range(sdb.BATCH_SIZE)
+    ]
+    plan = sdb.Pipeline(
+        MOCK_PROGRAM,
+        [Echo(MOCK_PROGRAM), Doubler(MOCK_PROGRAM)])
+
+    batches = list(plan.execute_batches(objs))
+
+    assert [len(batch) for batch in batches] == [sdb.BATCH_SIZE] * 2
+    assert [obj.value_() for batch in batches for obj in batch
+           ] == [i // 2 for i in range(2 * sdb.BATCH_SIZE)]
+
+
+@pytest.fixture(name="array_walker")
+def fixture_array_walker():
+    """
+    Register the "test_array" walker of "long *" pointers for the
+    duration of a test. It is unregistered after the test, so that it
+    doesn't change the dispatch of any other test.
+    """
+
+    class ArrayWalker(sdb.Walker):
+        """
+        Walks the 100 longs at the address of its input, as "long *"
+        pointers, and counts the pointers that it yields, as well as the
+        walks that are over (either done or closed).
+        """
+
+        names = ["test_array"]
+        input_type = "long *"
+
+        walked = 0
+        finished = 0
+
+        def walk(self, obj: drgn.Object) -> Iterable[drgn.Object]:
+            try:
+                for i in range(100):
+                    ArrayWalker.walked += 1
+                    yield drgn.Object(self.prog,
+                                      'long *',
+                                      value=obj.value_() + 8 * i)
+            finally:
+                ArrayWalker.finished += 1
+
+        def walk_reverse(self, obj: drgn.Object) -> Iterable[drgn.Object]:
+            for i in reversed(range(100)):
+                ArrayWalker.walked += 1
+                yield drgn.Object(self.prog,
+                                  'long *',
+                                  value=obj.value_() + 8 * i)
+
+    yield ArrayWalker
+
+    del sdb.Walker.allWalkers[ArrayWalker.input_type]
+    del sdb.all_commands["test_array"]
+    sdb.get_type_cache(MOCK_PROGRAM).invalidate()
+
+
+def test_plan_fuses_tail_into_reversible_walker(array_walker):
+    commands = [array_walker(MOCK_PROGRAM), Tail(MOCK_PROGRAM, "3")]
+
+    plan = sdb.Pipeline(MOCK_PROGRAM, commands)
+
+    assert [type(stage) for stage in plan.stages] == [sdb.Coerce, array_walker]
+    assert plan.stages[-1].tail == 3
+
+
+def test_plan_keeps_tail_after_other_commands():
+    plan = sdb.Pipeline(
+        MOCK_PROGRAM,
+        [Echo(MOCK_PROGRAM), Tail(MOCK_PROGRAM, "3")])
+
+    assert [type(stage) for stage in plan.stages] == [Echo, Tail]
+
+
+def test_reverse_walk_for_tail(array_walker):
+    objs = [
+        drgn.Object(MOCK_PROGRAM, 'long *', value=base)
+        for base in [0x1000, 0x2000]
+    ]
+
+    ret = invoke(MOCK_PROGRAM, objs, 'test_array | tail 102')
+
+    expected = [0x1000 + 8 * i for i in [98, 99]]
+    expected += [0x2000 + 8 * i for i in range(100)]
+    assert [obj.value_() for obj in ret] == expected
+    assert array_walker.walked == 102
+
+
+def test_reverse_walk_for_tail_zero(array_walker):
+    objs = [drgn.Object(MOCK_PROGRAM, 'long *', value=0x1000)]
+
+    ret = invoke(MOCK_PROGRAM, objs, 'test_array | tail 0')
+
+    assert not ret
+    assert array_walker.walked == 0
+
+
+def test_plan_passes_head_limit_up(array_walker):
+    commands = [
+        array_walker(MOCK_PROGRAM),
+        Cast(MOCK_PROGRAM, "long *"),
+        Head(MOCK_PROGRAM, "5")
+    ]
+
+    plan = sdb.Pipeline(MOCK_PROGRAM, commands)
+
+    assert [stage.limit for stage in plan.stages] == [None, 5, 5, None]
+
+
+def test_plan_stops_head_limit_at_filter(array_walker):
+    commands = [
+        array_walker(MOCK_PROGRAM),
+        Filter(MOCK_PROGRAM, "obj > 0"),
+        Head(MOCK_PROGRAM, "5")
+    ]
+
+    plan = sdb.Pipeline(MOCK_PROGRAM, commands)
+
+    assert [stage.limit for stage in plan.stages] == [None, None, 5, None]
+
+
+def test_plan_bounds_stages_before_filter(array_walker):
+    commands = [
+        array_walker(MOCK_PROGRAM),
+        Filter(MOCK_PROGRAM, "obj > 0"),
+        Head(MOCK_PROGRAM, "5")
+    ]
+
+    plan = sdb.Pipeline(MOCK_PROGRAM, commands)
+
+    assert [stage.bounded for stage in plan.stages
+           ] == [True, True, False, False]
+
+
+def test_head_after_filter_stops_walk(array_walker):
+    objs = [drgn.Object(MOCK_PROGRAM, 'long *', value=0x1000)]
+
+    ret = invoke(MOCK_PROGRAM, objs,
+                 'test_array | filter obj == 0x1010 | head 1')
+
+    assert [obj.value_() for obj in ret] == [0x1010]
+    # the walker produces batches of 1 and then 2 objects
+    assert array_walker.walked == 3
+    assert array_walker.finished == 1
+
+
+def test_head_stops_walk(array_walker):
+    objs = [
+        drgn.Object(MOCK_PROGRAM, 'long *', value=base)
+        for base in [0x1000, 0x2000]
+    ]
+
+    ret = invoke(MOCK_PROGRAM, objs, 'test_array | head 3')
+
+    assert [obj.value_() for obj in ret] == [0x1000 + 8 * i for i in range(3)]
+    assert array_walker.walked == 3
+    assert array_walker.finished == 1
+
+
+def test_head_after_fused_tail(array_walker):
+    objs = [drgn.Object(MOCK_PROGRAM, 'long *', value=0x1000)]
+
+    ret = invoke(MOCK_PROGRAM, objs, 'test_array | tail 10 | head 2')
+
+    assert [obj.value_() for obj in ret] == [0x1000 + 8 * i for i in [90, 91]]
+    assert array_walker.walked == 10
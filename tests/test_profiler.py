@@ -0,0 +1,85 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import drgn
+import pytest
+import sdb
+from sdb.commands.echo import Echo
+
+from tests import invoke, MOCK_PROGRAM
+
+
+def test_no_pipeline():
+    line = 'profile'
+    objs = []
+
+    with pytest.raises(sdb.CommandInvalidInputError):
+        invoke(MOCK_PROGRAM, objs, line)
+
+
+def test_output_unchanged():
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(5)]
+
+    ret = invoke(MOCK_PROGRAM, objs, 'profile echo | head 3')
+
+    assert [obj.value_() for obj in ret] == [0, 1, 2]
+
+
+def test_report(capsys):
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=i) for i in range(5)]
+
+    invoke(MOCK_PROGRAM, objs, 'profile echo 0x10 | head 3')
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split()[:4] == ["STAGE", "TIME(ms)", "IN", "OUT"]
+    assert "TYPE HITS" in lines[0]
+    assert "TYPE MISSES" in lines[0]
+    echo = lines[2].split()
+    assert echo[0] == "echo"
+    assert echo[2:4] == ["5", "5"]
+    head = lines[3].split()
+    assert head[0] == "head"
+    assert head[2:4] == ["5", "3"]
+    assert lines[-2].split()[0] == "TOTAL"
+    assert lines[-1].startswith("memory reads are not counted")
+
+
+def test_type_lookups_counted():
+    types = sdb.get_type_cache(MOCK_PROGRAM)
+    profiler = sdb.Profiler()
+    stage = Echo(MOCK_PROGRAM)
+    profiler.begin(sdb.Pipeline(MOCK_PROGRAM, [stage]))
+
+    profiler.enter(stage)
+    types.invalidate()
+    sdb.get_type(MOCK_PROGRAM, "int")
+    sdb.get_type(MOCK_PROGRAM, "int")
+    profiler.leave(stage)
+
+    counters = dict(zip(profiler.counter_names, profiler.toplevel[0].counters))
+    assert counters["type hits"] == 1
+    assert counters["type misses"] == 1
+
+
+def test_monitor_removed():
+    objs = [drgn.Object(MOCK_PROGRAM, 'void *', value=0)]
+
+    invoke(MOCK_PROGRAM, objs, 'profile echo')
+
+    # pylint: disable=protected-access
+    assert not sdb.pipeline._MONITORS
@@ -0,0 +1,149 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import json
+import sys
+
+import pytest
+import sdb
+
+from tests import MOCK_PROGRAM
+
+SOURCE = '''
+import sdb
+
+class Lister(sdb.Walker):
+    names = ["lister"]
+    input_type = "list_t *"
+
+class SubLister(Lister):
+    names = ["sublister", "sl"]
+    input_type = "sublist_t *"
+
+class Printer(sdb.Locator, sdb.PrettyPrinter):
+    names = ["printer"]
+    input_type: str = "thing_t *"
+
+class Helper:
+    pass
+'''
+
+#
+# Walkers need their input types to exist, so the package that we import
+# defines plain commands instead.
+#
+PACKAGE_SOURCE = SOURCE.replace("sdb.Walker", "sdb.Command")
+
+
+@pytest.fixture(name="package")
+def fixture_package(tmp_path, monkeypatch):
+    package = tmp_path / "lazypkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "cmds.py").write_text(
+        SOURCE.replace("sdb.Walker", "sdb.Command"))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "lazypkg"
+    for module in ["lazypkg", "lazypkg.cmds"]:
+        sys.modules.pop(module, None)
+
+
+def test_scan_source():
+    assert sdb.scan_source(SOURCE) == [
+        ("command", "lister"),
+        ("walker", "list_t *"),
+        ("command", "sublister"),
+        ("command", "sl"),
+        ("walker", "sublist_t *"),
+        ("command", "printer"),
+        ("printer", "thing_t *"),
+    ]
+
+
+def test_build_manifest_cached(package, tmp_path):
+    cache = str(tmp_path / "manifest.json")
+
+    manifest = sdb.build_manifest([package], cache, update_cache=True)
+    assert manifest["lazypkg.cmds"] == sdb.scan_source(PACKAGE_SOURCE)
+
+    #
+    # Unchanged modules are not scanned again.
+    #
+    with open(cache) as cache_file:
+        contents = json.load(cache_file)
+    for entry in contents.values():
+        entry["entries"] = [["command", "cached"]]
+    with open(cache, "w") as cache_file:
+        json.dump(contents, cache_file)
+
+    assert sdb.build_manifest([package], cache) == {
+        "lazypkg.cmds": [("command", "cached")]
+    }
+
+
+def test_build_manifest_leaves_cache_alone(package, tmp_path):
+    cache = tmp_path / "manifest.json"
+
+    manifest = sdb.build_manifest([package], str(cache))
+
+    assert manifest["lazypkg.cmds"] == sdb.scan_source(PACKAGE_SOURCE)
+    assert not cache.exists()
+
+
+def test_registry_imports_on_lookup(package):
+    sdb.all_commands.declare("lister", package + ".cmds")
+    try:
+        assert "lister" in sdb.all_commands
+        assert package + ".cmds" not in sys.modules
+
+        class_ = sdb.all_commands["lister"]
+
+        assert package + ".cmds" in sys.modules
+        assert class_.names == ["lister"]
+        assert sdb.all_commands["sl"] is sdb.all_commands["sublister"]
+    finally:
+        for name in ["lister", "sublister", "sl", "printer"]:
+            del sdb.all_commands[name]
+
+
+def test_dispatcher_imports_all_on_miss(package, tmp_path, monkeypatch):
+    #
+    # The manifest can't tell the input type of this walker, so it is
+    # only found once all the modules of the manifest are imported.
+    #
+    (tmp_path / package / "hidden.py").write_text('''
+import sdb
+
+from tests import MOCK_PROGRAM
+
+class Hidden(sdb.Walker):
+    input_type = " ".join(["int", "*"])
+
+    def walk(self, obj):
+        yield obj
+''')
+    monkeypatch.setattr(sdb.registry, "_MODULES", [package + ".hidden"])
+    monkeypatch.setattr(sdb.registry, "_IMPORTED_ALL", False)
+    try:
+        dispatcher = sdb.get_dispatcher(MOCK_PROGRAM, sdb.Walker.allWalkers)
+
+        assert dispatcher.lookup(sdb.get_type(MOCK_PROGRAM, "int *")) == "int *"
+    finally:
+        sys.modules.pop(package + ".hidden", None)
+        del sdb.Walker.allWalkers["int *"]
+        sdb.get_type_cache(MOCK_PROGRAM).invalidate()
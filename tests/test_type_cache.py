@@ -0,0 +1,87 @@
+#
+# Copyright 2019 Delphix
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# pylint: disable=missing-docstring
+
+import pytest
+import sdb
+
+from tests import invoke, setup_basic_mock_program
+
+
+@pytest.fixture(name="prog")
+def fixture_prog():
+    return setup_basic_mock_program()
+
+
+def test_type_cached(prog):
+    cache = sdb.get_type_cache(prog)
+
+    first = sdb.get_type(prog, 'struct test_struct')
+    second = sdb.get_type(prog, 'struct test_struct')
+
+    assert str(first) == str(prog.type('struct test_struct'))
+    assert second is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_per_program(prog):
+    other = setup_basic_mock_program()
+
+    assert sdb.get_type_cache(prog) is sdb.get_type_cache(prog)
+    assert sdb.get_type_cache(prog) is not sdb.get_type_cache(other)
+
+
+def test_missing_type_not_cached(prog):
+    cache = sdb.get_type_cache(prog)
+
+    for _ in range(2):
+        with pytest.raises(LookupError):
+            sdb.get_type(prog, 'struct bogus')
+
+    assert not cache.types
+    assert cache.misses == 2
+
+
+def test_member_names(prog):
+    cache = sdb.get_type_cache(prog)
+
+    names = cache.member_names('struct test_struct')
+
+    assert names == ('ts_int', 'ts_voidp')
+    assert cache.member_names('struct test_struct') is names
+
+
+def test_invalidate(prog):
+    cache = sdb.get_type_cache(prog)
+    sdb.get_type(prog, 'int')
+
+    cache.invalidate()
+    sdb.get_type(prog, 'int')
+
+    assert cache.misses == 2
+
+
+def test_stats_types(prog, capsys):
+    sdb.get_type(prog, 'int')
+    sdb.get_type(prog, 'int')
+
+    invoke(prog, [], 'stats -t -r')
+
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].split() == ["TYPE", "CACHE", "HITS", "MISSES"]
+    assert out[1].split()[-2:] == ["1", "1"]
+    assert sdb.get_type_cache(prog).hits == 0